@@ -0,0 +1,305 @@
+"""
+アドミッション制御（負荷制限）
+
+DBコネクションプールの手前で同時実行数を制限し、待ち行列が溢れた場合は
+プールの待ち時間（pool_timeout）を待たずに 503 + Retry-After で即座に拒否します。
+
+ルートは次のクラスに分類され、クラスごとに同時実行数と待ち行列の上限を持ちます。
+待ち行列では優先度の高いクラス（書き込み > 通常の参照 > 重い一覧取得）から順に実行されます。
+
+- light: "/" や "/health_check" などDBを使わないルート（制限なし）
+- write: POSTによる作成系ルート
+- read: IDを指定した参照など軽いDBアクセス
+- heavy: "/answers" などの全件スキャンになり得る一覧取得・エクスポート・一括インポート
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    name: str
+    priority: int  # 小さいほど優先
+    max_concurrency: Optional[int]  # Noneの場合は制限しない
+    max_queue: int
+
+
+class AdmissionRejected(Exception):
+    """待ち行列が溢れた、または待ち時間が上限を超えた場合の例外"""
+
+
+# (優先度, 到着順, ポリシー, 起床用Future)
+_Waiter = Tuple[int, int, RoutePolicy, asyncio.Future]
+
+
+# 全体の同時実行数（既定ではコネクションプールの最大接続数に合わせる）
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() != "false"
+ADMISSION_CAPACITY = int(
+    os.getenv("ADMISSION_CAPACITY", str(DB_POOL_SIZE + DB_MAX_OVERFLOW))
+)
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# 重い一覧取得は全体の1/3までに制限し、書き込みや軽い参照の枠を残す
+ADMISSION_HEAVY_CONCURRENCY = int(
+    os.getenv("ADMISSION_HEAVY_CONCURRENCY", str(max(1, ADMISSION_CAPACITY // 3)))
+)
+
+DEFAULT_POLICIES: Dict[str, RoutePolicy] = {
+    "light": RoutePolicy("light", priority=0, max_concurrency=None, max_queue=0),
+    "write": RoutePolicy(
+        "write",
+        priority=1,
+        max_concurrency=ADMISSION_CAPACITY,
+        max_queue=ADMISSION_QUEUE_SIZE,
+    ),
+    "read": RoutePolicy(
+        "read",
+        priority=2,
+        max_concurrency=ADMISSION_CAPACITY,
+        max_queue=ADMISSION_QUEUE_SIZE,
+    ),
+    "heavy": RoutePolicy(
+        "heavy",
+        priority=3,
+        max_concurrency=ADMISSION_HEAVY_CONCURRENCY,
+        max_queue=max(1, ADMISSION_QUEUE_SIZE // 4),
+    ),
+}
+
+# DBを使わないルート
+_LIGHT_PATHS = {
+    "/",
+    "/health_check",
+    "/debug/loop",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+}
+# 全件スキャンになり得る一覧取得ルート
+_HEAVY_PATHS = {"/answers", "/questions"}
+_HEAVY_PREFIXES = ("/export/",)
+# 長時間かかる一括書き込み
+_BULK_WRITE_PATHS = {"/import"}
+
+
+def classify_request(method: str, path: str, query_string: bytes = b"") -> str:
+    """リクエストのメソッド・パス・クエリ文字列からルートクラスを判定します。"""
+    if path in _LIGHT_PATHS:
+        return "light"
+    if path.endswith(":lookup"):
+        # 一括取得はPOSTだが件数の上限がある参照
+        return "read"
+    if path in _BULK_WRITE_PATHS:
+        return "heavy"
+    if method == "POST":
+        return "write"
+    if path in _HEAVY_PATHS:
+        # ?ids= による取得は件数の上限があるため :lookup と同じ参照として扱う
+        if "ids" in parse_qs(query_string.decode("latin-1")):
+            return "read"
+        return "heavy"
+    if path.startswith(_HEAVY_PREFIXES):
+        return "heavy"
+    return "read"
+
+
+class AdmissionController:
+    """
+    優先度付きの同時実行数制御
+
+    全体の上限（capacity）とクラスごとの上限の両方を満たす場合のみ実行を許可します。
+    待ち行列が満杯の場合、より優先度の低い待機中リクエストがあればそれを押し出します。
+    """
+
+    def __init__(
+        self,
+        capacity: int = ADMISSION_CAPACITY,
+        max_queue: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ) -> None:
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._in_flight_by_policy: Dict[str, int] = {}
+        self._waiting_by_policy: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._counter = itertools.count()
+        self.rejected: Dict[str, int] = {}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _has_room(self, policy: RoutePolicy) -> bool:
+        if self.in_flight >= self.capacity:
+            return False
+        running = self._in_flight_by_policy.get(policy.name, 0)
+        return policy.max_concurrency is None or running < policy.max_concurrency
+
+    def _start(self, policy: RoutePolicy) -> None:
+        self.in_flight += 1
+        self._in_flight_by_policy[policy.name] = (
+            self._in_flight_by_policy.get(policy.name, 0) + 1
+        )
+
+    def _reject(self, policy: RoutePolicy) -> AdmissionRejected:
+        self.rejected[policy.name] = self.rejected.get(policy.name, 0) + 1
+        return AdmissionRejected(policy.name)
+
+    def _remove_waiter(self, entry: _Waiter) -> None:
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._waiting_by_policy[entry[2].name] -= 1
+
+    def _evict_lower_priority(self, policy: RoutePolicy) -> bool:
+        """待ち行列から最も優先度の低い待機中リクエストを押し出します。"""
+        victim = max(self._waiters, default=None)
+        if victim is None or victim[0] <= policy.priority:
+            return False
+        self._remove_waiter(victim)
+        if not victim[3].done():
+            victim[3].set_exception(self._reject(victim[2]))
+        return True
+
+    async def acquire(self, policy: RoutePolicy) -> None:
+        """
+        実行枠を確保します。確保できない場合は AdmissionRejected を送出します。
+        """
+        if policy.max_concurrency is None:
+            return
+
+        # 同じか高い優先度の待機者がいなければ即座に実行
+        blocked = any(entry[0] <= policy.priority for entry in self._waiters)
+        if not blocked and self._has_room(policy):
+            self._start(policy)
+            return
+
+        if self._waiting_by_policy.get(policy.name, 0) >= policy.max_queue:
+            raise self._reject(policy)
+        if len(self._waiters) >= self.max_queue and not self._evict_lower_priority(
+            policy
+        ):
+            raise self._reject(policy)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        entry = (policy.priority, next(self._counter), policy, future)
+        heapq.heappush(self._waiters, entry)
+        self._waiting_by_policy[policy.name] = (
+            self._waiting_by_policy.get(policy.name, 0) + 1
+        )
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                exc = future.exception()
+                if exc is not None:
+                    # 優先度の高いリクエストに押し出された
+                    raise exc from None
+                # 起床と同時にタイムアウト・キャンセルされた場合は確保済みの枠を返却する
+                self.release(policy)
+            else:
+                future.cancel()
+                if entry in self._waiters:
+                    self._remove_waiter(entry)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(policy) from None
+            raise
+
+    def release(self, policy: RoutePolicy) -> None:
+        """実行枠を返却し、実行可能な待機者を優先度順に起床させます。"""
+        if policy.max_concurrency is None:
+            return
+        self.in_flight -= 1
+        self._in_flight_by_policy[policy.name] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for entry in sorted(self._waiters):
+            if self.in_flight >= self.capacity:
+                break
+            _, _, policy, future = entry
+            if not self._has_room(policy):
+                continue
+            self._remove_waiter(entry)
+            if future.done():
+                continue
+            self._start(policy)
+            future.set_result(None)
+
+    def snapshot(self) -> Dict[str, object]:
+        """現在の実行数・待機数・拒否数を返します。"""
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "in_flight_by_class": dict(self._in_flight_by_policy),
+            "queued_by_class": dict(self._waiting_by_policy),
+            "rejected_by_class": dict(self.rejected),
+        }
+
+
+class AdmissionMiddleware:
+    """ルートクラスごとにアドミッション制御を行うASGIミドルウェア"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: Optional[AdmissionController] = None,
+        policies: Optional[Dict[str, RoutePolicy]] = None,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ) -> None:
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.policies = policies or DEFAULT_POLICIES
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_request(
+            scope["method"], scope["path"], scope.get("query_string", b"")
+        )
+        policy = self.policies[route_class]
+        try:
+            await self.controller.acquire(policy)
+        except AdmissionRejected:
+            await self._send_rejection(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(policy)
+
+    async def _send_rejection(self, send: Send) -> None:
+        body = json.dumps(
+            {"detail": "サーバーが混雑しています。しばらくしてから再試行してください"},
+            ensure_ascii=False,
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
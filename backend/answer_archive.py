@@ -0,0 +1,284 @@
+"""
+回答の時間によるパーティショニングとアーカイブ
+
+answers は増え続けるため、作成日時（created_at）の月ごとにレンジパーティションへ分割し、
+保持期間（ANSWER_RETENTION_DAYS）を過ぎた回答を圧縮した行形式の answers_archive へ移動します。
+作成日時で範囲を指定した一覧取得（GET /answers?created_since=...）はパーティションの
+プルーニングにより対象の月だけを読み、アーカイブした回答も GET /answers/{answer_id} で
+取得できます。アーカイブした回答は一覧や質問の詳細には含まれません。
+
+MySQLのパーティションには次の制約があるため、partition で answers を変換します。
+
+- パーティションキーを主キーに含める必要があるため、主キーを (id, created_at) にします
+- パーティションを分割したInnoDBのテーブルは外部キーを持てないため、
+  answers.question_id の外部キーを削除します（質問の存在確認はAPIで行っています）
+
+コマンドラインからの利用例::
+
+    python answer_archive.py partition   # answers を月ごとのパーティションに変換（1回のみ）
+    python answer_archive.py ensure      # 今後の月のパーティションを追加（定期実行）
+    python answer_archive.py archive     # 保持期間を過ぎた回答をアーカイブ（定期実行）
+
+パーティションを分割していない場合（SQLiteを含む）、archive は行単位でバッチごとに移動します。
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional, cast
+
+from database import AsyncSessionLocal, Base, engine
+from models import Answer, ArchivedAnswer, Question, now_us
+from sqlalchemy import CursorResult, delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+logger = logging.getLogger(__name__)
+
+# この日数より前に作成された回答をアーカイブする
+ANSWER_RETENTION_DAYS = int(os.getenv("ANSWER_RETENTION_DAYS", "365"))
+# 事前に作成しておく今後の月のパーティションの数
+ANSWER_PARTITION_MONTHS_AHEAD = int(os.getenv("ANSWER_PARTITION_MONTHS_AHEAD", "3"))
+# パーティションを分割していない場合に1トランザクションで移動する行数
+ARCHIVE_BATCH_SIZE = 1000
+
+_ARCHIVE_COLUMNS = ["id", "question_id", "answer", "created_at", "updated_at"]
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_definitions(first: date, last: date) -> List[str]:
+    """first の月から last の月までの月ごとのパーティション定義を返します。"""
+    definitions = []
+    month = _month_start(first)
+    while month <= last:
+        upper = _next_month(month)
+        definitions.append(
+            f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper} 00:00:00')"
+        )
+        month = upper
+    return definitions
+
+
+async def _db_now(session: AsyncSession) -> datetime:
+    """DBの現在日時（created_at と同じタイムゾーン）"""
+    return await session.scalar(select(now_us()))
+
+
+async def _partitions(session: AsyncSession) -> List[str]:
+    """answers のパーティション名の一覧（分割していない場合は空）"""
+    if session.get_bind().dialect.name != "mysql":
+        return []
+    result = await session.execute(
+        text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'answers' "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        )
+    )
+    return list(result.scalars())
+
+
+async def partition_answers(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    months_ahead: int = ANSWER_PARTITION_MONTHS_AHEAD,
+) -> None:
+    """answers を作成日時の月ごとのレンジパーティションに変換します（MySQLのみ）。"""
+    async with session_factory() as session:
+        if session.get_bind().dialect.name != "mysql":
+            raise RuntimeError("パーティションの分割はMySQLのみ対応しています")
+        if await _partitions(session):
+            logger.info("answers は既にパーティションに分割されています")
+            return
+        oldest = await session.scalar(
+            select(Answer.created_at).order_by(Answer.created_at)
+        )
+        now = await _db_now(session)
+        first = (oldest or now).date()
+        last = _month_start(now.date())
+        for _ in range(months_ahead):
+            last = _next_month(last)
+        foreign_keys = await session.execute(
+            text(
+                "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'answers' "
+                "AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+            )
+        )
+        statements = [
+            f"ALTER TABLE answers DROP FOREIGN KEY {name}"
+            for name in foreign_keys.scalars()
+        ]
+        statements += [
+            "ALTER TABLE answers "
+            "MODIFY created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6), "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)",
+            "ALTER TABLE answers PARTITION BY RANGE COLUMNS(created_at) ("
+            + ", ".join(
+                partition_definitions(first, last)
+                + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"]
+            )
+            + ")",
+        ]
+        # DDLは暗黙にコミットされるため、1文ずつ実行する
+        for statement in statements:
+            logger.info("answer_archive: %s", statement)
+            await session.execute(text(statement))
+
+
+async def ensure_partitions(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    months_ahead: int = ANSWER_PARTITION_MONTHS_AHEAD,
+) -> List[str]:
+    """今後months_ahead か月分のパーティションがなければ pmax を分割して追加します。"""
+    async with session_factory() as session:
+        partitions = await _partitions(session)
+        if not partitions:
+            return []
+        target = _month_start((await _db_now(session)).date())
+        for _ in range(months_ahead):
+            target = _next_month(target)
+        # レンジパーティションは末尾（pmaxの手前）にしか追加できないため、
+        # 既存の最後の月の翌月から追加する
+        last = max(name for name in partitions if name != "pmax")
+        start = _next_month(datetime.strptime(last, "p%Y%m").date())
+        if start > target:
+            return []
+        definitions = partition_definitions(start, target)
+        await session.execute(
+            text(
+                "ALTER TABLE answers REORGANIZE PARTITION pmax INTO ("
+                + ", ".join(
+                    definitions + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"]
+                )
+                + ")"
+            )
+        )
+        return [definition.split()[1] for definition in definitions]
+
+
+async def archive_answers(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    retention_days: int = ANSWER_RETENTION_DAYS,
+) -> int:
+    """
+    保持期間を過ぎた回答を answers_archive へ移動し、移動した件数を返します。
+
+    パーティションに分割している場合は、保持期間より前に収まる月のパーティションを
+    まとめてコピーしてから削除します（削除は一瞬で、テーブルの断片化も残りません）。
+    途中で停止しても、再実行すると重複せずに続きから移動します。
+    """
+    async with session_factory() as session:
+        cutoff = await _db_now(session) - timedelta(days=retention_days)
+        partitions = await _partitions(session)
+        if partitions:
+            return await _archive_partitions(session, partitions, cutoff)
+        return await _archive_rows(session, cutoff)
+
+
+async def _archive_partitions(
+    session: AsyncSession, partitions: List[str], cutoff: datetime
+) -> int:
+    limit = partition_name(_month_start(cutoff.date()))
+    moved = 0
+    for name in partitions:
+        # パーティションの上限（翌月1日）が保持期間の開始以前のものだけを対象にする
+        if name == "pmax" or name >= limit:
+            continue
+        columns = ", ".join(_ARCHIVE_COLUMNS)
+        result = cast(
+            CursorResult,
+            await session.execute(
+                text(
+                    f"INSERT IGNORE INTO answers_archive ({columns}) "
+                    f"SELECT {columns} FROM answers PARTITION ({name})"
+                )
+            ),
+        )
+        await session.commit()
+        await session.execute(text(f"ALTER TABLE answers DROP PARTITION {name}"))
+        logger.info("answer_archive: %s をアーカイブしました", name)
+        moved += result.rowcount
+    return moved
+
+
+async def _archive_rows(session: AsyncSession, cutoff: datetime) -> int:
+    moved = 0
+    while True:
+        ids = list(
+            await session.scalars(
+                select(Answer.id)
+                .where(Answer.created_at < cutoff)
+                .order_by(Answer.created_at)
+                .limit(ARCHIVE_BATCH_SIZE)
+            )
+        )
+        if not ids:
+            return moved
+        # 途中で停止した場合に移動済みの行があっても重複させない
+        ignore = "IGNORE" if session.get_bind().dialect.name == "mysql" else "OR IGNORE"
+        rows = select(*[getattr(Answer, name) for name in _ARCHIVE_COLUMNS])
+        await session.execute(
+            insert(ArchivedAnswer)
+            .from_select(_ARCHIVE_COLUMNS, rows.where(Answer.id.in_(ids)))
+            .prefix_with(ignore)
+        )
+        await session.execute(delete(Answer).where(Answer.id.in_(ids)))
+        await session.commit()
+        moved += len(ids)
+
+
+async def get_archived_answer(
+    db: AsyncSession, answer_id: str
+) -> Optional[ArchivedAnswer]:
+    """アーカイブした回答を質問・ジャンルとともに取得します。"""
+    result = await db.execute(
+        select(ArchivedAnswer)
+        .options(selectinload(ArchivedAnswer.question).selectinload(Question.genre))
+        .where(ArchivedAnswer.id == answer_id)
+    )
+    return result.scalar_one_or_none()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="回答のパーティションとアーカイブ")
+    parser.add_argument("command", choices=["partition", "ensure", "archive"])
+    parser.add_argument("--retention-days", type=int, default=ANSWER_RETENTION_DAYS)
+    parser.add_argument(
+        "--months-ahead", type=int, default=ANSWER_PARTITION_MONTHS_AHEAD
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            if args.command == "partition":
+                await partition_answers(months_ahead=args.months_ahead)
+            elif args.command == "ensure":
+                added = await ensure_partitions(months_ahead=args.months_ahead)
+                print(f"added: {', '.join(added) or '-'}")
+            else:
+                moved = await archive_answers(retention_days=args.retention_days)
+                print(f"archived: {moved}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+回答の水平シャーディング
+
+ANSWER_SHARD_URLS に接続URLをカンマ区切りで指定すると、回答（answers）を
+question_id のハッシュで複数のDBに振り分けます。ジャンル・質問・ロールアップ・
+アウトボックスはこれまでどおりプライマリ（DATABASE_URL）に置きます。
+
+- 質問ごとの処理（回答の作成、/questions/{id}/answers、/questions/{id}/details）は
+  1つのシャードだけにアクセスします
+- 回答ID・IDの一覧による取得や全体の一覧は全シャードへ並行して問い合わせ、
+  (created_at, id) もしくは (updated_at, id) の順にマージします。
+  変更フィード（GET /changes）のカーソルは全シャードに共通のキーセットのため、
+  そのまま続きから再開できます
+
+1つのセッションは複数のDBにまたがれないため、シャードへのアクセスは get_db とは別の
+依存関数（get_answer_shards）から行います。シャードへの書き込みとプライマリへの
+書き込み（アウトボックスのイベント・統計）は別々にコミットされます。
+
+シャードの数を変えると振り分け先が変わるため、変更する場合は回答を移し替えてください。
+"""
+
+import asyncio
+import hashlib
+import heapq
+import os
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+from database import create_engine_from_url
+from models import Answer, Question
+from sqlalchemy import MetaData, Table, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+T = TypeVar("T")
+
+# 回答を振り分けるDBの接続URL（カンマ区切り）。空の場合はシャーディングしない
+ANSWER_SHARD_URLS = [
+    url.strip() for url in os.getenv("ANSWER_SHARD_URLS", "").split(",") if url.strip()
+]
+
+_ANSWER_COLUMNS = list(Answer.__table__.columns)
+
+
+def _shard_answers_table() -> Table:
+    """シャード側の answers テーブル（questions はシャードにないため外部キーを除く）"""
+    table = cast(Table, Answer.__table__).to_metadata(MetaData())
+    for constraint in list(table.foreign_key_constraints):
+        table.constraints.discard(constraint)
+    for column in table.columns:
+        column.foreign_keys.clear()
+    return table
+
+
+SHARD_ANSWERS_TABLE = _shard_answers_table()
+
+
+def shard_index(question_id: str, shard_count: int) -> int:
+    """question_id から振り分け先のシャード番号を求めます（プロセスによらず一定）。"""
+    digest = hashlib.blake2b(question_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+class AnswerShards:
+    """回答のシャードごとのセッションファクトリ"""
+
+    def __init__(self, session_factories: Sequence[async_sessionmaker[AsyncSession]]):
+        self.session_factories = list(session_factories)
+        self.engines: List[AsyncEngine] = []
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str]) -> "AnswerShards":
+        engines = [create_engine_from_url(url) for url in urls]
+        shards = cls([async_sessionmaker(bind=e, autoflush=False) for e in engines])
+        shards.engines = engines
+        return shards
+
+    def __len__(self) -> int:
+        return len(self.session_factories)
+
+    def session_for(self, question_id: str) -> AsyncSession:
+        """質問の回答を保持するシャードのセッションを返します。"""
+        index = shard_index(question_id, len(self))
+        return self.session_factories[index]()
+
+    def group(self, question_ids: Sequence[str]) -> Dict[int, List[str]]:
+        """質問IDをシャード番号ごとにまとめます。"""
+        groups: Dict[int, List[str]] = {}
+        for question_id in question_ids:
+            groups.setdefault(shard_index(question_id, len(self)), []).append(
+                question_id
+            )
+        return groups
+
+    async def run(self, index: int, fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        async with self.session_factories[index]() as session:
+            return await fn(session)
+
+    async def gather(self, fn: Callable[[AsyncSession], Awaitable[T]]) -> List[T]:
+        """全シャードで並行してfnを実行し、シャード順の結果を返します。"""
+        return list(await asyncio.gather(*(self.run(i, fn) for i in range(len(self)))))
+
+    async def create_tables(self) -> None:
+        for engine in self.engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(SHARD_ANSWERS_TABLE.create, checkfirst=True)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+configured_shards: Optional[AnswerShards] = (
+    AnswerShards.from_urls(ANSWER_SHARD_URLS) if ANSWER_SHARD_URLS else None
+)
+
+
+# 依存関数：回答のシャードの取得（シャーディングしない場合はNone）
+def get_answer_shards() -> Optional[AnswerShards]:
+    return configured_shards
+
+
+def _answer_query():
+    return select(*_ANSWER_COLUMNS)
+
+
+async def _rows(session: AsyncSession, query) -> List[Dict[str, Any]]:
+    result = await session.execute(query)
+    return [dict(row) for row in result.mappings()]
+
+
+async def create_answer(shards: AnswerShards, question_id: str, answer: str) -> Answer:
+    """回答を質問のシャードに作成し、コミットした回答を返します。"""
+    async with shards.session_for(question_id) as session:
+        db_answer = Answer(question_id=question_id, answer=answer)
+        session.add(db_answer)
+        await session.commit()
+        await session.refresh(db_answer)
+    return db_answer
+
+
+async def answers_for_question(
+    shards: AnswerShards, question_id: str
+) -> List[Dict[str, Any]]:
+    """質問の回答を1つのシャードから作成日時順に取得します。"""
+    async with shards.session_for(question_id) as session:
+        return await _rows(
+            session,
+            _answer_query()
+            .where(Answer.question_id == question_id)
+            .order_by(Answer.created_at, Answer.id),
+        )
+
+
+async def list_answers(
+    shards: AnswerShards,
+    question_id: Optional[str] = None,
+    created_since: Optional[datetime] = None,
+    created_until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """回答の一覧を (created_at, id) の順に取得します。質問を指定しない場合は全シャードをマージします。"""
+    query = _answer_query().order_by(Answer.created_at, Answer.id)
+    if created_since is not None:
+        query = query.where(Answer.created_at >= created_since)
+    if created_until is not None:
+        query = query.where(Answer.created_at < created_until)
+    if question_id:
+        async with shards.session_for(question_id) as session:
+            return await _rows(session, query.where(Answer.question_id == question_id))
+    per_shard = await shards.gather(lambda session: _rows(session, query))
+    return list(heapq.merge(*per_shard, key=lambda row: (row["created_at"], row["id"])))
+
+
+async def answers_by_ids(
+    shards: AnswerShards, ids: Sequence[str]
+) -> Dict[str, Dict[str, Any]]:
+    """IDに一致する回答を全シャードから取得し、IDをキーにした辞書で返します。"""
+    if not ids:
+        return {}
+    query = _answer_query().where(Answer.id.in_(list(ids)))
+    per_shard = await shards.gather(lambda session: _rows(session, query))
+    return {row["id"]: row for rows in per_shard for row in rows}
+
+
+async def attach_questions(
+    db: AsyncSession, answers: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """プライマリから質問（ジャンルを含む）を読み込み、各回答の question に設定します。"""
+    question_ids = list({answer["question_id"] for answer in answers})
+    questions: Dict[str, Question] = {}
+    if question_ids:
+        result = await db.execute(
+            select(Question)
+            .options(selectinload(Question.genre))
+            .where(Question.id.in_(question_ids))
+        )
+        questions = {question.id: question for question in result.scalars()}
+    return [
+        {**answer, "question": questions.get(answer["question_id"])}
+        for answer in answers
+    ]
@@ -0,0 +1,392 @@
+"""
+Q&A APIの非同期クライアント
+
+他のサービスからAPIを呼び出すためのクライアントです。レスポンスは schemas.py の
+モデルで返すため、サーバーと同じ型で扱えます（httpxが必要です: uv sync --extra client）。
+
+- 接続はクライアント単位でプールし、キープアライブで再利用します。
+  クライアントは1つ作成して使い回してください
+- get_genre / get_question / get_answer は、同時に呼ばれたものを短い待ち時間
+  （batch_window）の間まとめて、1回の一括取得（POST /<リソース>:lookup）で取得します
+- iter_changes は変更フィード（GET /changes）をカーソルでページごとに取得します。
+  その他の一覧のエンドポイントはページングがないため、一括で取得します
+- 接続エラー・タイムアウト・409/429/502/503/504 の場合は、ジッター付きの指数バックオフで
+  再試行します（Retry-After があればそれ以上待ちます）。作成系の呼び出しは
+  呼び出しごとに Idempotency-Key を付けて送るため、再試行しても重複して作成されません
+
+利用例::
+
+    async with ApiClient("http://localhost:8000") as api:
+        questions = await asyncio.gather(*(api.get_question(i) for i in ids))
+        async for page in api.iter_changes():
+            ...
+"""
+
+import asyncio
+import functools
+import random
+import uuid
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Type,
+    TypeVar,
+    Union,
+)
+
+import httpx
+from pydantic import BaseModel, TypeAdapter
+from schemas import (
+    BATCH_LOOKUP_MAX_IDS,
+    AnswerLookupResponse,
+    AnswerResponse,
+    AnswerWithQuestion,
+    ChangesResponse,
+    GenreLookupResponse,
+    GenreResponse,
+    QuestionLookupResponse,
+    QuestionResponse,
+    QuestionWithGenre,
+)
+
+T = TypeVar("T")
+
+# 一括取得（POST /x:lookup）のレスポンス
+LookupResponse = Union[
+    Type[GenreLookupResponse], Type[QuestionLookupResponse], Type[AnswerLookupResponse]
+]
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# 再試行するステータスコード（同じ冪等キーのリクエストが処理中・混雑・
+# ゲートウェイのエラー・タイムアウト）
+RETRY_STATUS_CODES = {409, 429, 502, 503, 504}
+
+
+class ApiError(Exception):
+    """APIがエラーを返した場合の例外"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class NotFoundError(ApiError):
+    """指定したIDのリソースが見つからない場合の例外"""
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.is_success:
+        return
+    try:
+        detail = response.json().get("detail", response.text)
+    except ValueError:
+        detail = response.text
+    error = NotFoundError if response.status_code == 404 else ApiError
+    raise error(response.status_code, detail)
+
+
+@functools.lru_cache
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _retry_after(response: httpx.Response) -> float:
+    """Retry-After（秒）を返します。ない場合や日時形式の場合は0を返します。"""
+    try:
+        return max(float(response.headers.get("retry-after", 0)), 0.0)
+    except ValueError:
+        return 0.0
+
+
+class _Coalescer(Generic[T]):
+    """
+    同時に要求されたIDをまとめて一括取得し、要求ごとに結果を返します。
+
+    最初の要求からwindow秒待つか、max_batch件に達した時点で一括取得します。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[str]], Awaitable[Dict[str, T]]],
+        not_found: Callable[[str], Exception],
+        window: float,
+        max_batch: int = BATCH_LOOKUP_MAX_IDS,
+    ):
+        self.fetch = fetch
+        self.not_found = not_found
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 実行中の一括取得（タスクが途中で破棄されないように参照を保持する）
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get(self, id: str) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(id, []).append(future)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            found = await self.fetch(list(batch))
+        except Exception as exc:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+        for id, futures in batch.items():
+            for future in futures:
+                # 呼び出し元がキャンセルした要求には結果を設定しない
+                if future.done():
+                    continue
+                if id in found:
+                    future.set_result(found[id])
+                else:
+                    future.set_exception(self.not_found(id))
+
+    async def close(self) -> None:
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class ApiClient:
+    """Q&A APIの非同期クライアント"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        *,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_retries: int = 3,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        batch_window: float = 0.002,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        """
+        - **max_connections** / **max_keepalive_connections**: 接続プールの上限
+        - **max_retries**: 最初の呼び出しに加えて再試行する最大回数
+        - **backoff_base** / **backoff_max**: 再試行の待ち時間の基準と上限（秒）
+        - **batch_window**: get_* の呼び出しをまとめるために待つ時間（秒）
+        - **http_client**: 指定した場合はそのクライアントで送信します（閉じるのは呼び出し元）
+        """
+        self._owns_http = http_client is None
+        self._http = http_client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._genres = _Coalescer(
+            self._lookup_fetcher("/genres:lookup", GenreLookupResponse),
+            lambda id: NotFoundError(404, f"ジャンルID '{id}' が見つかりません"),
+            batch_window,
+        )
+        self._questions = _Coalescer(
+            self._lookup_fetcher("/questions:lookup", QuestionLookupResponse),
+            lambda id: NotFoundError(404, f"質問ID '{id}' が見つかりません"),
+            batch_window,
+        )
+        self._answers = _Coalescer(
+            self._lookup_fetcher("/answers:lookup", AnswerLookupResponse),
+            lambda id: NotFoundError(404, f"回答ID '{id}' が見つかりません"),
+            batch_window,
+        )
+
+    async def __aenter__(self) -> "ApiClient":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """保留中の一括取得を完了させ、接続プールを閉じます。"""
+        for coalescer in (self._genres, self._questions, self._answers):
+            await coalescer.close()
+        if self._owns_http:
+            await self._http.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        """再試行の待ち時間（フルジッター: 0〜基準×2^attempt の一様乱数）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _request(
+        self, method: str, path: str, *, idempotent: bool, **kwargs: Any
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.request(method, path, **kwargs)
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                retryable = idempotent and response.status_code in RETRY_STATUS_CODES
+                if not retryable or attempt >= self.max_retries:
+                    _raise_for_status(response)
+                    return response
+                delay = min(
+                    max(self._backoff(attempt), _retry_after(response)),
+                    self.backoff_max,
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _get(self, path: str, model: Any, **params: Any) -> Any:
+        params = {key: value for key, value in params.items() if value is not None}
+        response = await self._request("GET", path, idempotent=True, params=params)
+        return _adapter(model).validate_json(response.content)
+
+    async def _create(self, path: str, model: Type[ModelT], body: Dict) -> ModelT:
+        # 再試行では同じキーを送り、サーバーが最初の作成結果を返す
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        response = await self._request(
+            "POST", path, idempotent=True, json=body, headers=headers
+        )
+        return model.model_validate_json(response.content)
+
+    def _lookup_fetcher(
+        self, path: str, model: LookupResponse
+    ) -> Callable[[List[str]], Awaitable[Dict[str, Any]]]:
+        async def fetch(ids: List[str]) -> Dict[str, Any]:
+            # 一括取得は読み取りのみのため、POSTでも再試行できる
+            response = await self._request(
+                "POST", path, idempotent=True, json={"ids": ids}
+            )
+            return {
+                item.id: item
+                for item in model.model_validate_json(response.content).items
+            }
+
+        return fetch
+
+    async def _lookup_many(
+        self, coalescer: _Coalescer[T], ids: Sequence[str]
+    ) -> Dict[str, T]:
+        """IDの一覧を上限件数ごとに分けて一括取得します（見つからないIDは含めません）。"""
+        unique_ids = list(dict.fromkeys(ids))
+        chunks = [
+            unique_ids[i : i + BATCH_LOOKUP_MAX_IDS]
+            for i in range(0, len(unique_ids), BATCH_LOOKUP_MAX_IDS)
+        ]
+        found: Dict[str, T] = {}
+        for result in await asyncio.gather(*(coalescer.fetch(c) for c in chunks)):
+            found.update(result)
+        return found
+
+    # ===== ジャンル =====
+    async def create_genre(self, genre_name: str) -> GenreResponse:
+        return await self._create("/genres", GenreResponse, {"genre_name": genre_name})
+
+    async def list_genres(self) -> List[GenreResponse]:
+        return await self._get("/genres", List[GenreResponse])
+
+    async def get_genre(self, genre_id: str) -> GenreResponse:
+        return await self._genres.get(genre_id)
+
+    async def get_genres(self, genre_ids: Sequence[str]) -> Dict[str, GenreResponse]:
+        return await self._lookup_many(self._genres, genre_ids)
+
+    # ===== 質問 =====
+    async def create_question(self, genre_id: str, question: str) -> QuestionResponse:
+        return await self._create(
+            "/questions",
+            QuestionResponse,
+            {"genre_id": genre_id, "question": question},
+        )
+
+    async def list_questions(
+        self, genre_id: Optional[str] = None
+    ) -> List[QuestionWithGenre]:
+        return await self._get("/questions", List[QuestionWithGenre], genre_id=genre_id)
+
+    async def get_question(self, question_id: str) -> QuestionWithGenre:
+        return await self._questions.get(question_id)
+
+    async def get_questions(
+        self, question_ids: Sequence[str]
+    ) -> Dict[str, QuestionWithGenre]:
+        return await self._lookup_many(self._questions, question_ids)
+
+    # ===== 回答 =====
+    async def create_answer(self, question_id: str, answer: str) -> AnswerResponse:
+        return await self._create(
+            "/answers",
+            AnswerResponse,
+            {"question_id": question_id, "answer": answer},
+        )
+
+    async def list_answers(
+        self,
+        question_id: Optional[str] = None,
+        created_since: Optional[datetime] = None,
+        created_until: Optional[datetime] = None,
+    ) -> List[AnswerWithQuestion]:
+        return await self._get(
+            "/answers",
+            List[AnswerWithQuestion],
+            question_id=question_id,
+            created_since=created_since and created_since.isoformat(),
+            created_until=created_until and created_until.isoformat(),
+        )
+
+    async def get_answer(self, answer_id: str) -> AnswerWithQuestion:
+        return await self._answers.get(answer_id)
+
+    async def get_answers(
+        self, answer_ids: Sequence[str]
+    ) -> Dict[str, AnswerWithQuestion]:
+        return await self._lookup_many(self._answers, answer_ids)
+
+    # ===== 変更フィード =====
+    async def iter_changes(
+        self, since: Optional[str] = None, page_size: int = 500
+    ) -> AsyncIterator[ChangesResponse]:
+        """
+        sinceのカーソル以降の変更をページごとに返します（has_moreがfalseのページまで）。
+
+        最後のページのnext_cursorを保存しておくと、次回はその続きから取得できます。
+        """
+        while True:
+            page = await self._get(
+                "/changes", ChangesResponse, since=since, limit=page_size
+            )
+            yield page
+            if not page.has_more:
+                return
+            since = page.next_cursor
@@ -0,0 +1,59 @@
+"""
+IDの一覧による一括取得
+
+N件のIDを1回のIN句のクエリ（リレーションは共有のselectinload）で取得し、
+リクエストされた順序で結果を返します。
+"""
+
+from typing import List, Sequence, Tuple, Type, TypeVar
+
+from fastapi import HTTPException
+from models import Answer, Genre, Question
+from schemas import BATCH_LOOKUP_MAX_IDS
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import LoaderOption
+
+# 一括取得に対応するモデル（いずれもid列を持つ）
+ModelT = TypeVar("ModelT", Genre, Question, Answer)
+
+# X-Missing-Ids ヘッダーに列挙する見つからなかったID
+MISSING_IDS_HEADER = "X-Missing-Ids"
+
+
+def parse_ids(ids: str) -> List[str]:
+    """
+    カンマ区切りのIDを重複を除いてリクエスト順のリストにします。
+
+    件数が上限を超える場合は400エラーを送出します。
+    """
+    parsed = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="IDが指定されていません")
+    if len(parsed) > BATCH_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に取得できるIDは{BATCH_LOOKUP_MAX_IDS}件までです",
+        )
+    return parsed
+
+
+async def lookup_by_ids(
+    db: AsyncSession,
+    model: Type[ModelT],
+    ids: Sequence[str],
+    options: Sequence[LoaderOption] = (),
+) -> Tuple[List[ModelT], List[str]]:
+    """
+    IDの一覧に一致する行をリクエスト順に取得します。
+
+    見つかった行のリストと、見つからなかったIDのリストを返します。
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    result = await db.execute(
+        select(model).options(*options).where(model.id.in_(unique_ids))
+    )
+    found = {row.id: row for row in result.scalars()}
+    items = [found[i] for i in unique_ids if i in found]
+    missing = [i for i in unique_ids if i not in found]
+    return items, missing
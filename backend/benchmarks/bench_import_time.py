@@ -0,0 +1,120 @@
+"""
+起動時のimport時間の集計
+
+python -X importtime で新しいプロセスにアプリ（既定は main）を読み込み、
+パッケージごとのimport時間（自身の時間の合計）と、アプリが直接importしている
+モジュールごとの累積時間を集計します。起動を遅くしているimportを見つけるために使います。
+
+    python -m benchmarks.bench_import_time --repeat 5 --top 15
+
+計測のばらつきを抑えるため、モジュールごとにrepeat回のうち最小の時間を使います
+（1回目は.pycの作成を含むことがあります）。
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# import time:       self [us] |  cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    # importの入れ子の深さ（0は最上位）
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """-X importtime の出力を出力順に解析します（ヘッダーなどの行は無視します）。"""
+    entries = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(
+                ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return entries
+
+
+def import_tree(entries: List[ImportTime], module: str) -> List[ImportTime]:
+    """moduleのimportで読み込まれたモジュール（module自身を含む）を返します。"""
+    # 子のモジュールは親より先に出力されるため、直前の最上位の行の次から数える
+    start = 0
+    for index, entry in enumerate(entries):
+        if entry.depth == 0:
+            if entry.module == module:
+                return entries[start : index + 1]
+            start = index + 1
+    raise ValueError(f"{module} のimport時間が出力にありません")
+
+
+def measure(module: str, repeat: int) -> Dict[str, ImportTime]:
+    """moduleを新しいプロセスでrepeat回読み込み、モジュールごとの最小の時間を返します。"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": ""}
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+    best: Dict[str, ImportTime] = {}
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for entry in import_tree(parse_importtime(result.stderr), module):
+            current = best.get(entry.module)
+            if current is None or entry.cumulative_us < current.cumulative_us:
+                best[entry.module] = entry
+    return best
+
+
+def by_package(entries: Dict[str, ImportTime]) -> Dict[str, int]:
+    """最上位のパッケージごとに自身のimport時間を合計します。"""
+    totals: Dict[str, int] = defaultdict(int)
+    for entry in entries.values():
+        totals[entry.module.split(".")[0]] += entry.self_us
+    return dict(totals)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="起動時のimport時間の集計")
+    parser.add_argument("--module", default="main", help="読み込むモジュール")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    entries = measure(args.module, args.repeat)
+    total = entries[args.module].cumulative_us
+    print(f"import {args.module}: {total / 1000:.1f} ms ({len(entries)} modules)")
+
+    print(f"\n{'package':<32} {'self ms':>10} {'share':>7}")
+    packages = sorted(by_package(entries).items(), key=lambda item: -item[1])
+    for package, self_us in packages[: args.top]:
+        print(f"{package:<32} {self_us / 1000:>10.1f} {self_us / total:>6.1%}")
+
+    print(f"\n{'direct import':<32} {'cumul ms':>10} {'share':>7}")
+    direct = [entry for entry in entries.values() if entry.depth == 1]
+    direct.sort(key=lambda entry: -entry.cumulative_us)
+    for entry in direct[: args.top]:
+        print(
+            f"{entry.module:<32} {entry.cumulative_us / 1000:>10.1f}"
+            f" {entry.cumulative_us / total:>6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,62 @@
+"""
+一覧取得のORMパスとCore高速パスの比較
+
+GET /questions と GET /answers をプロセス内で繰り返し呼び出し、
+1,000行あたりのCPU時間を比較します。
+
+    python -m benchmarks.bench_read_paths --questions 200 --answers 5
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import CpuTimer, app_client, reset_schema, seed
+
+import main
+
+
+async def measure(path: str, rows: int, repeat: int, fast_path: bool) -> float:
+    """1,000行あたりのCPU時間（ミリ秒）を返します。"""
+    main.READ_FAST_PATH = fast_path
+    async with app_client() as client:
+        # ウォームアップ（文のコンパイルやスキーマ構築を計測から除く）
+        response = await client.get(path)
+        assert response.status_code == 200 and len(response.json()) == rows
+
+        with CpuTimer() as timer:
+            for _ in range(repeat):
+                await client.get(path)
+    return timer.cpu * 1000 / (rows * repeat / 1000)
+
+
+async def run(args: argparse.Namespace) -> None:
+    await reset_schema()
+    await seed(args.genres, args.questions, args.answers)
+    total_questions = args.genres * args.questions
+    targets = {
+        "/questions": total_questions,
+        "/answers": total_questions * args.answers,
+    }
+
+    print(
+        f"{'path':<12} {'rows':>8} {'orm ms/1k':>12} {'core ms/1k':>12} {'speedup':>8}"
+    )
+    for path, rows in targets.items():
+        orm = await measure(path, rows, args.repeat, fast_path=False)
+        core = await measure(path, rows, args.repeat, fast_path=True)
+        print(f"{path:<12} {rows:>8} {orm:>12.2f} {core:>12.2f} {orm / core:>7.1f}x")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="一覧取得のORM/Coreパス比較")
+    parser.add_argument("--genres", type=int, default=10)
+    parser.add_argument(
+        "--questions", type=int, default=20, help="ジャンルあたりの質問数"
+    )
+    parser.add_argument("--answers", type=int, default=5, help="質問あたりの回答数")
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,387 @@
+"""
+長時間のソークテストとメモリ増加の検出
+
+main.py のルートを実際に近い比率で混ぜて呼び出し続け、一定間隔で tracemalloc の
+スナップショットとRSSを記録します。ウォームアップ後に単調に増え続けた割り当て箇所
+（get_db のセッションやアイデンティティマップの保持、SQLAlchemyのコンパイル済みキャッシュ
+など）を報告し、増加量がしきい値を超えた場合は終了コード1で終了します。
+
+    python -m benchmarks.bench_soak --duration 14400 --interval 60 --warmup 600
+
+DATABASE_URLが未指定の場合は一時ファイルのSQLiteを使用します（インメモリDBでは
+書き込んだ行がそのままRSSの増加になるため）。SQLiteは書き込みを並行できないため、
+その場合は書き込み系のルートだけを1つずつ実行します。キャッシュが上限まで埋まる間の
+増加を除くため、ウォームアップは十分に長く取ってください。
+スナップショットの取得中はイベントループが止まるため、その間のリクエストが
+デッドライン超過（504）として数えられることがあります。
+"""
+
+import os
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="soak-"), "soak.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import random  # noqa: E402
+import resource  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+import uuid  # noqa: E402
+from dataclasses import dataclass, field  # noqa: E402
+from typing import Awaitable, Callable, Dict, List, Tuple  # noqa: E402
+
+from benchmarks.common import app_client, reset_schema, seed  # noqa: E402
+from httpx import AsyncClient  # noqa: E402
+
+# 集計から除く割り当て（計測自身とimport）
+_IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_kb() -> int:
+    """現在のRSS（KB）。/proc がない環境では最大RSSで代用します。"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト単位
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+@dataclass
+class Sample:
+    elapsed: float
+    rss_kb: int
+    # 割り当て箇所（トレースバック）ごとの割り当て中のバイト数
+    sizes: Dict[str, int]
+
+
+def take_sample(started: float, frames: int) -> Sample:
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    sizes = {
+        " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback): (
+            stat.size
+        )
+        for stat in snapshot.statistics("traceback" if frames > 1 else "lineno")
+    }
+    return Sample(time.monotonic() - started, rss_kb(), sizes)
+
+
+@dataclass
+class Growth:
+    site: str
+    growth: int
+    # サンプル間で増加した割合（1.0は全ての間隔で増加）
+    increasing: float
+    sizes: List[int] = field(repr=False)
+
+
+def growing_sites(
+    samples: List[Sample], min_growth: int, min_increasing: float
+) -> List[Growth]:
+    """
+    サンプル間で単調に（min_increasing以上の割合の間隔で）増え、
+    合計の増加量がmin_growthバイト以上の割り当て箇所を増加量の多い順に返します。
+    """
+    if len(samples) < 3:
+        return []
+    intervals = len(samples) - 1
+    result = []
+    for site in samples[-1].sizes:
+        sizes = [sample.sizes.get(site, 0) for sample in samples]
+        growth = sizes[-1] - sizes[0]
+        if growth < min_growth:
+            continue
+        increases = sum(1 for a, b in zip(sizes, sizes[1:]) if b > a)
+        if increases / intervals >= min_increasing:
+            result.append(Growth(site, growth, increases / intervals, sizes))
+    return sorted(result, key=lambda g: -g.growth)
+
+
+# 書き込み系のルート
+WRITE_OPERATIONS = {"POST /answers", "POST /questions", "POST /import"}
+
+
+class Workload:
+    """ルートの呼び出しの組み合わせ（重みは実運用での参照と書き込みの比率を想定）"""
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        ids: Dict[str, List[str]],
+        serialize_writes: bool = False,
+    ):
+        self.client = client
+        self.write_lock = asyncio.Lock() if serialize_writes else None
+        self.genres = ids["genres"]
+        self.questions = ids["questions"]
+        self.answers = ids["answers"]
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.operations: List[Tuple[str, int, Callable[[], Awaitable]]] = [
+            ("GET /questions/{id}", 20, self.get_question),
+            ("GET /answers/{id}", 12, self.get_answer),
+            ("GET /questions/{id}/details", 10, self.get_details),
+            ("GET /questions/{id}/answers", 8, self.get_question_answers),
+            ("POST /questions:lookup", 6, self.lookup_questions),
+            ("POST /answers:lookup", 4, self.lookup_answers),
+            ("GET /genres/{id}/questions", 5, self.get_genre_questions),
+            ("GET /genres/{id}/questions/random", 4, self.get_random),
+            ("GET /genres/{id}/questions/unanswered", 2, self.get_unanswered),
+            ("GET /genres/{id}/tree", 2, self.get_tree),
+            ("GET /genres/{id}/stats", 2, self.get_genre_stats),
+            ("GET /questions/trending", 3, self.get_trending),
+            ("GET /genres", 3, self.get_genres),
+            ("POST /genres:lookup", 1, self.lookup_genres),
+            ("GET /changes", 2, self.get_changes),
+            ("GET /answers?question_id", 3, self.list_question_answers),
+            ("GET /questions?genre_id", 2, self.list_genre_questions),
+            ("GET /stats", 1, self.get_stats),
+            ("GET /health_check", 2, self.health_check),
+            ("POST /answers", 8, self.create_answer),
+            ("POST /questions", 1, self.create_question),
+            ("POST /import", 1, self.import_rows),
+        ]
+
+    async def run(self, deadline: float) -> None:
+        names = [name for name, _, _ in self.operations]
+        weights = [weight for _, weight, _ in self.operations]
+        calls = {name: call for name, _, call in self.operations}
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            self.requests[name] = self.requests.get(name, 0) + 1
+            try:
+                if self.write_lock is not None and name in WRITE_OPERATIONS:
+                    async with self.write_lock:
+                        response = await calls[name]()
+                else:
+                    response = await calls[name]()
+                failed = response.status_code >= 400
+                if failed:
+                    name = f"{name} ({response.status_code})"
+            except Exception as exc:
+                # 長時間の実行を止めないよう、例外もエラーとして数えて続ける
+                failed = True
+                name = f"{name} ({type(exc).__name__})"
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def _ids(self, ids: List[str], n: int) -> List[str]:
+        return random.sample(ids, min(n, len(ids)))
+
+    async def get_question(self):
+        return await self.client.get(f"/questions/{random.choice(self.questions)}")
+
+    async def get_answer(self):
+        return await self.client.get(f"/answers/{random.choice(self.answers)}")
+
+    async def get_details(self):
+        question_id = random.choice(self.questions)
+        return await self.client.get(f"/questions/{question_id}/details")
+
+    async def get_question_answers(self):
+        question_id = random.choice(self.questions)
+        return await self.client.get(f"/questions/{question_id}/answers")
+
+    async def lookup_questions(self):
+        ids = self._ids(self.questions, 20)
+        return await self.client.post("/questions:lookup", json={"ids": ids})
+
+    async def lookup_answers(self):
+        ids = self._ids(self.answers, 20)
+        return await self.client.post("/answers:lookup", json={"ids": ids})
+
+    async def lookup_genres(self):
+        ids = self._ids(self.genres, 5)
+        return await self.client.post("/genres:lookup", json={"ids": ids})
+
+    async def get_genre_questions(self):
+        return await self.client.get(f"/genres/{random.choice(self.genres)}/questions")
+
+    async def get_random(self):
+        genre_id = random.choice(self.genres)
+        return await self.client.get(f"/genres/{genre_id}/questions/random?n=5")
+
+    async def get_unanswered(self):
+        genre_id = random.choice(self.genres)
+        return await self.client.get(f"/genres/{genre_id}/questions/unanswered?n=5")
+
+    async def get_tree(self):
+        return await self.client.get(f"/genres/{random.choice(self.genres)}/tree")
+
+    async def get_genre_stats(self):
+        return await self.client.get(f"/genres/{random.choice(self.genres)}/stats")
+
+    async def get_trending(self):
+        window = random.choice(["5m", "1h", "24h"])
+        return await self.client.get(f"/questions/trending?window={window}")
+
+    async def get_genres(self):
+        return await self.client.get("/genres")
+
+    async def get_changes(self):
+        return await self.client.get("/changes?limit=100")
+
+    async def list_question_answers(self):
+        return await self.client.get(
+            f"/answers?question_id={random.choice(self.questions)}"
+        )
+
+    async def list_genre_questions(self):
+        return await self.client.get(
+            f"/questions?genre_id={random.choice(self.genres)}"
+        )
+
+    async def get_stats(self):
+        return await self.client.get("/stats?days=7")
+
+    async def health_check(self):
+        return await self.client.get("/health_check")
+
+    async def create_answer(self):
+        body = {"question_id": random.choice(self.questions), "answer": "ソーク回答"}
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        response = await self.client.post("/answers", json=body, headers=headers)
+        if random.random() < 0.1:
+            # タイムアウト後の再送を想定して同じキーで送り直す
+            await self.client.post("/answers", json=body, headers=headers)
+        return response
+
+    async def create_question(self):
+        body = {"genre_id": random.choice(self.genres), "question": "ソーク質問"}
+        return await self.client.post("/questions", json=body)
+
+    async def import_rows(self):
+        genre = f"ソーク{random.randrange(len(self.genres))}"
+        lines = [
+            json.dumps(
+                {"genre": genre, "question": f"インポート質問{i}", "answer": "回答"},
+                ensure_ascii=False,
+            )
+            for i in range(10)
+        ]
+        return await self.client.post(
+            "/import",
+            content="\n".join(lines).encode(),
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+
+def report(samples: List[Sample], growth: List[Growth], top: int) -> None:
+    print(f"{'elapsed s':>10} {'rss MB':>10} {'traced MB':>10}")
+    for sample in samples:
+        traced = sum(sample.sizes.values()) / 1024 / 1024
+        print(f"{sample.elapsed:>10.0f} {sample.rss_kb / 1024:>10.1f} {traced:>10.1f}")
+    if not growth:
+        print("\n単調に増加した割り当て箇所はありません")
+        return
+    print(f"\n{'growth KB':>10} {'increasing':>10}  site")
+    for entry in growth[:top]:
+        print(f"{entry.growth / 1024:>10.1f} {entry.increasing:>10.0%}  {entry.site}")
+
+
+async def run(args: argparse.Namespace) -> bool:
+    await reset_schema()
+    ids = await seed(args.genres, args.questions, args.answers)
+
+    tracemalloc.start(args.frames)
+    started = time.monotonic()
+    deadline = started + args.warmup + args.duration
+    samples: List[Sample] = []
+
+    async def sampler() -> None:
+        await asyncio.sleep(args.warmup)
+        while True:
+            samples.append(take_sample(started, args.frames))
+            print(
+                f"[{samples[-1].elapsed:.0f}s] rss={samples[-1].rss_kb / 1024:.1f}MB",
+                flush=True,
+            )
+            if time.monotonic() + args.interval > deadline:
+                return
+            await asyncio.sleep(args.interval)
+
+    async with app_client() as client:
+        workload = Workload(
+            client, ids, os.environ["DATABASE_URL"].startswith("sqlite")
+        )
+        await asyncio.gather(
+            sampler(),
+            *(workload.run(deadline) for _ in range(args.concurrency)),
+        )
+    tracemalloc.stop()
+
+    total = sum(workload.requests.values())
+    print(f"\nrequests: {total} ({total / (time.monotonic() - started):.0f}/s)")
+    for name, count in sorted(workload.errors.items()):
+        print(f"  errors {name}: {count}")
+
+    growth = growing_sites(samples, args.max_site_growth_kb * 1024, args.monotonic)
+    report(samples, growth, args.top)
+    rss_growth_mb = (samples[-1].rss_kb - samples[0].rss_kb) / 1024 if samples else 0
+    print(f"\nRSS growth after warmup: {rss_growth_mb:.1f} MB")
+
+    failed = bool(growth) or rss_growth_mb > args.max_rss_growth_mb
+    print("FAIL" if failed else "OK")
+    return not failed
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="ソークテストとメモリ増加の検出")
+    parser.add_argument("--duration", type=float, default=3600, help="計測時間（秒）")
+    parser.add_argument(
+        "--warmup", type=float, default=300, help="計測前のウォームアップ（秒）"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=60, help="スナップショットの間隔（秒）"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument(
+        "--questions", type=int, default=50, help="ジャンルあたりの質問数"
+    )
+    parser.add_argument("--answers", type=int, default=5, help="質問あたりの回答数")
+    parser.add_argument(
+        "--frames", type=int, default=1, help="割り当て箇所として記録するフレーム数"
+    )
+    parser.add_argument(
+        "--max-site-growth-kb",
+        type=int,
+        default=512,
+        help="単調に増えた割り当て箇所をエラーにする増加量（KB）",
+    )
+    parser.add_argument(
+        "--monotonic",
+        type=float,
+        default=0.8,
+        help="単調な増加とみなす、増加したサンプル間隔の割合",
+    )
+    parser.add_argument(
+        "--max-rss-growth-mb",
+        type=float,
+        default=64,
+        help="エラーにするウォームアップ後のRSSの増加量（MB）",
+    )
+    parser.add_argument("--top", type=int, default=20)
+    if not asyncio.run(run(parser.parse_args())):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,142 @@
+"""
+頻出クエリの文の事前構築の効果
+
+主キー検索のルートと作成時の存在確認で実行する文について、リクエストごとに
+select(...).options(...).where(...) を組み立てて実行する場合と、statements.py の
+事前に組み立てた文にパラメータを渡して実行する場合の1回あたりの時間を比較します。
+リクエストと同様に、実行ごとに新しいセッションを使用し、文の組み立てから
+session.execute の結果の取得までを計測します。
+
+    python -m benchmarks.bench_statements --repeat 2000
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+from benchmarks.common import CpuTimer, reset_schema, seed
+
+from database import AsyncSessionLocal
+from models import Answer, Genre, Question
+from sqlalchemy import Executable, select
+from sqlalchemy.orm import selectinload
+from statements import (
+    ANSWER_BY_ID,
+    GENRE_EXISTS,
+    QUESTION_BY_ID,
+    QUESTION_GENRE_ID,
+)
+
+
+@dataclass
+class Case:
+    # 文を実行するルート
+    route: str
+    # 変更前と同じく、リクエストごとに文を組み立てる
+    build: Callable[[str], Executable]
+    prepared: Executable
+    param: str
+    # 取得したORMオブジェクトを返すか（Falseは1列の値）
+    orm: bool
+
+
+CASES = [
+    Case(
+        "GET /questions/{id}",
+        lambda id_: (
+            select(Question)
+            .options(selectinload(Question.genre))
+            .where(Question.id == id_)
+        ),
+        QUESTION_BY_ID,
+        "question_id",
+        True,
+    ),
+    Case(
+        "GET /answers/{id}",
+        lambda id_: (
+            select(Answer)
+            .options(selectinload(Answer.question).selectinload(Question.genre))
+            .where(Answer.id == id_)
+        ),
+        ANSWER_BY_ID,
+        "answer_id",
+        True,
+    ),
+    Case(
+        "POST /questions",
+        lambda id_: select(Genre.id).where(Genre.id == id_),
+        GENRE_EXISTS,
+        "genre_id",
+        False,
+    ),
+    Case(
+        "POST /answers",
+        lambda id_: select(Question.genre_id).where(Question.id == id_),
+        QUESTION_GENRE_ID,
+        "question_id",
+        False,
+    ),
+]
+
+
+async def execute(stmt: Executable, params: Dict[str, Any], orm: bool) -> Any:
+    async with AsyncSessionLocal() as session:
+        if orm:
+            result = await session.execute(stmt, params)
+            return result.scalar_one()
+        return await session.scalar(stmt, params)
+
+
+async def measure_execute(
+    case: Case, id_: str, repeat: int
+) -> Dict[str, Tuple[float, float]]:
+    """1回の実行あたりの (CPU時間, ウォールクロック)（マイクロ秒）を返します。"""
+    params = {case.param: id_}
+    timings = {}
+    for name, run_once in (
+        ("rebuilt", lambda: execute(case.build(id_), {}, case.orm)),
+        ("prepared", lambda: execute(case.prepared, params, case.orm)),
+    ):
+        # ウォームアップ（コンパイル済みキャッシュへの登録を計測から除く）
+        assert await run_once() is not None
+        with CpuTimer() as timer:
+            for _ in range(repeat):
+                await run_once()
+        timings[name] = (timer.cpu * 1e6 / repeat, timer.wall * 1e6 / repeat)
+    return timings
+
+
+async def run(args: argparse.Namespace) -> None:
+    await reset_schema()
+    ids = await seed(1, 1, 1)
+    targets = {
+        "question_id": ids["questions"][0],
+        "answer_id": ids["answers"][0],
+        "genre_id": ids["genres"][0],
+    }
+
+    print(
+        f"{'route':<22} {'rebuilt cpu us':>15} {'prepared cpu us':>16}"
+        f" {'saved':>7} {'rebuilt wall us':>16} {'prepared wall us':>17}"
+    )
+    for case in CASES:
+        timings = await measure_execute(case, targets[case.param], args.repeat)
+        rebuilt_cpu, rebuilt_wall = timings["rebuilt"]
+        prepared_cpu, prepared_wall = timings["prepared"]
+        saved = (rebuilt_cpu - prepared_cpu) / rebuilt_cpu
+        print(
+            f"{case.route:<22} {rebuilt_cpu:>15.1f} {prepared_cpu:>16.1f}"
+            f" {saved:>6.1%} {rebuilt_wall:>16.1f} {prepared_wall:>17.1f}"
+        )
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="頻出クエリの文の事前構築の効果")
+    parser.add_argument("--repeat", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
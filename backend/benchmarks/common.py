@@ -0,0 +1,102 @@
+"""
+ベンチマーク共通の処理
+
+DATABASE_URLが未指定の場合はSQLiteのインメモリDBを使用するため、
+MySQLサーバーなしで実行できます。本モジュールはdatabaseより先にimportしてください。
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import time  # noqa: E402
+import uuid  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Dict, List  # noqa: E402
+
+from database import Base, engine  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from models import Answer, Genre, Question  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+
+async def reset_schema() -> None:
+    """スキーマを作り直します。"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed(
+    genres: int, questions_per_genre: int, answers_per_question: int
+) -> Dict[str, List[str]]:
+    """
+    ベンチマーク用のデータを一括投入し、作成したIDを返します。
+    """
+    now = datetime.now()
+    genre_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "genre_name": f"ジャンル{g}",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for g in range(genres)
+    ]
+    question_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "genre_id": genre["id"],
+            "question": f"{genre['genre_name']}の質問{q}",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for genre in genre_rows
+        for q in range(questions_per_genre)
+    ]
+    answer_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "question_id": question["id"],
+            "answer": f"回答{a}：" + "これはベンチマーク用の回答です。" * 4,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for question in question_rows
+        for a in range(answers_per_question)
+    ]
+
+    async with engine.begin() as conn:
+        for model, rows in (
+            (Genre, genre_rows),
+            (Question, question_rows),
+            (Answer, answer_rows),
+        ):
+            if rows:
+                await conn.execute(insert(model), rows)
+
+    return {
+        "genres": [str(row["id"]) for row in genre_rows],
+        "questions": [str(row["id"]) for row in question_rows],
+        "answers": [str(row["id"]) for row in answer_rows],
+    }
+
+
+def app_client() -> AsyncClient:
+    """アプリケーションをプロセス内で呼び出すHTTPクライアントを返します。"""
+    from main import app
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://bench")
+
+
+class CpuTimer:
+    """ウォールクロックとCPU時間を同時に計測するコンテキストマネージャ"""
+
+    def __enter__(self) -> "CpuTimer":
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
@@ -0,0 +1,284 @@
+"""
+質問・回答の本文の圧縮保存
+
+BODY_COMPRESSION=true の場合、questions.question・answers.answer（アーカイブを含む）を
+zstdで圧縮したバイナリとして保存します。日本語の文章は圧縮が効きやすく、
+ストレージ・バッファプールの使用量とレプリケーションの転送量が減ります。
+APIの入出力（schemas.py）は変わりません。
+
+- BODY_COMPRESSION_MIN_BYTES 未満の本文と、圧縮しても小さくならない本文はUTF-8のまま保存します
+- BODY_COMPRESSION_DICTS に学習済みの辞書を指定すると、短い本文でも圧縮が効きます。
+  先頭の辞書で圧縮し、展開には全ての辞書を使います（辞書を入れ替える場合は古い辞書を残します）
+- 展開は本文の列を取得したときだけ行います。存在確認など本文を返さない処理では
+  本文の列を取得しないでください
+
+zstdのフレームは先頭が 28 B5 2F FD で、UTF-8の文字列はこのバイト列で始まらないため、
+圧縮した本文とそのままの本文は保存した値だけで区別できます。
+そのため既存の行は変換しなくても読み出せます。
+
+有効にする手順（zstandardパッケージが必要です: uv sync --extra compression）::
+
+    python body_compression.py migrate          # 本文の列をバイナリに変更（MySQL）
+    python body_compression.py train --out bodies.dict
+    # BODY_COMPRESSION=true BODY_COMPRESSION_DICTS=bodies.dict で起動する
+    python body_compression.py compress         # 既存の行を圧縮（任意）
+
+有効な間は本文の列をDB側で文字列として扱えないため、SERVER_SIDE_JSON は無効になります。
+"""
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+from database import AsyncSessionLocal, engine
+from sqlalchemy import LargeBinary, Table, Text, select, text, type_coerce, update
+from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+if TYPE_CHECKING:
+    from models import Answer, ArchivedAnswer, Question
+
+    BodyModel = Union[Type[Question], Type[Answer], Type[ArchivedAnswer]]
+
+# Trueにすると本文を圧縮して保存する
+BODY_COMPRESSION = os.getenv("BODY_COMPRESSION", "false").lower() == "true"
+# このバイト数未満の本文は圧縮しない
+BODY_COMPRESSION_MIN_BYTES = int(os.getenv("BODY_COMPRESSION_MIN_BYTES", "256"))
+BODY_COMPRESSION_LEVEL = int(os.getenv("BODY_COMPRESSION_LEVEL", "3"))
+# 学習済みの辞書のパス（カンマ区切り、先頭の辞書で圧縮する）
+BODY_COMPRESSION_DICTS = [
+    path.strip()
+    for path in os.getenv("BODY_COMPRESSION_DICTS", "").split(",")
+    if path.strip()
+]
+# 辞書の学習に使う本文の数と辞書のサイズ
+TRAIN_SAMPLES = 20000
+TRAIN_DICT_SIZE = 112640
+# 既存の行を圧縮する際に1トランザクションで更新する行数
+COMPRESS_BATCH_SIZE = 500
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class BodyCodec:
+    """本文のUTF-8文字列と保存するバイト列の変換"""
+
+    def __init__(
+        self,
+        dictionaries: Sequence[bytes] = (),
+        level: int = BODY_COMPRESSION_LEVEL,
+        min_bytes: int = BODY_COMPRESSION_MIN_BYTES,
+    ):
+        # zstandardは圧縮を有効にする場合のみ必要なため、ここで読み込む
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise RuntimeError(
+                "BODY_COMPRESSION=true には zstandard パッケージが必要です"
+                "（uv sync --extra compression）"
+            ) from exc
+        self._zstd = zstandard
+        self.min_bytes = min_bytes
+        dicts = [zstandard.ZstdCompressionDict(data) for data in dictionaries]
+        self._compressor = zstandard.ZstdCompressor(
+            level=level, dict_data=dicts[0] if dicts else None
+        )
+        # フレームに記録された辞書IDごとの展開器（0は辞書なし）
+        self._decompressors = {0: zstandard.ZstdDecompressor()}
+        for d in dicts:
+            self._decompressors[d.dict_id()] = zstandard.ZstdDecompressor(dict_data=d)
+
+    def encode(self, text: str) -> bytes:
+        raw = text.encode()
+        if len(raw) < self.min_bytes:
+            return raw
+        compressed = self._compressor.compress(raw)
+        return compressed if len(compressed) < len(raw) else raw
+
+    def decode(self, data: bytes) -> str:
+        if not data.startswith(ZSTD_MAGIC):
+            return data.decode()
+        dict_id = self._zstd.get_frame_parameters(data).dict_id
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            raise RuntimeError(
+                f"辞書ID {dict_id} の辞書が BODY_COMPRESSION_DICTS にありません"
+            )
+        return decompressor.decompress(data).decode()
+
+
+_codec: Optional[BodyCodec] = None
+
+
+def get_codec() -> BodyCodec:
+    """設定の辞書を読み込んだ変換器を返します（初回のみ作成）。"""
+    global _codec
+    if _codec is None:
+        _codec = BodyCodec([Path(path).read_bytes() for path in BODY_COMPRESSION_DICTS])
+    return _codec
+
+
+class CompressedText(TypeDecorator):
+    """
+    BODY_COMPRESSION が有効な場合に圧縮して保存するテキスト型
+
+    無効の場合はTextと同じです。有効の場合、DDLではバイナリの列になります。
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine[Any]:
+        if BODY_COMPRESSION:
+            return dialect.type_descriptor(LargeBinary())
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value: Optional[str], dialect: Dialect) -> Any:
+        if value is None or not BODY_COMPRESSION:
+            return value
+        return get_codec().encode(value)
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> Optional[str]:
+        # 無効にした後も、圧縮して保存した行は展開して返す
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return get_codec().decode(bytes(value))
+        return value
+
+
+def _body_columns() -> Dict[str, Tuple["BodyModel", Any]]:
+    """本文の列（テーブル名.列名 -> (モデル, 列)）"""
+    # models が本モジュールを読み込むため、ここで読み込む
+    from models import Answer, ArchivedAnswer, Question
+
+    return {
+        "questions.question": (Question, Question.question),
+        "answers.answer": (Answer, Answer.answer),
+        "answers_archive.answer": (ArchivedAnswer, ArchivedAnswer.answer),
+    }
+
+
+async def migrate_columns(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """本文の列をバイナリ（BLOB）に変更します（MySQLのみ。SQLiteは変更不要）。"""
+    async with session_factory() as session:
+        if session.get_bind().dialect.name != "mysql":
+            return
+        for name in _body_columns():
+            table, column = name.split(".")
+            # TEXTからBLOBへの変更ではバイト列はそのまま保持される
+            await session.execute(
+                text(f"ALTER TABLE {table} MODIFY {column} BLOB NOT NULL")
+            )
+
+
+async def train_dictionary(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    samples: int = TRAIN_SAMPLES,
+    dict_size: int = TRAIN_DICT_SIZE,
+) -> bytes:
+    """最近の質問・回答の本文から辞書を学習し、辞書のバイト列を返します。"""
+    zstandard = get_codec()._zstd
+    columns = _body_columns()
+    bodies: List[bytes] = []
+    async with session_factory() as session:
+        for name in ("questions.question", "answers.answer"):
+            model, column = columns[name]
+            result = await session.scalars(
+                select(column).order_by(model.created_at.desc()).limit(samples)
+            )
+            bodies += [body.encode() for body in result]
+    return zstandard.train_dictionary(dict_size, bodies).as_bytes()
+
+
+async def compress_rows(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+) -> int:
+    """UTF-8のまま保存されている既存の本文を圧縮し、更新した行数を返します。"""
+    codec = get_codec()
+    updated = 0
+    async with session_factory() as session:
+        for model, column in _body_columns().values():
+            table = cast(Table, model.__table__)
+            # 保存されているバイト列をそのまま読み書きする
+            raw = type_coerce(table.c[column.key], LargeBinary)
+            last_id = ""
+            while True:
+                result = await session.execute(
+                    select(table.c.id, raw)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(COMPRESS_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                for row_id, value in rows:
+                    value = value.encode() if isinstance(value, str) else bytes(value)
+                    if value.startswith(ZSTD_MAGIC):
+                        continue
+                    encoded = codec.encode(value.decode())
+                    if encoded == value:
+                        continue
+                    # 内容は変わらないため、更新日時（変更フィード）は変えない
+                    await session.execute(
+                        update(table)
+                        .where(table.c.id == row_id)
+                        .values(
+                            {
+                                column.key: type_coerce(encoded, LargeBinary),
+                                "updated_at": table.c.updated_at,
+                            }
+                        )
+                    )
+                    updated += 1
+                await session.commit()
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="質問・回答の本文の圧縮")
+    parser.add_argument("command", choices=["migrate", "train", "compress"])
+    parser.add_argument("--out", type=Path, default=Path("bodies.dict"))
+    parser.add_argument("--samples", type=int, default=TRAIN_SAMPLES)
+    parser.add_argument("--dict-size", type=int, default=TRAIN_DICT_SIZE)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        try:
+            if args.command == "migrate":
+                await migrate_columns()
+                print("migrated: " + ", ".join(_body_columns()))
+            elif args.command == "train":
+                data = await train_dictionary(
+                    samples=args.samples, dict_size=args.dict_size
+                )
+                args.out.write_bytes(data)
+                print(f"dictionary: {args.out} ({len(data)} bytes)")
+            else:
+                if not BODY_COMPRESSION:
+                    parser.error("BODY_COMPRESSION=true を指定してください")
+                print(f"compressed: {await compress_rows()}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+CSV / JSONL の一括インポート
+
+アップロードされたリクエストボディをチャンク単位で受け取りながら1行ずつ解析し、
+ファイル全体をメモリに保持せずにジャンル・質問・回答を登録します。
+
+1行（1レコード）は genre / question / answer の3項目からなります。
+
+- genre: ジャンル名（必須）。既存のジャンル名はIDに解決し、未登録の場合は作成します
+- question: 質問内容（任意）。同じインポート内の同じジャンル・質問内容は1件にまとめます
+- answer: 回答内容（任意、questionが必要）
+
+ジャンル名とIDの対応は開始時に読み込んだメモリ上の辞書で解決し、
+行はチャンクごとに複数行INSERTでまとめて1トランザクションで書き込みます。
+不正な行はスキップしてエラーとして報告し、残りの行の取り込みは続けます。
+"""
+
+import codecs
+import csv
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+import genre_stats
+import outbox
+from models import Answer, Genre, OutboxEvent, Question
+from pydantic import ValidationError
+from schemas import AnswerBase, GenreCreate, QuestionBase
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "jsonl"]
+
+# 1トランザクションで書き込む行数
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_CHUNK_SIZE = 5000
+# レスポンスに含める行エラーの上限（件数は全て数える）
+IMPORT_MAX_ERRORS = 100
+
+CONTENT_TYPES: Dict[str, ImportFormat] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+# (行番号, レコード, エラー)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(content_type: Optional[str]) -> Optional[ImportFormat]:
+    """Content-Typeからインポート形式を判定します。"""
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """バイト列のチャンクを改行付きの行に分割します（UTF-8、BOMは除去）。"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        # 改行で終わっていない最後の行は次のチャンクと結合する
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_jsonl_records(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"JSONとして解析できません: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "JSONオブジェクトではありません"
+            continue
+        yield line_no, record, None
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """
+    1行目をヘッダーとしてCSVを解析します。
+
+    引用符で囲まれた改行を含むレコードは、引用符の数が偶数になるまで行を結合します。
+    """
+    header: Optional[List[str]] = None
+    buffer = ""
+    start_line = line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not buffer:
+            start_line = line_no
+        buffer += line
+        if buffer.count('"') % 2:
+            continue
+        text, buffer = buffer, ""
+        if not text.strip():
+            continue
+        try:
+            row = next(csv.reader([text]))
+        except csv.Error as e:
+            yield start_line, None, f"CSVとして解析できません: {e}"
+            continue
+        if header is None:
+            header = [column.strip().lower() for column in row]
+            continue
+        if len(row) != len(header):
+            yield start_line, None, f"列数が一致しません（{len(row)}列）"
+            continue
+        yield start_line, dict(zip(header, row)), None
+    if buffer:
+        yield start_line, None, "引用符が閉じられていません"
+
+
+def iter_records(
+    chunks: AsyncIterator[bytes], import_format: ImportFormat
+) -> AsyncIterator[Record]:
+    lines = iter_lines(chunks)
+    if import_format == "csv":
+        return iter_csv_records(lines)
+    return iter_jsonl_records(lines)
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    inserted: Dict[str, int] = field(
+        default_factory=lambda: {"genres": 0, "questions": 0, "answers": 0}
+    )
+    error_count: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    chunks: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "chunks": self.chunks,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def _text(record: Dict[str, Any], key: str) -> Optional[str]:
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value)
+    return value if value.strip() else None
+
+
+class BulkImporter:
+    """
+    レコードをチャンク単位で書き込むインポーター
+
+    ジャンル名・質問のIDはメモリ上の辞書で解決します。チャンクの書き込みに失敗した場合は
+    そのチャンクの行をエラーとして報告し、辞書に追加した対応も取り消します。
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.result = ImportResult()
+        self.genre_ids: Dict[str, str] = {}
+        self.question_ids: Dict[Tuple[str, str], str] = {}
+        # 質問ID -> ジャンルID（統計のロールアップ用）
+        self.question_genres: Dict[str, str] = {}
+        self._genres: List[Dict[str, Any]] = []
+        self._questions: List[Dict[str, Any]] = []
+        self._answers: List[Dict[str, Any]] = []
+        self._lines: List[int] = []
+
+    async def load_genres(self) -> None:
+        result = await self.db.execute(select(Genre.genre_name, Genre.id))
+        self.genre_ids = dict(result.all())
+
+    async def run(self, records: AsyncIterator[Record]) -> ImportResult:
+        await self.load_genres()
+        async for line_no, record, error in records:
+            self.result.rows += 1
+            if error is not None:
+                self.result.add_error(line_no, error)
+                continue
+            # エラーでない場合は必ずレコードがある
+            assert record is not None
+            try:
+                self.add(line_no, record)
+            except ValueError as e:
+                self.result.add_error(line_no, str(e))
+                continue
+            if len(self._lines) >= self.chunk_size:
+                await self.flush()
+        await self.flush()
+        self.result.elapsed = time.perf_counter() - self.result.started_at
+        return self.result
+
+    def add(self, line_no: int, record: Dict[str, Any]) -> None:
+        """1レコードを検証して書き込み待ちに追加します。不正な場合はValueErrorを送出します。"""
+        genre_name = _text(record, "genre")
+        question = _text(record, "question")
+        answer = _text(record, "answer")
+        if genre_name is None:
+            raise ValueError("genreは必須です")
+        if answer is not None and question is None:
+            raise ValueError("answerにはquestionが必要です")
+        try:
+            GenreCreate(genre_name=genre_name)
+            if question is not None:
+                QuestionBase(question=question)
+            if answer is not None:
+                AnswerBase(answer=answer)
+        except ValidationError as e:
+            message = e.errors()[0]
+            raise ValueError(f"{message['loc'][0]}: {message['msg']}")
+
+        genre_id = self.genre_ids.get(genre_name)
+        if genre_id is None:
+            genre_id = self.genre_ids[genre_name] = str(uuid.uuid4())
+            self._genres.append({"id": genre_id, "genre_name": genre_name})
+        if question is not None:
+            question_id = self.question_ids.get((genre_id, question))
+            if question_id is None:
+                question_id = str(uuid.uuid4())
+                self.question_ids[(genre_id, question)] = question_id
+                self.question_genres[question_id] = genre_id
+                self._questions.append(
+                    {"id": question_id, "genre_id": genre_id, "question": question}
+                )
+            if answer is not None:
+                self._answers.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "question_id": question_id,
+                        "answer": answer,
+                    }
+                )
+        self._lines.append(line_no)
+
+    async def flush(self) -> None:
+        """書き込み待ちの行を1トランザクションで書き込みます。"""
+        if not self._lines:
+            return
+        batches = [
+            ("genres", Genre, "genre.created", self._genres),
+            ("questions", Question, "question.created", self._questions),
+            ("answers", Answer, "answer.created", self._answers),
+        ]
+        try:
+            for _, model, event_type, rows in batches:
+                if not rows:
+                    continue
+                await self.db.execute(insert(model), rows)
+                if outbox.OUTBOX_ENABLED:
+                    await self.db.execute(
+                        insert(OutboxEvent),
+                        [
+                            {
+                                "event_type": event_type,
+                                "aggregate_id": row["id"],
+                                "payload": json.dumps(row, ensure_ascii=False),
+                            }
+                            for row in rows
+                        ],
+                    )
+            await genre_stats.record_genres(self.db, [g["id"] for g in self._genres])
+            await genre_stats.record_questions(
+                self.db, [(q["genre_id"], q["id"]) for q in self._questions]
+            )
+            await genre_stats.record_answers(
+                self.db,
+                [
+                    (self.question_genres[a["question_id"]], a["question_id"])
+                    for a in self._answers
+                ],
+            )
+            await self.db.commit()
+        except DBAPIError as e:
+            await self.db.rollback()
+            self._forget(self._genres, self._questions)
+            self.result.add_error(
+                self._lines[0],
+                f"{self._lines[0]}-{self._lines[-1]}行目の書き込みに失敗しました: "
+                f"{e.orig}",
+            )
+        else:
+            for key, _, _, rows in batches:
+                self.result.inserted[key] += len(rows)
+            self.result.chunks += 1
+            logger.info(
+                "import: %d行 処理済み（%.0f行/秒）",
+                self.result.rows,
+                self.result.rows
+                / max(time.perf_counter() - self.result.started_at, 1e-9),
+            )
+        self._genres, self._questions, self._answers, self._lines = [], [], [], []
+
+    def _forget(
+        self, genres: List[Dict[str, Any]], questions: List[Dict[str, Any]]
+    ) -> None:
+        """書き込めなかったジャンル・質問をIDの辞書から取り除きます。"""
+        for genre in genres:
+            self.genre_ids.pop(genre["genre_name"], None)
+        for question in questions:
+            self.question_ids.pop((question["genre_id"], question["question"]), None)
+            self.question_genres.pop(question["id"], None)
@@ -0,0 +1,157 @@
+"""
+更新日時による差分取得（変更フィード）
+
+ジャンル・質問・回答のうち、カーソルが指す位置より後に更新された行を
+(updated_at, id) の順で取得します。各テーブルは (updated_at, id) の複合インデックスを
+範囲検索するため、取得コストはデータ全体ではなく差分の件数に比例します。
+
+3テーブルはそれぞれ同じ条件で先頭limit件を取得し、(updated_at, id) の順にマージして
+先頭limit件を返します。カーソルは不透明な文字列で、次回のリクエストにそのまま渡すと
+続きから再開できます。
+
+updated_atはDBが文の実行時に設定するため、同じ時刻より前の行が後からコミットされることがあります。
+取りこぼしを防ぐため、続きがなくなった時点のカーソルは、これまでに返した最大の更新日時から
+CHANGES_OVERLAP_SECONDS 秒だけ巻き戻した位置を指します。この範囲の行は次回も返されるため、
+クライアントは (id, updated_at) で重複を除いてください。
+
+回答をシャーディングしている場合（answer_shards.py）、回答は各シャードから同じ条件で
+先頭limit件を取得してマージするため、カーソルはそのまま全シャードに対して使えます。
+"""
+
+import base64
+import binascii
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
+
+from answer_shards import AnswerShards
+from fastapi import HTTPException
+from models import Answer, Genre, Question
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 1回のリクエストで返す変更の件数の上限
+CHANGES_MAX_LIMIT = 1000
+# 続きがなくなった時点で巻き戻す時間（秒）。コミットまでにかかる時間より長くする
+CHANGES_OVERLAP_SECONDS = float(os.getenv("CHANGES_OVERLAP_SECONDS", "5"))
+
+# 変更フィードの対象のモデル（いずれもid列とupdated_at列を持つ）
+ChangeModel = Union[Type[Genre], Type[Question], Type[Answer]]
+
+# レスポンスのキーとテーブルの対応
+CHANGE_TABLES: Dict[str, ChangeModel] = {
+    "genres": Genre,
+    "questions": Question,
+    "answers": Answer,
+}
+
+
+class Cursor(NamedTuple):
+    # 次に返す行はこの (updated_at, id) より後
+    after: Tuple[datetime, str]
+    # これまでに返した最大の更新日時
+    high: datetime
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """カーソルを不透明な文字列にします。"""
+    (after_at, after_id), high = cursor
+    payload = json.dumps(
+        [after_at.isoformat(), after_id, high.isoformat()], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """カーソル文字列を戻します。不正な場合は400エラーを送出します。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_at, after_id, high = json.loads(base64.urlsafe_b64decode(padded))
+        return Cursor(
+            (datetime.fromisoformat(after_at), str(after_id)),
+            datetime.fromisoformat(high),
+        )
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="カーソルの形式が正しくありません")
+
+
+async def _fetch_table(
+    db: AsyncSession,
+    model: ChangeModel,
+    after: Optional[Tuple[datetime, str]],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """1テーブル分の変更を (updated_at, id) の順に先頭limit件取得します。"""
+    query = (
+        select(*model.__table__.columns)
+        .order_by(model.updated_at, model.id)
+        .limit(limit)
+    )
+    if after is not None:
+        after_at, after_id = after
+        query = query.where(
+            or_(
+                model.updated_at > after_at,
+                and_(model.updated_at == after_at, model.id > after_id),
+            )
+        )
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result]
+
+
+async def _fetch_sharded_answers(
+    shards: AnswerShards, after: Optional[Tuple[datetime, str]], limit: int
+) -> List[Dict[str, Any]]:
+    """全シャードの回答の変更を (updated_at, id) の順にマージして先頭limit件を返します。"""
+    per_shard = await shards.gather(
+        lambda session: _fetch_table(session, Answer, after, limit)
+    )
+    merged = heapq.merge(*per_shard, key=lambda row: (row["updated_at"], row["id"]))
+    return list(merged)[:limit]
+
+
+async def fetch_changes(
+    db: AsyncSession,
+    since: Optional[str],
+    limit: int,
+    answer_shards: Optional[AnswerShards] = None,
+) -> Dict[str, Any]:
+    """
+    カーソル以降の変更をテーブルごとに取得します。
+
+    続きがある間は最後に返した行の直後を、続きがなくなった時点では
+    最大の更新日時から重複範囲だけ巻き戻した位置を次のカーソルとします。
+    """
+    cursor = decode_cursor(since) if since else None
+    after = cursor.after if cursor else None
+
+    # 各テーブルの先頭limit件を (updated_at, id) の順にマージする
+    # （limit + 1件取得して続きの有無を判定する）
+    per_table = []
+    for key, model in CHANGE_TABLES.items():
+        if model is Answer and answer_shards is not None:
+            rows = await _fetch_sharded_answers(answer_shards, after, limit + 1)
+        else:
+            rows = await _fetch_table(db, model, after, limit + 1)
+        per_table.append([(row["updated_at"], row["id"], key, row) for row in rows])
+    merged = list(heapq.merge(*per_table, key=lambda item: (item[0], item[1])))
+    page = merged[:limit]
+    has_more = len(merged) > limit
+
+    changes: Dict[str, Any] = {key: [] for key in CHANGE_TABLES}
+    for _, _, key, row in page:
+        changes[key].append(row)
+
+    high = cursor.high if cursor else None
+    next_cursor: Optional[str] = None
+    if page:
+        last_at, last_id, _, _ = page[-1]
+        high = max(high, last_at) if high else last_at
+        if has_more:
+            next_cursor = encode_cursor(Cursor((last_at, last_id), high))
+    if high is not None and not has_more:
+        overlap_start = (high - timedelta(seconds=CHANGES_OVERLAP_SECONDS), "")
+        next_cursor = encode_cursor(Cursor(overlap_start, high))
+    return {**changes, "next_cursor": next_cursor, "has_more": has_more}
@@ -1,7 +1,16 @@
 import os
+from typing import Any, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
 
 # 本番環境では.envファイルを読み込まない
 # 開発環境でのみdotenvを使用
@@ -15,10 +24,71 @@ except ImportError:
     pass
 
 # データベース接続URL
-DATABASE_URL = f"mysql+aiomysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+# DATABASE_URLが指定されていればそれを使用し（例: sqlite+aiosqlite:// でインメモリ）、
+# 指定がなければDB_*の環境変数からMySQLの接続URLを組み立てる
+DATABASE_URL = (
+    os.getenv("DATABASE_URL")
+    or f"mysql+aiomysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+)
+
+# コネクションプールの設定
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# 接続ごとにキャッシュするプリペアドステートメントの数（ドライバが対応している場合のみ）
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+
+def _on_sqlite_connect(dbapi_connection: Any, connection_record: Any) -> None:
+    # ドライバ独自のトランザクション制御を無効にし、BEGINはSQLAlchemy側で発行する
+    # （SAVEPOINTを正しく扱うため）
+    dbapi_connection.isolation_level = None
+    # SQLiteは既定で外部キー制約が無効なため、MySQLと挙動を揃える
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _on_sqlite_begin(conn: Any) -> None:
+    conn.exec_driver_sql("BEGIN")
+
+
+def create_engine_from_url(url: str) -> AsyncEngine:
+    """
+    接続URLのダイアレクトに合わせた設定でエンジンを作成します。
+
+    SQLiteのインメモリDBは接続ごとに別のDBになるため、
+    単一の接続を共有するStaticPoolを使用します。
+
+    SQLiteは準備したステートメントを接続ごとにキャッシュするため、その数を
+    DB_STATEMENT_CACHE_SIZE にします。aiomysqlはテキストプロトコルのみで
+    サーバー側のプリペアドステートメントに対応していないため、MySQLでは
+    SQLAlchemyのコンパイル済みキャッシュ（statements.py）のみが効きます。
+    """
+    kwargs: Dict[str, Any] = {"echo": False}  # 本番ではechoをFalseに
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        connect_args: Dict[str, Any] = {"cached_statements": DB_STATEMENT_CACHE_SIZE}
+        if parsed.database in (None, "", ":memory:"):
+            connect_args["check_same_thread"] = False
+            kwargs.update(poolclass=StaticPool)
+        kwargs.update(connect_args=connect_args)
+    else:
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    new_engine = create_async_engine(url, **kwargs)
+    if parsed.get_backend_name() == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _on_sqlite_connect)
+        event.listen(new_engine.sync_engine, "begin", _on_sqlite_begin)
+    return new_engine
+
 
 # エンジンの作成
-engine = create_async_engine(DATABASE_URL, echo=False)  # 本番ではechoをFalseに
+engine = create_engine_from_url(DATABASE_URL)
 
 # セッションの作成
 AsyncSessionLocal = async_sessionmaker(
@@ -31,6 +101,11 @@ class Base(DeclarativeBase):
     pass
 
 
+# 依存関数：セッションファクトリの取得（レスポンス送信中もセッションを保持する場合）
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return AsyncSessionLocal
+
+
 # 依存関数：データベースセッションの取得
 async def get_db():
     async with AsyncSessionLocal() as session:
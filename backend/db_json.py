@@ -0,0 +1,172 @@
+"""
+DB側でのJSON生成
+
+質問の詳細（/questions/{id}/details）とジャンル別の質問一覧（/genres/{id}/questions）について、
+レスポンスのJSON文書全体をDBの JSON_OBJECT / JSON_ARRAYAGG（SQLiteでは json_object /
+json_group_array）で組み立て、1回のクエリで返された文字列をそのままレスポンスにします。
+ORMオブジェクトの生成・辞書への詰め替え・JSONエンコードを行わないため、
+回答数が多くてもPython側のCPU時間はほぼ一定です。
+文書はDB側でバイナリにキャストし、ドライバが返したUTF-8のバイト列を
+文字列へのデコード・再エンコードなしにそのままレスポンスの本文にします。
+
+日時はPython側と同じISO 8601形式（マイクロ秒が0の場合は省略）に変換します。
+MySQLのJSONオブジェクトはキーを並べ替えて保持するため、キーの順序はPython側と異なります。
+"""
+
+import os
+from typing import Any, Optional
+
+from body_compression import BODY_COMPRESSION
+from fastapi import Response
+from models import Answer, Genre, Question
+from sqlalchemy import JSON, LargeBinary, String, case, cast, func, select
+from sqlalchemy.dialects.mysql import BINARY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+# Trueにすると対象ルートのJSONをDB側で生成する
+# （本文を圧縮して保存している場合はDB側で本文を扱えないため無効）
+SERVER_SIDE_JSON = (
+    os.getenv("SERVER_SIDE_JSON", "false").lower() == "true" and not BODY_COMPRESSION
+)
+
+
+class _Dialect:
+    """方言ごとのJSON関数の違いを吸収します。"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def iso(self, column: Any) -> ColumnElement:
+        """日時をPython（pydantic）と同じISO 8601文字列にします。"""
+        if self.name == "mysql":
+            return case(
+                (
+                    func.microsecond(column) == 0,
+                    func.date_format(column, "%Y-%m-%dT%H:%i:%s"),
+                ),
+                else_=func.date_format(column, "%Y-%m-%dT%H:%i:%s.%f"),
+            )
+        # SQLiteは 'YYYY-MM-DD HH:MM:SS.ffffff' 形式の文字列で保存している
+        return func.replace(func.replace(column, " ", "T"), ".000000", "")
+
+    def array_agg(self, value: ColumnElement) -> ColumnElement:
+        if self.name == "mysql":
+            return func.json_arrayagg(value)
+        return func.json_group_array(value)
+
+    def as_json(self, subquery: ColumnElement) -> ColumnElement:
+        """スカラーサブクエリの結果を文字列ではなくJSONとして埋め込みます。"""
+        if self.name == "mysql":
+            return cast(subquery, JSON)
+        return func.json(subquery)
+
+    def as_bytes(self, document: ColumnElement) -> ColumnElement:
+        """JSON文書を文字列ではなくUTF-8のバイト列として取得します。"""
+        if self.name == "mysql":
+            return cast(document, BINARY())
+        return cast(document, LargeBinary)
+
+    def array(self, subquery: ColumnElement) -> ColumnElement:
+        """集約結果のJSON配列（0件の場合は空配列）"""
+        return func.coalesce(self.as_json(subquery), func.json_array())
+
+
+def _genre_object(d: _Dialect) -> ColumnElement:
+    return func.json_object(
+        "id",
+        Genre.id,
+        "genre_name",
+        Genre.genre_name,
+        "created_at",
+        d.iso(Genre.created_at),
+        "updated_at",
+        d.iso(Genre.updated_at),
+    )
+
+
+def _question_fields(d: _Dialect) -> list:
+    return [
+        "id",
+        Question.id,
+        "question",
+        Question.question,
+        "genre_id",
+        Question.genre_id,
+        "created_at",
+        d.iso(Question.created_at),
+        "updated_at",
+        d.iso(Question.updated_at),
+    ]
+
+
+def _answer_object(d: _Dialect) -> ColumnElement:
+    return func.json_object(
+        "id",
+        Answer.id,
+        "answer",
+        Answer.answer,
+        "question_id",
+        Answer.question_id,
+        "created_at",
+        d.iso(Answer.created_at),
+        "updated_at",
+        d.iso(Answer.updated_at),
+    )
+
+
+async def fetch_question_details_json(
+    db: AsyncSession, question_id: str
+) -> Optional[bytes]:
+    """質問・ジャンル・回答をまとめたJSON文書を返します。質問がない場合はNoneを返します。"""
+    d = _Dialect(db.get_bind().dialect.name)
+    answers = (
+        select(d.array_agg(_answer_object(d)))
+        .where(Answer.question_id == Question.id)
+        .scalar_subquery()
+    )
+    answer_count = (
+        select(func.count()).where(Answer.question_id == Question.id).scalar_subquery()
+    )
+    document = func.json_object(
+        "question",
+        func.json_object(*_question_fields(d), "genre", _genre_object(d)),
+        "answers",
+        d.array(answers),
+        "answer_count",
+        answer_count,
+        type_=String,
+    )
+    result = await db.execute(
+        select(d.as_bytes(document))
+        .join(Genre, Genre.id == Question.genre_id)
+        .where(Question.id == question_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def fetch_genre_questions_json(
+    db: AsyncSession, genre_id: str
+) -> Optional[bytes]:
+    """ジャンルに属する質問のJSON配列を返します。ジャンルがない場合はNoneを返します。"""
+    d = _Dialect(db.get_bind().dialect.name)
+    questions = (
+        select(d.array_agg(func.json_object(*_question_fields(d))))
+        .where(Question.genre_id == Genre.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            d.as_bytes(
+                func.coalesce(d.as_json(questions), func.json_array(), type_=String)
+            )
+        )
+        .select_from(Genre)
+        .where(Genre.id == genre_id)
+    )
+    return result.scalar_one_or_none()
+
+
+def json_document_response(document: bytes) -> Response:
+    """DBが生成したJSON文書のバイト列をそのままレスポンスにします。"""
+    return Response(content=document, media_type="application/json")
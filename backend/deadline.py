@@ -0,0 +1,250 @@
+"""
+リクエストのデッドライン管理
+
+ルートクラスごとにリクエスト全体の制限時間を設け、次の3つの仕組みで
+長時間実行されるクエリがコネクションプールを占有し続けることを防ぎます。
+
+- 残り時間を MySQL の MAX_EXECUTION_TIME ヒントとして各SELECTに付与する
+- クライアントが切断した時点でハンドラ（実行中のクエリを含む）をキャンセルする
+- 制限時間を超えた場合は 504 を返す
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from admission import classify_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class DeadlineExceeded(Exception):
+    """リクエストのデッドラインを超過した場合の例外"""
+
+
+def _timeout_from_env(name: str, default: str) -> Optional[float]:
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+
+# ルートクラスごとの制限時間（秒）。0以下の場合は制限しない
+REQUEST_TIMEOUTS: Dict[str, Optional[float]] = {
+    "light": None,
+    "write": _timeout_from_env("REQUEST_TIMEOUT_WRITE", "5"),
+    "read": _timeout_from_env("REQUEST_TIMEOUT_READ", "3"),
+    "heavy": _timeout_from_env("REQUEST_TIMEOUT_HEAVY", "10"),
+}
+
+# エクスポート・インポートはリクエスト・レスポンス自体が長時間になるため制限しない
+_NO_DEADLINE_PREFIXES = ("/export/", "/import")
+
+# MySQLの「最大実行時間超過」エラー（ER_QUERY_TIMEOUT）
+_MYSQL_QUERY_TIMEOUT = 3024
+
+# 現在のリクエストのデッドライン（イベントループ時刻）
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+def request_timeout(
+    method: str, path: str, query_string: bytes = b""
+) -> Optional[float]:
+    """リクエストに適用する制限時間（秒）を返します。"""
+    if path.startswith(_NO_DEADLINE_PREFIXES):
+        return None
+    return REQUEST_TIMEOUTS[classify_request(method, path, query_string)]
+
+
+def remaining_ms() -> Optional[int]:
+    """
+    現在のリクエストの残り時間をミリ秒で返します。
+
+    デッドラインが設定されていない場合はNoneを返します。
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return int((deadline - asyncio.get_running_loop().time()) * 1000)
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """MySQLのMAX_EXECUTION_TIME超過によるエラーかどうかを判定します。"""
+    if isinstance(exc, DeadlineExceeded):
+        return True
+    if isinstance(exc, DBAPIError) and exc.orig is not None:
+        args: Tuple[Any, ...] = getattr(exc.orig, "args", ())
+        return bool(args) and args[0] == _MYSQL_QUERY_TIMEOUT
+    return False
+
+
+def _add_max_execution_time(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> tuple:
+    ms = remaining_ms()
+    if ms is None:
+        return statement, parameters
+    if ms <= 0:
+        raise DeadlineExceeded()
+    # ヒントはSELECTキーワードの直後にのみ置ける。
+    # 文字列として付与するためコンパイル済みキャッシュには影響しない
+    if statement[:6].upper() == "SELECT":
+        statement = f"SELECT /*+ MAX_EXECUTION_TIME({ms}) */{statement[6:]}"
+    return statement, parameters
+
+
+def install_statement_timeout(engine: AsyncEngine | Engine) -> None:
+    """MySQLエンジンに MAX_EXECUTION_TIME ヒントを付与するイベントを登録します。"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if sync_engine.dialect.name != "mysql":
+        return
+    event.listen(
+        sync_engine, "before_cursor_execute", _add_max_execution_time, retval=True
+    )
+
+
+class DeadlineMiddleware:
+    """
+    デッドラインとクライアント切断を監視するASGIミドルウェア
+
+    リクエストボディの受信完了後（ボディのないリクエストでは直ちに）クライアントの
+    切断を待ち受け、切断またはデッドライン超過の時点でハンドラのタスクをキャンセルします。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = request_timeout(
+            scope["method"], scope["path"], scope.get("query_string", b"")
+        )
+        loop = asyncio.get_running_loop()
+        token = _deadline.set(loop.time() + timeout if timeout is not None else None)
+        try:
+            await self._run(scope, receive, send, timeout)
+        finally:
+            _deadline.reset(token)
+
+    async def _run(
+        self, scope: Scope, receive: Receive, send: Send, timeout: Optional[float]
+    ) -> None:
+        body_received = asyncio.Event()
+        disconnected: asyncio.Future[Message] = (
+            asyncio.get_running_loop().create_future()
+        )
+        response_started = False
+        response_complete = False
+        # GETなどボディのないリクエストのハンドラはreceive()を呼ばないため、
+        # ボディの受信を待たずに切断の待ち受けを始める。
+        # 空のボディはここで返し、サーバーからのメッセージはウォッチャーが読み捨てる
+        empty_body_pending = not _has_body(scope)
+        if empty_body_pending:
+            body_received.set()
+
+        async def wrapped_receive() -> Message:
+            nonlocal empty_body_pending
+            if empty_body_pending:
+                empty_body_pending = False
+                return {"type": "http.request", "body": b"", "more_body": False}
+            if body_received.is_set():
+                # ボディ受信後はウォッチャーが受け取る切断メッセージを共有する
+                return await asyncio.shield(disconnected)
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                if not disconnected.done():
+                    disconnected.set_result(message)
+                body_received.set()
+            elif not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal response_started, response_complete
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+            await send(message)
+
+        async def watch_disconnect() -> None:
+            await body_received.wait()
+            if disconnected.done():
+                return
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set_result(message)
+                    return
+
+        async def run_app() -> None:
+            await self.app(scope, wrapped_receive, wrapped_send)
+
+        app_task = asyncio.create_task(run_app())
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, watcher},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if app_task in done or response_complete:
+                # レスポンス送信後の後処理（セッションのクローズなど）はキャンセルしない
+                await app_task
+                return
+
+            # クライアント切断またはデッドライン超過
+            app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                pass
+            if watcher not in done and not response_started:
+                await send_timeout_response(send)
+        finally:
+            watcher.cancel()
+            if not app_task.done():
+                app_task.cancel()
+
+
+def _has_body(scope: Scope) -> bool:
+    """リクエストにボディがあるか（Content-LengthまたはTransfer-Encodingの有無）"""
+    for name, value in scope.get("headers", []):
+        if name == b"transfer-encoding" or (
+            name == b"content-length" and value.strip() != b"0"
+        ):
+            return True
+    return False
+
+
+async def send_timeout_response(send: Send) -> None:
+    """504 Gateway Timeout を送信します。"""
+    body = json.dumps(
+        {"detail": "リクエストの処理がタイムアウトしました"}, ensure_ascii=False
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
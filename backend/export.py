@@ -0,0 +1,257 @@
+"""
+Q&Aコーパスの列指向エクスポート
+
+genres / questions / answers の各テーブルをチャンク単位で読み出し、
+Parquet もしくは Arrow IPC ストリームとして書き出します。
+メモリ使用量はチャンクサイズに比例し、テーブル全体を保持しません。
+
+コマンドラインからの利用例::
+
+    python export.py --format parquet --out-dir ./export
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Literal, Sequence
+
+from database import AsyncSessionLocal, engine
+from models import Answer, Genre, Question
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import InstrumentedAttribute
+
+# pyarrowはエクスポート機能を使う場合のみ必要。読み込みに時間がかかるため
+# アプリの起動時には読み込まず、最初のエクスポートで読み込む
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+ExportTable = Literal["genres", "questions", "answers"]
+ExportFormat = Literal["parquet", "arrow"]
+
+EXPORT_TABLES: Sequence[ExportTable] = ("genres", "questions", "answers")
+
+# 1チャンクあたりの行数
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS: Dict[ExportFormat, str] = {
+    "parquet": "parquet",
+    "arrow": "arrows",
+}
+
+# テーブルごとの出力カラム（出力順）
+_TABLE_COLUMNS: Dict[ExportTable, List[InstrumentedAttribute]] = {
+    "genres": [Genre.id, Genre.genre_name, Genre.created_at, Genre.updated_at],
+    "questions": [
+        Question.id,
+        Question.genre_id,
+        Question.question,
+        Question.created_at,
+        Question.updated_at,
+    ],
+    "answers": [
+        Answer.id,
+        Answer.question_id,
+        Answer.answer,
+        Answer.created_at,
+        Answer.updated_at,
+    ],
+}
+
+# 辞書エンコードする外部キーカラム
+_DICTIONARY_COLUMNS = {"genre_id", "question_id"}
+
+
+def pyarrow_available() -> bool:
+    """pyarrowが利用可能かどうかを返します（読み込みはしません）。"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _require_pyarrow():
+    """pyarrow（pyarrow.parquetを含む）を読み込んで返します。"""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError(
+            "エクスポートには pyarrow が必要です（uv sync --extra export）"
+        ) from exc
+    return pyarrow
+
+
+async def load_pyarrow():
+    """
+    pyarrowをイベントループを止めずに読み込んで返します。
+
+    初回の読み込みには数十ミリ秒かかるため、読み込み前であればスレッドで読み込みます。
+    """
+    if "pyarrow.parquet" in sys.modules:
+        return _require_pyarrow()
+    return await asyncio.to_thread(_require_pyarrow)
+
+
+def arrow_schema(table: ExportTable) -> "pa.Schema":
+    """
+    エクスポート用のArrowスキーマを返します。
+
+    genre_id / question_id は同じ値が繰り返されるため辞書エンコードします。
+    """
+    pa = _require_pyarrow()
+    fields = []
+    for column in _TABLE_COLUMNS[table]:
+        name = column.key
+        if name in _DICTIONARY_COLUMNS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif name in ("created_at", "updated_at"):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type, nullable=name != "id"))
+    return pa.schema(fields)
+
+
+def _to_record_batch(rows: Sequence, schema: "pa.Schema") -> "pa.RecordBatch":
+    pa = _require_pyarrow()
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+            arrays.append(array.cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def iter_record_batches(
+    session: AsyncSession, table: ExportTable, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator["pa.RecordBatch"]:
+    """
+    テーブルをサーバーサイドカーソルで読み出し、チャンクごとにRecordBatchを返します。
+    """
+    schema = arrow_schema(table)
+    columns = _TABLE_COLUMNS[table]
+    query = select(*columns).order_by(columns[0])
+    result = await session.stream(query.execution_options(yield_per=chunk_size))
+    async for rows in result.partitions(chunk_size):
+        yield _to_record_batch(rows, schema)
+
+
+class _ChunkSink:
+    """書き込まれたバイト列を溜め、drain()で取り出すためのファイルライクオブジェクト"""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def iter_export_bytes(
+    session: AsyncSession,
+    table: ExportTable,
+    export_format: ExportFormat = "parquet",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    テーブルを指定形式でシリアライズし、チャンクごとのバイト列を返します。
+
+    Parquetの場合は1チャンクが1行グループになります。
+    """
+    pa = await load_pyarrow()
+    schema = arrow_schema(table)
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        async for batch in iter_record_batches(session, table, chunk_size):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def stream_export(
+    table: ExportTable,
+    export_format: ExportFormat = "parquet",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+) -> AsyncIterator[bytes]:
+    """
+    専用のセッションを開いてエクスポートします（StreamingResponse・コマンドライン用）。
+
+    レスポンス送信中もセッションを保持する必要があるため、get_dbとは別に管理します。
+    get_dbの後処理はレスポンス本文の送信前に実行されるため、そのセッションは使用できません。
+    """
+    async with session_factory() as session:
+        async for data in iter_export_bytes(session, table, export_format, chunk_size):
+            yield data
+
+
+async def export_to_directory(
+    out_dir: Path,
+    export_format: ExportFormat = "parquet",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Dict[str, Path]:
+    """
+    全テーブルをディレクトリへ書き出し、テーブル名とファイルパスの対応を返します。
+    """
+    await load_pyarrow()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: Dict[str, Path] = {}
+    for table in EXPORT_TABLES:
+        path = out_dir / f"{table}.{FILE_EXTENSIONS[export_format]}"
+        with path.open("wb") as f:
+            async for data in stream_export(table, export_format, chunk_size):
+                f.write(data)
+        paths[table] = path
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Q&Aコーパスのエクスポート")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--out-dir", type=Path, default=Path("export"))
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    async def run() -> Dict[str, Path]:
+        try:
+            return await export_to_directory(args.out_dir, args.format, args.chunk_size)
+        finally:
+            await engine.dispose()
+
+    paths = asyncio.run(run())
+    for table, path in paths.items():
+        print(f"{table}: {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
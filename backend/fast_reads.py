@@ -0,0 +1,154 @@
+"""
+読み取り専用の一覧取得用の高速パス
+
+ORMオブジェクトを生成してセッションのidentity mapに登録し、response_modelで
+from_attributesにより再検証する代わりに、JOINしたCoreの行から
+レスポンスと同じ形の辞書を組み立て、事前に生成したTypeAdapterでJSONへ直接シリアライズします。
+
+DBから取得した値はスキーマ上すでに正しい型のため、検証を省略しても
+レスポンスの内容（キーの順序を含む）は従来のORMパスと同一です。
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from models import Answer, Genre, Question
+from pydantic import TypeAdapter
+from sqlalchemy import Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Falseにすると従来のORMパスで一覧を取得する
+READ_FAST_PATH = os.getenv("READ_FAST_PATH", "true").lower() != "false"
+
+# 辞書のリストをそのままJSONにする（datetimeはresponse_modelと同じISO 8601形式）
+ROWS_ADAPTER = TypeAdapter(List[Dict[str, Any]])
+
+
+def filter_created_at(
+    query: Select, created_since: Optional[datetime], created_until: Optional[datetime]
+) -> Select:
+    """回答を作成日時の範囲 [created_since, created_until) で絞り込みます。"""
+    if created_since is not None:
+        query = query.where(Answer.created_at >= created_since)
+    if created_until is not None:
+        query = query.where(Answer.created_at < created_until)
+    return query
+
+
+_GENRE_COLUMNS = (
+    Genre.id.label("genre__id"),
+    Genre.genre_name.label("genre__genre_name"),
+    Genre.created_at.label("genre__created_at"),
+    Genre.updated_at.label("genre__updated_at"),
+)
+
+
+def _genre_dict(row: Row, genres: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    # 同じジャンルは1つの辞書を共有する（GenreResponseのフィールド順）
+    genre = genres.get(row.genre__id)
+    if genre is None:
+        genre = genres[row.genre__id] = {
+            "genre_name": row.genre__genre_name,
+            "id": row.genre__id,
+            "created_at": row.genre__created_at,
+            "updated_at": row.genre__updated_at,
+        }
+    return genre
+
+
+async def fetch_questions_with_genre(
+    db: AsyncSession, genre_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """質問とジャンルを1回のJOINで取得し、QuestionWithGenreと同じ形の辞書を返します。"""
+    query = select(
+        Question.id,
+        Question.question,
+        Question.genre_id,
+        Question.created_at,
+        Question.updated_at,
+        *_GENRE_COLUMNS,
+    ).join(Genre, Genre.id == Question.genre_id)
+    if genre_id:
+        query = query.where(Question.genre_id == genre_id)
+
+    result = await db.execute(query)
+    genres: Dict[str, Dict[str, Any]] = {}
+    return [
+        {
+            "question": row.question,
+            "id": row.id,
+            "genre_id": row.genre_id,
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+            "genre": _genre_dict(row, genres),
+        }
+        for row in result
+    ]
+
+
+async def fetch_answers_with_question(
+    db: AsyncSession,
+    question_id: Optional[str] = None,
+    created_since: Optional[datetime] = None,
+    created_until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """回答・質問・ジャンルを1回のJOINで取得し、AnswerWithQuestionと同じ形の辞書を返します。"""
+    query = (
+        select(
+            Answer.id,
+            Answer.answer,
+            Answer.question_id,
+            Answer.created_at,
+            Answer.updated_at,
+            Question.question.label("question__question"),
+            Question.genre_id.label("question__genre_id"),
+            Question.created_at.label("question__created_at"),
+            Question.updated_at.label("question__updated_at"),
+            *_GENRE_COLUMNS,
+        )
+        .join(Question, Question.id == Answer.question_id)
+        .join(Genre, Genre.id == Question.genre_id)
+    )
+    if question_id:
+        query = query.where(Answer.question_id == question_id)
+    query = filter_created_at(query, created_since, created_until)
+
+    result = await db.execute(query)
+    genres: Dict[str, Dict[str, Any]] = {}
+    questions: Dict[str, Dict[str, Any]] = {}
+    answers = []
+    for row in result:
+        question = questions.get(row.question_id)
+        if question is None:
+            question = questions[row.question_id] = {
+                "question": row.question__question,
+                "id": row.question_id,
+                "genre_id": row.question__genre_id,
+                "created_at": row.question__created_at,
+                "updated_at": row.question__updated_at,
+                "genre": _genre_dict(row, genres),
+            }
+        answers.append(
+            {
+                "answer": row.answer,
+                "id": row.id,
+                "question_id": row.question_id,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+                "question": question,
+            }
+        )
+    return answers
+
+
+def json_response(content: List[Dict[str, Any]]) -> Response:
+    """
+    事前に生成したTypeAdapterで直接JSONにシリアライズしたレスポンスを返します。
+
+    Responseを返すことでFastAPIによるresponse_modelの再検証を省略します。
+    """
+    return Response(
+        content=ROWS_ADAPTER.dump_json(content), media_type="application/json"
+    )
@@ -0,0 +1,319 @@
+"""
+ジャンルごとの統計のロールアップ
+
+質問数・回答数・未回答の質問数・日ごとの回答数を、作成系の処理と同じトランザクションで
+ロールアップテーブル（genre_stats / genre_daily_answers / question_stats）に加算します。
+統計のエンドポイントはロールアップテーブルを主キーで読むだけのため、
+questions・answers の件数に関わらず一定のコストで応答します。
+
+- 未回答数は、質問ごとの回答数（question_stats）が0から増えたときに1減らします。
+  加算した行は行ロックで保護されるため、同じ質問への回答が同時に作成されても
+  減らすのは1回だけです
+- 回答の作成ごとにジャンルの行を更新するため、同じジャンルへの書き込みは直列化されます。
+  書き込みが多い環境では STATS_ROLLUP_ENABLED=false にして、
+  再集計（python genre_stats.py）を定期的に実行してください
+- ロールアップ導入前のデータや、無効にしていた間のデータも再集計で取り込まれます
+
+日付はDBの CURRENT_DATE（回答の作成日時と同じタイムゾーン）で数えます。
+"""
+
+import argparse
+import asyncio
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Type, cast
+
+from database import AsyncSessionLocal, Base, engine
+from models import (
+    Answer,
+    Genre,
+    GenreDailyAnswers,
+    GenreStats,
+    Question,
+    QuestionStats,
+)
+from sqlalchemy import Executable, Table, delete, exists, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+# Trueにすると作成系の処理でロールアップを加算する
+STATS_ROLLUP_ENABLED = os.getenv("STATS_ROLLUP_ENABLED", "true").lower() == "true"
+# 日ごとの回答数を返す最大日数
+STATS_MAX_DAYS = 366
+
+
+async def _upsert_increment(
+    db: AsyncSession,
+    model: Type[Base],
+    rows: List[Dict[str, Any]],
+    counters: Sequence[str],
+    **values: Any,
+) -> None:
+    """主キーが一致する行があればcountersの列に加算し、なければ挿入します。"""
+    if not rows:
+        return
+    table = cast(Table, model.__table__)
+    stmt: Executable
+    if db.get_bind().dialect.name == "mysql":
+        mysql_insert = mysql.insert(table).values(**values)
+        stmt = mysql_insert.on_duplicate_key_update(
+            {name: table.c[name] + mysql_insert.inserted[name] for name in counters}
+        )
+    else:
+        sqlite_insert = sqlite.insert(table).values(**values)
+        stmt = sqlite_insert.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={
+                name: table.c[name] + sqlite_insert.excluded[name] for name in counters
+            },
+        )
+    await db.execute(stmt, rows)
+
+
+async def record_genres(db: AsyncSession, genre_ids: Iterable[str]) -> None:
+    """作成したジャンルの行を追加します。"""
+    if not STATS_ROLLUP_ENABLED:
+        return
+    rows = [
+        {
+            "genre_id": genre_id,
+            "question_count": 0,
+            "answer_count": 0,
+            "unanswered_count": 0,
+        }
+        for genre_id in genre_ids
+    ]
+    await _upsert_increment(db, GenreStats, rows, ["question_count"])
+
+
+async def record_questions(
+    db: AsyncSession, questions: Iterable[Tuple[str, str]]
+) -> None:
+    """作成した質問（(genre_id, question_id) の一覧）を加算します。"""
+    if not STATS_ROLLUP_ENABLED:
+        return
+    questions = list(questions)
+    await _upsert_increment(
+        db,
+        QuestionStats,
+        [
+            {"question_id": question_id, "genre_id": genre_id, "answer_count": 0}
+            for genre_id, question_id in questions
+        ],
+        ["answer_count"],
+    )
+    per_genre = Counter(genre_id for genre_id, _ in questions)
+    await _upsert_increment(
+        db,
+        GenreStats,
+        [
+            {
+                "genre_id": genre_id,
+                "question_count": count,
+                "answer_count": 0,
+                "unanswered_count": count,
+            }
+            for genre_id, count in per_genre.items()
+        ],
+        ["question_count", "unanswered_count"],
+    )
+
+
+async def record_answers(db: AsyncSession, answers: Iterable[Tuple[str, str]]) -> None:
+    """作成した回答（(genre_id, question_id) の一覧）を加算します。"""
+    if not STATS_ROLLUP_ENABLED:
+        return
+    per_question = Counter(answers)
+    if not per_question:
+        return
+    await _upsert_increment(
+        db,
+        QuestionStats,
+        [
+            {"question_id": question_id, "genre_id": genre_id, "answer_count": count}
+            for (genre_id, question_id), count in per_question.items()
+        ],
+        ["answer_count"],
+    )
+    # 加算後の回答数が今回の件数と等しい質問は、今回初めて回答された
+    result = await db.execute(
+        select(QuestionStats.question_id, QuestionStats.answer_count)
+        .where(QuestionStats.question_id.in_([q for _, q in per_question]))
+        .with_for_update()
+    )
+    answer_counts = dict(result.all())
+
+    per_genre: Counter = Counter()
+    newly_answered: Counter = Counter()
+    for (genre_id, question_id), count in per_question.items():
+        per_genre[genre_id] += count
+        if answer_counts.get(question_id) == count:
+            newly_answered[genre_id] += 1
+    await _upsert_increment(
+        db,
+        GenreStats,
+        [
+            {
+                "genre_id": genre_id,
+                "question_count": 0,
+                "answer_count": count,
+                "unanswered_count": -newly_answered[genre_id],
+            }
+            for genre_id, count in per_genre.items()
+        ],
+        ["answer_count", "unanswered_count"],
+    )
+    await _upsert_increment(
+        db,
+        GenreDailyAnswers,
+        [
+            {"genre_id": genre_id, "answer_count": count}
+            for genre_id, count in per_genre.items()
+        ],
+        ["answer_count"],
+        day=func.current_date(),
+    )
+
+
+async def _answers_per_day(
+    db: AsyncSession, days: int, genre_id: str | None = None
+) -> List[Dict[str, Any]]:
+    """直近days日分の回答数を日付順に返します（回答のない日は0）。"""
+    current_date = await db.scalar(select(func.current_date()))
+    # SQLiteは文字列で返す
+    today = (
+        date.fromisoformat(current_date)
+        if isinstance(current_date, str)
+        else current_date
+    )
+    assert isinstance(today, date)
+    since = today - timedelta(days=days - 1)
+    query = (
+        select(GenreDailyAnswers.day, func.sum(GenreDailyAnswers.answer_count))
+        .where(GenreDailyAnswers.day >= since)
+        .group_by(GenreDailyAnswers.day)
+    )
+    if genre_id is not None:
+        query = query.where(GenreDailyAnswers.genre_id == genre_id)
+    counts = dict((await db.execute(query)).all())
+    return [
+        {"day": day, "answer_count": int(counts.get(day, 0))}
+        for day in (since + timedelta(days=i) for i in range(days))
+    ]
+
+
+async def get_genre_stats(
+    db: AsyncSession, genre_id: str, days: int
+) -> Dict[str, Any] | None:
+    """ジャンルの統計を返します。ジャンルがない場合はNoneを返します。"""
+    stats = await db.get(GenreStats, genre_id)
+    if stats is None:
+        # ロールアップに行がないジャンル（再集計前など）は0件として扱う
+        if await db.scalar(select(Genre.id).where(Genre.id == genre_id)) is None:
+            return None
+        stats = GenreStats(
+            genre_id=genre_id, question_count=0, answer_count=0, unanswered_count=0
+        )
+    return {
+        "genre_id": genre_id,
+        "question_count": stats.question_count,
+        "answer_count": stats.answer_count,
+        "unanswered_count": stats.unanswered_count,
+        "answers_per_day": await _answers_per_day(db, days, genre_id),
+    }
+
+
+async def get_stats(db: AsyncSession, days: int) -> Dict[str, Any]:
+    """全ジャンルの統計の合計を返します。"""
+    result = await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(GenreStats.question_count), 0),
+            func.coalesce(func.sum(GenreStats.answer_count), 0),
+            func.coalesce(func.sum(GenreStats.unanswered_count), 0),
+        )
+    )
+    genre_count, question_count, answer_count, unanswered_count = result.one()
+    return {
+        "genre_count": genre_count,
+        "question_count": int(question_count),
+        "answer_count": int(answer_count),
+        "unanswered_count": int(unanswered_count),
+        "answers_per_day": await _answers_per_day(db, days),
+    }
+
+
+async def rebuild_stats(
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """
+    ロールアップテーブルを questions・answers から再集計します。
+
+    全件を集計するため、トラフィックの少ない時間帯に実行してください。
+    """
+    answered = exists().where(Answer.question_id == Question.id)
+    answer_day = func.date(Answer.created_at)
+    async with session_factory() as session:
+        for model in (GenreStats, GenreDailyAnswers, QuestionStats):
+            await session.execute(delete(model))
+        await session.execute(
+            insert(GenreStats).from_select(
+                ["genre_id", "question_count", "answer_count", "unanswered_count"],
+                select(
+                    Genre.id,
+                    select(func.count())
+                    .where(Question.genre_id == Genre.id)
+                    .scalar_subquery(),
+                    select(func.count(Answer.id))
+                    .join(Question, Question.id == Answer.question_id)
+                    .where(Question.genre_id == Genre.id)
+                    .scalar_subquery(),
+                    select(func.count())
+                    .where(Question.genre_id == Genre.id, ~answered)
+                    .scalar_subquery(),
+                ),
+            )
+        )
+        await session.execute(
+            insert(QuestionStats).from_select(
+                ["question_id", "genre_id", "answer_count"],
+                select(
+                    Question.id,
+                    Question.genre_id,
+                    select(func.count(Answer.id))
+                    .where(Answer.question_id == Question.id)
+                    .scalar_subquery(),
+                ),
+            )
+        )
+        await session.execute(
+            insert(GenreDailyAnswers).from_select(
+                ["genre_id", "day", "answer_count"],
+                select(Question.genre_id, answer_day, func.count(Answer.id))
+                .join(Question, Question.id == Answer.question_id)
+                .group_by(Question.genre_id, answer_day),
+            )
+        )
+        await session.commit()
+
+
+def main() -> None:
+    argparse.ArgumentParser(
+        description="ジャンルごとの統計のロールアップを再集計します"
+    ).parse_args()
+
+    async def run() -> None:
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await rebuild_stats()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    print("rebuilt: genre_stats, genre_daily_answers, question_stats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+作成系エンドポイントの冪等キー（Idempotency-Key）
+
+ロードバランサーやクライアントのタイムアウトで作成系のリクエスト（POST /genres・
+/questions・/answers）が再送されると、同じ行が重複して作成されます。
+Idempotency-Key ヘッダーを指定したリクエストは、成功したレスポンスを一定時間
+（IDEMPOTENCY_TTL_SECONDS）保存し、同じキーの再送にはDBにアクセスせずに
+保存したレスポンス（Idempotent-Replayed: true を付与）を返します。
+
+- 同じキーのリクエストが処理中の場合、後から来たリクエストは最初のリクエストの完了を
+  待って同じレスポンスを返します。IDEMPOTENCY_WAIT_SECONDS 秒を過ぎても完了しない場合は
+  409 を返します
+- 保存するのは2xxのレスポンスのみです。エラーの場合は行が作成されていないため、
+  同じキーで再送すると改めて処理します
+- 同じキーを別の内容（リクエストボディ）で使用した場合は 422 を返します
+
+保存先（IDEMPOTENCY_BACKEND）:
+
+- memory（既定）: プロセス内に最大 IDEMPOTENCY_MAX_ENTRIES 件を保持します。
+  ワーカーごとに独立するため、複数のワーカー・タスクで動かす場合は redis を使用してください
+- redis: 複数のワーカーで共有します（redisパッケージが必要です）。
+  処理中の印はキーのロックで表し、待機中のリクエストはポーリングで完了を待ちます
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Trueにすると Idempotency-Key ヘッダーを処理する
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() != "false"
+# memory もしくは redis
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_REDIS_URL = os.getenv("IDEMPOTENCY_REDIS_URL", "redis://localhost:6379/0")
+# レスポンスを保存する時間（秒）
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# memoryバックエンドで保持するレスポンスの最大件数（古いものから破棄する）
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# 処理中の同じキーのリクエストの完了を待つ最大時間（秒）
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# redisバックエンドの処理中の印の有効期限（秒）。リクエストの最大処理時間より長くする
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+IDEMPOTENCY_KEY_HEADER = b"idempotency-key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# 冪等キーを受け付けるルート
+IDEMPOTENT_PATHS = {"/genres", "/questions", "/answers"}
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """保存したレスポンス（fingerprintはリクエストボディのハッシュ）"""
+
+    fingerprint: str
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {
+                "fingerprint": self.fingerprint,
+                "status": self.status,
+                "headers": [
+                    [k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers
+                ],
+                "body": base64.b64encode(self.body).decode(),
+            }
+        ).encode()
+
+    @classmethod
+    def loads(cls, data: bytes) -> "StoredResponse":
+        value = json.loads(data)
+        return cls(
+            fingerprint=value["fingerprint"],
+            status=value["status"],
+            headers=[
+                (k.encode("latin-1"), v.encode("latin-1")) for k, v in value["headers"]
+            ],
+            body=base64.b64decode(value["body"]),
+        )
+
+
+class IdempotencyKeyReused(Exception):
+    """同じキーが別の内容のリクエストで使用された場合の例外"""
+
+
+class IdempotencyInFlight(Exception):
+    """同じキーのリクエストが待機時間内に完了しなかった場合の例外"""
+
+
+class IdempotencyStore(Protocol):
+    async def acquire(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        保存したレスポンスがあれば返します。なければ処理中の印を付けてNoneを返します
+        （呼び出し元が処理し、complete もしくは release を呼び出します）。
+        """
+        ...
+
+    async def complete(self, key: str, response: StoredResponse) -> None: ...
+
+    async def release(self, key: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryIdempotencyStore:
+    """プロセス内に件数の上限付きで保存するストア"""
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+        wait: float = IDEMPOTENCY_WAIT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait = wait
+        self.clock = clock
+        # キー -> (有効期限, レスポンス)（保存した順）
+        self._responses: OrderedDict[str, Tuple[float, StoredResponse]] = OrderedDict()
+        # 処理中のキー -> (fingerprint, 完了の通知)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Event]] = {}
+
+    def _stored(self, key: str) -> Optional[StoredResponse]:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= self.clock():
+            del self._responses[key]
+            return None
+        return response
+
+    async def acquire(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        loop = asyncio.get_running_loop()
+        wait_until = loop.time() + self.wait
+        while True:
+            response = self._stored(key)
+            if response is not None:
+                if response.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(key)
+                return response
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                self._in_flight[key] = (fingerprint, asyncio.Event())
+                return None
+            in_flight_fingerprint, done = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyKeyReused(key)
+            try:
+                await asyncio.wait_for(done.wait(), wait_until - loop.time())
+            except TimeoutError:
+                raise IdempotencyInFlight(key) from None
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        self._responses[key] = (self.clock() + self.ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+        await self.release(key)
+
+    async def release(self, key: str) -> None:
+        in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None:
+            in_flight[1].set()
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisIdempotencyStore:
+    """
+    Redisに保存するストア（キー: <prefix>:<キー>、処理中の印: <prefix>:<キー>:lock）
+
+    Redisにアクセスできない場合はリクエストを失敗させず、冪等キーなしで処理します。
+    """
+
+    # 処理中のリクエストの完了を確認する間隔（秒）
+    poll_interval = 0.05
+
+    def __init__(
+        self,
+        url: str = IDEMPOTENCY_REDIS_URL,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        wait: float = IDEMPOTENCY_WAIT_SECONDS,
+        lock_ttl: float = IDEMPOTENCY_LOCK_SECONDS,
+        prefix: str = "idempotency",
+    ):
+        # redisは共有ストアを使う場合のみ必要なため、ここで読み込む
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "IDEMPOTENCY_BACKEND=redis には redis パッケージが必要です"
+                "（uv sync --extra idempotency）"
+            ) from exc
+        self.client = redis.from_url(url)
+        self._errors = redis.RedisError
+        self.ttl = ttl
+        self.wait = wait
+        self.lock_ttl = lock_ttl
+        self.prefix = prefix
+
+    async def acquire(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        name = f"{self.prefix}:{key}"
+        loop = asyncio.get_running_loop()
+        wait_until = loop.time() + self.wait
+        try:
+            while True:
+                data = await self.client.get(name)
+                if data is not None:
+                    response = StoredResponse.loads(data)
+                    if response.fingerprint != fingerprint:
+                        raise IdempotencyKeyReused(key)
+                    return response
+                # 処理中の印はプロセスが異常終了しても残り続けないよう期限切れにする
+                locked = await self.client.set(
+                    f"{name}:lock", fingerprint, nx=True, px=int(self.lock_ttl * 1000)
+                )
+                if locked:
+                    return None
+                owner = await self.client.get(f"{name}:lock")
+                if owner is not None and owner.decode() != fingerprint:
+                    raise IdempotencyKeyReused(key)
+                if loop.time() >= wait_until:
+                    raise IdempotencyInFlight(key)
+                await asyncio.sleep(self.poll_interval)
+        except self._errors:
+            logger.warning("idempotency: Redisにアクセスできません", exc_info=True)
+            return None
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        name = f"{self.prefix}:{key}"
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(name, response.dumps(), px=int(self.ttl * 1000))
+                pipe.delete(f"{name}:lock")
+                await pipe.execute()
+        except self._errors:
+            logger.warning("idempotency: Redisへの保存に失敗しました", exc_info=True)
+
+    async def release(self, key: str) -> None:
+        try:
+            await self.client.delete(f"{self.prefix}:{key}:lock")
+        except self._errors:
+            logger.warning("idempotency: Redisへの保存に失敗しました", exc_info=True)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_store(name: str = IDEMPOTENCY_BACKEND) -> IdempotencyStore:
+    if name == "redis":
+        return RedisIdempotencyStore()
+    if name == "memory":
+        return MemoryIdempotencyStore()
+    raise ValueError(f"不明なIDEMPOTENCY_BACKENDです: {name}")
+
+
+idempotency_store = create_store()
+
+
+class IdempotencyMiddleware:
+    """作成系ルートの Idempotency-Key ヘッダーを処理するASGIミドルウェア"""
+
+    def __init__(self, app: ASGIApp, store: Optional[IdempotencyStore] = None) -> None:
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in IDEMPOTENT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = dict(scope["headers"]).get(IDEMPOTENCY_KEY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await self._send_error(
+                send, 400, "Idempotency-Key は255文字以内で指定してください"
+            )
+            return
+
+        # リクエストボディを読み込み、内容のハッシュで同じリクエストかどうかを判定する
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        key = f"{scope['path']}:{idempotency_key.decode('latin-1')}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        try:
+            stored = await self.store.acquire(key, fingerprint)
+        except IdempotencyKeyReused:
+            await self._send_error(
+                send, 422, "Idempotency-Key が別の内容のリクエストで使用されています"
+            )
+            return
+        except IdempotencyInFlight:
+            await self._send_error(
+                send,
+                409,
+                "同じ Idempotency-Key のリクエストを処理中です。しばらくしてから再試行してください",
+                [(b"retry-after", b"1")],
+            )
+            return
+        if stored is not None:
+            await self._replay(send, stored)
+            return
+
+        await self._run(scope, bytes(body), receive, send, key, fingerprint)
+
+    async def _run(
+        self,
+        scope: Scope,
+        body: bytes,
+        receive: Receive,
+        send: Send,
+        key: str,
+        fingerprint: str,
+    ) -> None:
+        body_sent = False
+        status = 0
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        if 200 <= status < 300:
+            await self.store.complete(
+                key, StoredResponse(fingerprint, status, headers, b"".join(chunks))
+            )
+        else:
+            await self.store.release(key)
+
+    async def _replay(self, send: Send, stored: StoredResponse) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": stored.status,
+                "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+            }
+        )
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _send_error(
+        self,
+        send: Send,
+        status: int,
+        detail: str,
+        extra_headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+                + (extra_headers or []),
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,160 @@
+"""
+イベントループの遅延監視とブロッキング検出
+
+- 遅延サンプラー: 一定間隔でsleepし、予定より起床が遅れた時間をループの遅延として記録します
+- ブロッキング検出（デバッグ用）: 別スレッドのウォッチドッグがサンプラーの心拍を監視し、
+  閾値を超えて心拍が止まった時点でイベントループスレッドのスタックをログに出力します
+- スレッドプール: 同期ハンドラ（def）を実行するanyioのスレッドプールの使用数と待ち数を報告します
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Deque, Dict, Optional
+
+import anyio.to_thread
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() != "false"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.5"))
+# この時間以上ループが止まった場合に警告する（秒）
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))
+# スタックを取得するブロッキング検出はデバッグ時のみ有効にする
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "false").lower() == "true"
+
+_WINDOW_SIZE = 512
+
+
+def threadpool_stats() -> Dict[str, int]:
+    """anyioの既定スレッドプールの使用状況を返します。"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        "total": int(limiter.total_tokens),
+        "borrowed": stats.borrowed_tokens,
+        "waiting": stats.tasks_waiting,
+    }
+
+
+class LoopMonitor:
+    """イベントループの遅延サンプラーとブロッキング検出ウォッチドッグ"""
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_BLOCK_THRESHOLD,
+        debug: bool = LOOP_DEBUG,
+    ) -> None:
+        self.threshold = threshold
+        self.debug = debug
+        # ブロッキング検出時は閾値より短い間隔で心拍を送る
+        self.interval = min(interval, threshold / 2) if debug else interval
+        self.lags: Deque[float] = collections.deque(maxlen=_WINDOW_SIZE)
+        self.max_lag = 0.0
+        self.slow_ticks = 0
+        self.blocked_events = 0
+        self.last_blocked_stack: Optional[str] = None
+        self._last_tick = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopped.clear()
+        self._last_tick = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._sample_lag(), name="loop-monitor")
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._last_tick = time.monotonic()
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.slow_ticks += 1
+                logger.warning(
+                    "イベントループが %.1fms 遅延しました（threadpool=%s）",
+                    lag * 1000,
+                    threadpool_stats(),
+                )
+
+    def _watch(self) -> None:
+        reported_tick = None
+        while not self._stopped.wait(self.threshold / 2):
+            last_tick = self._last_tick
+            stalled = time.monotonic() - last_tick
+            if stalled < self.threshold + self.interval or reported_tick == last_tick:
+                continue
+            # 同じ停止区間については1回だけ報告する
+            reported_tick = last_tick
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.blocked_events += 1
+            self.last_blocked_stack = stack
+            logger.warning(
+                "イベントループが %.1fms 以上ブロックされています:\n%s",
+                stalled * 1000,
+                stack,
+            )
+
+    def snapshot(self, include_stack: bool = False) -> Dict[str, Any]:
+        """
+        直近の遅延統計とスレッドプールの状況を返します。
+
+        ブロッキング検出時のスタック（ファイルパスを含む）は include_stack の場合のみ返します。
+        """
+        lags = sorted(self.lags)
+        lag_ms: Dict[str, float] = {"max": round(self.max_lag * 1000, 3)}
+        if lags:
+            lag_ms.update(
+                last=round(self.lags[-1] * 1000, 3),
+                mean=round(statistics.fmean(lags) * 1000, 3),
+                p50=round(lags[len(lags) // 2] * 1000, 3),
+                p99=round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+            )
+        return {
+            "running": self._task is not None,
+            "debug": self.debug,
+            "interval_ms": round(self.interval * 1000, 3),
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "lag_ms": lag_ms,
+            "slow_ticks": self.slow_ticks,
+            "blocked_events": self.blocked_events,
+            "last_blocked_stack": self.last_blocked_stack if include_stack else None,
+            "threadpool": threadpool_stats(),
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -1,27 +1,139 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List, Literal, Tuple
 
-from database import Base, engine, get_db
-from fastapi import Depends, FastAPI, HTTPException
+from admission import ADMISSION_ENABLED, AdmissionMiddleware
+from answer_archive import get_archived_answer
+import answer_shards
+from answer_shards import AnswerShards, get_answer_shards
+from batch_lookup import MISSING_IDS_HEADER, lookup_by_ids, parse_ids
+from body_compression import BODY_COMPRESSION, get_codec
+from bulk_import import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_MAX_CHUNK_SIZE,
+    BulkImporter,
+    ImportFormat,
+    detect_format,
+    iter_records,
+)
+from change_feed import CHANGES_MAX_LIMIT, fetch_changes
+from database import Base, engine, get_db, get_session_factory
+from db_json import (
+    SERVER_SIDE_JSON,
+    fetch_genre_questions_json,
+    fetch_question_details_json,
+    json_document_response,
+)
+from deadline import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    install_statement_timeout,
+    is_statement_timeout,
+)
+from export import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    ExportFormat,
+    ExportTable,
+    pyarrow_available,
+    stream_export,
+)
+from fast_reads import (
+    READ_FAST_PATH,
+    fetch_answers_with_question,
+    fetch_questions_with_genre,
+    filter_created_at,
+    json_response,
+)
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from genre_stats import (
+    STATS_MAX_DAYS,
+    get_genre_stats,
+    get_stats,
+    record_answers,
+    record_genres,
+    record_questions,
+)
+from idempotency import IDEMPOTENCY_ENABLED, IdempotencyMiddleware, idempotency_store
+from loop_monitor import LOOP_DEBUG, LOOP_MONITOR_ENABLED, loop_monitor
 from models import Answer, Genre, Question
+from outbox import record_event
+from profiler import (
+    PROFILER_ENABLED,
+    ProfiledRoute,
+    ProfilerMiddleware,
+    install_query_timing,
+    profiler,
+    to_collapsed,
+    to_speedscope,
+)
+from sampling import SAMPLE_MAX_N, sample_questions
 from schemas import (
     AnswerCreate,
+    AnswerLookupResponse,
     AnswerResponse,
     AnswerWithQuestion,
+    BatchLookupRequest,
+    ChangesResponse,
     GenreCreate,
+    GenreLookupResponse,
     GenreResponse,
+    GenreStatsResponse,
+    GenreWithQuestions,
+    ImportResponse,
     QuestionCreate,
+    QuestionLookupResponse,
     QuestionResponse,
     QuestionWithGenre,
+    StatsResponse,
+    TrendingResponse,
 )
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import selectinload
+from statements import (
+    ANSWER_BY_ID,
+    GENRE_EXISTS,
+    QUESTION_BY_ID,
+    QUESTION_EXISTS,
+    QUESTION_GENRE_ID,
+)
+from trending import TRENDING_MAX_LIMIT, TrendingWindow, trending
 
 app = FastAPI(
     title="Bedrock Test API", description="ジャンル・質問・回答管理API", version="0.1.0"
 )
 
+# オンデマンドプロファイラ（ハンドラ単位で計測するため最も内側に追加する）
+if PROFILER_ENABLED:
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilerMiddleware)
+    install_query_timing(engine)
+
+# DBコネクションプールの手前での負荷制限
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# 作成系リクエストの再送の重複排除（再送はアドミッション制御とDBの手前で応答する）
+if IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware)
+
+# リクエストのデッドライン（待ち時間も含めるため最も外側に追加する）
+app.add_middleware(DeadlineMiddleware)
+install_statement_timeout(engine)
+
+
+# クエリのタイムアウトは504として返す
+@app.exception_handler(DeadlineExceeded)
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: Exception) -> JSONResponse:
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse(
+        status_code=504, content={"detail": "リクエストの処理がタイムアウトしました"}
+    )
+
 
 # データベーステーブルの作成
 @app.on_event("startup")
@@ -30,6 +142,49 @@ async def create_tables():
         await conn.run_sync(Base.metadata.create_all)
 
 
+# 本文の圧縮を有効にした場合、依存パッケージと辞書を起動時に読み込む
+# （最初の書き込みではなく起動時に設定の誤りで失敗させる）
+@app.on_event("startup")
+async def load_body_codec():
+    if BODY_COMPRESSION:
+        get_codec()
+
+
+# イベントループ遅延の監視
+@app.on_event("startup")
+async def start_loop_monitor():
+    if LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+
+@app.on_event("shutdown")
+async def close_trending():
+    await trending.close()
+
+
+@app.on_event("shutdown")
+async def close_idempotency_store():
+    await idempotency_store.close()
+
+
+# 回答のシャードのテーブル作成と接続の破棄
+@app.on_event("startup")
+async def create_shard_tables():
+    if answer_shards.configured_shards is not None:
+        await answer_shards.configured_shards.create_tables()
+
+
+@app.on_event("shutdown")
+async def dispose_shards():
+    if answer_shards.configured_shards is not None:
+        await answer_shards.configured_shards.dispose()
+
+
 @app.get("/")
 def hello_world() -> Dict[str, str]:
     return {"Hello": "World"}
@@ -40,6 +195,17 @@ def health_check() -> Dict[str, str | datetime]:
     return {"status": "healthy", "timestamp": datetime.now()}
 
 
+@app.get("/debug/loop", summary="イベントループ遅延・スレッドプール状況")
+async def get_loop_stats() -> Dict[str, Any]:
+    """
+    イベントループの遅延統計、ブロッキング検出の結果、
+    スレッドプール（同期ハンドラの実行先）の使用数と待ち数を取得します。
+
+    ブロッキング検出時のスタックはファイルパスを含むため、LOOP_DEBUG=true の場合のみ返します。
+    """
+    return loop_monitor.snapshot(include_stack=LOOP_DEBUG)
+
+
 # ===== ジャンル関連エンドポイント =====
 @app.post("/genres", response_model=GenreResponse, summary="ジャンル作成")
 async def create_genre(
@@ -61,6 +227,9 @@ async def create_genre(
 
     db_genre = Genre(**genre.model_dump())
     db.add(db_genre)
+    await record_event(db, "genre.created", db_genre, genre.model_dump())
+    await db.flush()
+    await record_genres(db, [db_genre.id])
     await db.commit()
     await db.refresh(db_genre)
 
@@ -69,15 +238,41 @@ async def create_genre(
 
 # ジャンル一覧取得エンドポイント
 @app.get("/genres", response_model=List[GenreResponse], summary="ジャンル一覧取得")
-async def get_genres(db: AsyncSession = Depends(get_db)) -> List[GenreResponse]:
+async def get_genres(
+    response: Response, ids: str | None = None, db: AsyncSession = Depends(get_db)
+) -> List[GenreResponse]:
     """
     登録されているジャンルの一覧を取得します。
+
+    - **ids**: カンマ区切りで指定した場合、そのIDのジャンルのみをリクエスト順に取得
+      （見つからなかったIDは X-Missing-Ids ヘッダーに列挙）
     """
+    if ids is not None:
+        genres, missing = await lookup_by_ids(db, Genre, parse_ids(ids))
+        if missing:
+            response.headers[MISSING_IDS_HEADER] = ",".join(missing)
+        return genres
+
     result = await db.execute(select(Genre))
     genres = result.scalars().all()
     return list(genres)
 
 
+@app.post(
+    "/genres:lookup", response_model=GenreLookupResponse, summary="ジャンル一括取得"
+)
+async def lookup_genres(
+    request: BatchLookupRequest, db: AsyncSession = Depends(get_db)
+) -> GenreLookupResponse:
+    """
+    IDの一覧に一致するジャンルを1回のクエリでリクエスト順に取得します。
+
+    - **ids**: 取得するジャンルIDの一覧
+    """
+    genres, missing = await lookup_by_ids(db, Genre, request.ids)
+    return {"items": genres, "missing": missing}
+
+
 # ===== 質問関連エンドポイント =====
 @app.post("/questions", response_model=QuestionResponse, summary="質問作成")
 async def create_question(
@@ -90,8 +285,7 @@ async def create_question(
     - **question**: 質問内容
     """
     # ジャンルの存在確認
-    genre_result = await db.execute(select(Genre).where(Genre.id == question.genre_id))
-    if not genre_result.scalar_one_or_none():
+    if await db.scalar(GENRE_EXISTS, {"genre_id": question.genre_id}) is None:
         raise HTTPException(
             status_code=404, detail=f"ジャンルID '{question.genre_id}' が見つかりません"
         )
@@ -99,6 +293,9 @@ async def create_question(
     # 質問を作成
     db_question = Question(**question.model_dump())
     db.add(db_question)
+    await record_event(db, "question.created", db_question, question.model_dump())
+    await db.flush()
+    await record_questions(db, [(question.genre_id, db_question.id)])
     await db.commit()
     await db.refresh(db_question)
 
@@ -107,13 +304,30 @@ async def create_question(
 
 @app.get("/questions", response_model=List[QuestionWithGenre], summary="質問一覧取得")
 async def get_questions(
-    genre_id: str | None = None, db: AsyncSession = Depends(get_db)
-) -> List[QuestionWithGenre]:
+    response: Response,
+    genre_id: str | None = None,
+    ids: str | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> List[QuestionWithGenre] | Response:
     """
     質問の一覧を取得します。
 
     - **genre_id**: 指定した場合、そのジャンルの質問のみを取得
+    - **ids**: カンマ区切りで指定した場合、そのIDの質問のみをリクエスト順に取得
+      （見つからなかったIDは X-Missing-Ids ヘッダーに列挙）
     """
+    if ids is not None:
+        questions, missing = await lookup_by_ids(
+            db, Question, parse_ids(ids), [selectinload(Question.genre)]
+        )
+        if missing:
+            response.headers[MISSING_IDS_HEADER] = ",".join(missing)
+        return questions
+
+    if READ_FAST_PATH:
+        questions = await fetch_questions_with_genre(db, genre_id)
+        return json_response(questions)
+
     # クエリの構築
     query = select(Question).options(selectinload(Question.genre))
 
@@ -126,6 +340,48 @@ async def get_questions(
     return list(questions)
 
 
+@app.post(
+    "/questions:lookup", response_model=QuestionLookupResponse, summary="質問一括取得"
+)
+async def lookup_questions(
+    request: BatchLookupRequest, db: AsyncSession = Depends(get_db)
+) -> QuestionLookupResponse:
+    """
+    IDの一覧に一致する質問を1回のクエリでリクエスト順に取得します。
+
+    - **ids**: 取得する質問IDの一覧
+    """
+    questions, missing = await lookup_by_ids(
+        db, Question, request.ids, [selectinload(Question.genre)]
+    )
+    return {"items": questions, "missing": missing}
+
+
+@app.get(
+    "/questions/trending", response_model=TrendingResponse, summary="話題の質問取得"
+)
+async def get_trending_questions(
+    window: TrendingWindow = Query("1h", description="集計するウィンドウ"),
+    genre_id: str | None = None,
+    limit: int = Query(10, ge=1, le=TRENDING_MAX_LIMIT),
+) -> TrendingResponse:
+    """
+    直近のウィンドウ内で回答数が多い質問を取得します。
+
+    回答の作成時に更新するカウンターから集計するため、answersテーブルは参照しません。
+
+    - **window**: 集計するウィンドウ（5m / 1h / 24h）
+    - **genre_id**: 指定した場合、そのジャンルの質問のみを対象にする
+    - **limit**: 取得する最大件数
+    """
+    top = await trending.top(window, limit, genre_id)
+    questions = [
+        {"question_id": question_id, "genre_id": question_genre_id, "answer_count": n}
+        for (question_genre_id, question_id), n in top
+    ]
+    return {"window": window, "questions": questions}
+
+
 @app.get(
     "/questions/{question_id}", response_model=QuestionWithGenre, summary="質問詳細取得"
 )
@@ -137,11 +393,7 @@ async def get_question(
 
     - **question_id**: 質問のID（UUID形式）
     """
-    result = await db.execute(
-        select(Question)
-        .options(selectinload(Question.genre))
-        .where(Question.id == question_id)
-    )
+    result = await db.execute(QUESTION_BY_ID, {"question_id": question_id})
     question = result.scalar_one_or_none()
 
     if not question:
@@ -159,15 +411,22 @@ async def get_question(
 )
 async def get_questions_by_genre(
     genre_id: str, db: AsyncSession = Depends(get_db)
-) -> List[QuestionResponse]:
+) -> List[QuestionResponse] | Response:
     """
     指定されたジャンルに属する質問の一覧を取得します。
 
     - **genre_id**: ジャンルのID（UUID形式）
     """
+    if SERVER_SIDE_JSON:
+        document = await fetch_genre_questions_json(db, genre_id)
+        if document is None:
+            raise HTTPException(
+                status_code=404, detail=f"ジャンルID '{genre_id}' が見つかりません"
+            )
+        return json_document_response(document)
+
     # ジャンルの存在確認
-    genre_result = await db.execute(select(Genre).where(Genre.id == genre_id))
-    if not genre_result.scalar_one_or_none():
+    if await db.scalar(GENRE_EXISTS, {"genre_id": genre_id}) is None:
         raise HTTPException(
             status_code=404, detail=f"ジャンルID '{genre_id}' が見つかりません"
         )
@@ -179,10 +438,228 @@ async def get_questions_by_genre(
     return list(questions)
 
 
+def _require_unsharded(shards: AnswerShards | None) -> None:
+    """回答のシャーディングに対応していない機能の呼び出しを拒否します。"""
+    if shards is not None:
+        raise HTTPException(
+            status_code=501,
+            detail="回答のシャーディングが有効な場合は利用できません",
+        )
+
+
+async def _ensure_genre(db: AsyncSession, genre_id: str) -> None:
+    if await db.scalar(GENRE_EXISTS, {"genre_id": genre_id}) is None:
+        raise HTTPException(
+            status_code=404, detail=f"ジャンルID '{genre_id}' が見つかりません"
+        )
+
+
+@app.get(
+    "/genres/{genre_id}/questions/random",
+    response_model=List[QuestionResponse],
+    summary="ジャンル内の質問のランダム抽出",
+)
+async def get_random_questions(
+    genre_id: str,
+    n: int = Query(1, ge=1, le=SAMPLE_MAX_N, description="抽出する件数"),
+    db: AsyncSession = Depends(get_db),
+) -> List[QuestionResponse]:
+    """
+    ジャンルから重複なしで最大n件の質問をランダムに選びます。
+
+    - **genre_id**: ジャンルのID（UUID形式）
+    - **n**: 抽出する件数（候補が少ない場合は候補を全て返す）
+    """
+    await _ensure_genre(db, genre_id)
+    return await sample_questions(db, genre_id, n)
+
+
+@app.get(
+    "/genres/{genre_id}/questions/unanswered",
+    response_model=List[QuestionResponse],
+    summary="ジャンル内の未回答の質問のランダム抽出",
+)
+async def get_unanswered_questions(
+    genre_id: str,
+    n: int = Query(1, ge=1, le=SAMPLE_MAX_N, description="抽出する件数"),
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> List[QuestionResponse]:
+    """
+    ジャンル内の回答のない質問から、重複なしで最大n件をランダムに選びます。
+
+    - **genre_id**: ジャンルのID（UUID形式）
+    - **n**: 抽出する件数（未回答の質問がない場合は空のリスト）
+    """
+    _require_unsharded(shards)
+    await _ensure_genre(db, genre_id)
+    return await sample_questions(db, genre_id, n, unanswered=True)
+
+
+@app.get(
+    "/genres/{genre_id}/stats",
+    response_model=GenreStatsResponse,
+    summary="ジャンルの統計取得",
+)
+async def get_genre_statistics(
+    genre_id: str,
+    days: int = Query(30, ge=1, le=STATS_MAX_DAYS, description="日ごとの回答数の日数"),
+    db: AsyncSession = Depends(get_db),
+) -> GenreStatsResponse:
+    """
+    ジャンルの質問数・回答数・未回答の質問数・日ごとの回答数を取得します。
+
+    作成時に更新しているロールアップから読むため、件数に関わらず一定のコストで応答します。
+
+    - **genre_id**: ジャンルのID（UUID形式）
+    - **days**: 日ごとの回答数を返す日数（今日を含む）
+    """
+    stats = await get_genre_stats(db, genre_id, days)
+    if stats is None:
+        raise HTTPException(
+            status_code=404, detail=f"ジャンルID '{genre_id}' が見つかりません"
+        )
+    return stats
+
+
+@app.get("/stats", response_model=StatsResponse, summary="全体の統計取得")
+async def get_statistics(
+    days: int = Query(30, ge=1, le=STATS_MAX_DAYS, description="日ごとの回答数の日数"),
+    db: AsyncSession = Depends(get_db),
+) -> StatsResponse:
+    """
+    全ジャンルの質問数・回答数・未回答の質問数・日ごとの回答数の合計を取得します。
+
+    - **days**: 日ごとの回答数を返す日数（今日を含む）
+    """
+    return await get_stats(db, days)
+
+
+async def _tree_answers(
+    session: AsyncSession, question_ids: List[str], depth: int, answer_limit: int
+) -> Tuple[Dict[str, int], Dict[str, List[Answer]]]:
+    """質問ごとの回答数と先頭answer_limit件の回答を取得します。"""
+    # 質問ごとの回答数（1クエリ）
+    count_result = await session.execute(
+        select(Answer.question_id, func.count())
+        .where(Answer.question_id.in_(question_ids))
+        .group_by(Answer.question_id)
+    )
+    answer_counts: Dict[str, int] = dict(count_result.all())
+
+    # 質問ごとに先頭answer_limit件の回答（ウィンドウ関数で1クエリ）
+    answers_by_question: Dict[str, List[Answer]] = {qid: [] for qid in question_ids}
+    if depth >= 2 and question_ids:
+        row_number = (
+            func.row_number()
+            .over(
+                partition_by=Answer.question_id,
+                order_by=(Answer.created_at, Answer.id),
+            )
+            .label("row_number")
+        )
+        ranked = (
+            select(Answer.id, row_number)
+            .where(Answer.question_id.in_(question_ids))
+            .subquery()
+        )
+        answer_result = await session.execute(
+            select(Answer)
+            .join(ranked, ranked.c.id == Answer.id)
+            .where(ranked.c.row_number <= answer_limit)
+            .order_by(Answer.question_id, ranked.c.row_number)
+        )
+        for answer in answer_result.scalars():
+            answers_by_question[answer.question_id].append(answer)
+    return answer_counts, answers_by_question
+
+
+@app.get(
+    "/genres/{genre_id}/tree",
+    response_model=GenreWithQuestions,
+    summary="ジャンルの質問・回答ツリー取得",
+)
+async def get_genre_tree(
+    genre_id: str,
+    depth: int = Query(2, ge=1, le=2, description="1: 質問と回答数まで、2: 回答まで"),
+    question_limit: int = Query(20, ge=1, le=100, description="質問の最大件数"),
+    answer_limit: int = Query(5, ge=1, le=50, description="質問ごとの回答の最大件数"),
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> GenreWithQuestions:
+    """
+    ジャンル → 質問 → 回答のツリーを、件数に関わらず一定回数のクエリで取得します。
+
+    - **genre_id**: ジャンルのID（UUID形式）
+    - **depth**: 1の場合は質問と回答数のみ、2の場合は回答も含める
+    - **question_limit**: 取得する質問の最大件数（作成日時順）
+    - **answer_limit**: 質問ごとに取得する回答の最大件数（作成日時順）
+    """
+    genre_result = await db.execute(select(Genre).where(Genre.id == genre_id))
+    genre = genre_result.scalar_one_or_none()
+    if not genre:
+        raise HTTPException(
+            status_code=404, detail=f"ジャンルID '{genre_id}' が見つかりません"
+        )
+
+    question_count = await db.scalar(
+        select(func.count()).where(Question.genre_id == genre_id)
+    )
+    question_result = await db.execute(
+        select(Question)
+        .where(Question.genre_id == genre_id)
+        .order_by(Question.created_at, Question.id)
+        .limit(question_limit)
+    )
+    questions = question_result.scalars().all()
+    question_ids = [question.id for question in questions]
+
+    answer_counts: Dict[str, int] = {}
+    answers_by_question: Dict[str, List[Answer]] = {qid: [] for qid in question_ids}
+    if shards is None:
+        results = [await _tree_answers(db, question_ids, depth, answer_limit)]
+    else:
+        # 回答を保持するシャードごとに同じクエリを実行する
+        results = [
+            await shards.run(
+                index,
+                lambda session, ids=ids: _tree_answers(
+                    session, ids, depth, answer_limit
+                ),
+            )
+            for index, ids in shards.group(question_ids).items()
+        ]
+    for counts, answers in results:
+        answer_counts.update(counts)
+        answers_by_question.update(answers)
+
+    return {
+        "id": genre.id,
+        "genre_name": genre.genre_name,
+        "created_at": genre.created_at,
+        "updated_at": genre.updated_at,
+        "question_count": question_count,
+        "questions": [
+            {
+                "id": question.id,
+                "question": question.question,
+                "genre_id": question.genre_id,
+                "created_at": question.created_at,
+                "updated_at": question.updated_at,
+                "answer_count": answer_counts.get(question.id, 0),
+                "answers": answers_by_question[question.id],
+            }
+            for question in questions
+        ],
+    }
+
+
 # ===== 回答関連エンドポイント =====
 @app.post("/answers", response_model=AnswerResponse, summary="回答作成")
 async def create_answer(
-    answer: AnswerCreate, db: AsyncSession = Depends(get_db)
+    answer: AnswerCreate,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
 ) -> AnswerResponse:
     """
     新しい回答を作成します。
@@ -190,33 +667,82 @@ async def create_answer(
     - **question_id**: 関連する質問のID（UUID形式）
     - **answer**: 回答内容
     """
-    # 質問の存在確認
-    question_result = await db.execute(
-        select(Question).where(Question.id == answer.question_id)
-    )
-    if not question_result.scalar_one_or_none():
+    # 質問の存在確認（本文は不要なため、ジャンルIDのみ取得する）
+    genre_id = await db.scalar(QUESTION_GENRE_ID, {"question_id": answer.question_id})
+    if genre_id is None:
         raise HTTPException(
             status_code=404, detail=f"質問ID '{answer.question_id}' が見つかりません"
         )
 
     # 回答を作成
+    if shards is not None:
+        # シャードに回答をコミットしてから、プライマリにイベントと統計を記録する
+        db_answer = await answer_shards.create_answer(
+            shards, answer.question_id, answer.answer
+        )
+        await record_event(db, "answer.created", db_answer, answer.model_dump())
+        await record_answers(db, [(genre_id, answer.question_id)])
+        await db.commit()
+        await trending.record(genre_id, answer.question_id)
+        return db_answer
+
     db_answer = Answer(**answer.model_dump())
     db.add(db_answer)
+    await record_event(db, "answer.created", db_answer, answer.model_dump())
+    await record_answers(db, [(genre_id, answer.question_id)])
     await db.commit()
     await db.refresh(db_answer)
+    await trending.record(genre_id, answer.question_id)
 
     return db_answer
 
 
 @app.get("/answers", response_model=List[AnswerWithQuestion], summary="回答一覧取得")
 async def get_answers(
-    question_id: str | None = None, db: AsyncSession = Depends(get_db)
-) -> List[AnswerWithQuestion]:
+    response: Response,
+    question_id: str | None = None,
+    ids: str | None = None,
+    created_since: datetime | None = None,
+    created_until: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> List[AnswerWithQuestion] | Response:
     """
     回答の一覧を取得します。
 
     - **question_id**: 指定した場合、その質問の回答のみを取得
+    - **created_since** / **created_until**: 指定した場合、作成日時がこの範囲
+      （created_since 以上 created_until 未満）の回答のみを取得
+      （answers をパーティションに分割している場合は範囲内の月だけを読む）
+    - **ids**: カンマ区切りで指定した場合、そのIDの回答のみをリクエスト順に取得
+      （見つからなかったIDは X-Missing-Ids ヘッダーに列挙）
     """
+    if ids is not None:
+        if shards is not None:
+            answers, missing = await _lookup_sharded_answers(db, shards, parse_ids(ids))
+        else:
+            answers, missing = await lookup_by_ids(
+                db,
+                Answer,
+                parse_ids(ids),
+                [selectinload(Answer.question).selectinload(Question.genre)],
+            )
+        if missing:
+            response.headers[MISSING_IDS_HEADER] = ",".join(missing)
+        return answers
+
+    if shards is not None:
+        answers = await answer_shards.list_answers(
+            shards, question_id, created_since, created_until
+        )
+        return await answer_shards.attach_questions(db, answers)
+
+    if READ_FAST_PATH:
+        answers = await fetch_answers_with_question(
+            db, question_id, created_since, created_until
+        )
+        return json_response(answers)
+
     # クエリの構築
     query = select(Answer).options(
         selectinload(Answer.question).selectinload(Question.genre)
@@ -224,6 +750,7 @@ async def get_answers(
 
     if question_id:
         query = query.where(Answer.question_id == question_id)
+    query = filter_created_at(query, created_since, created_until)
 
     result = await db.execute(query)
     answers = result.scalars().all()
@@ -231,23 +758,65 @@ async def get_answers(
     return list(answers)
 
 
+async def _lookup_sharded_answers(
+    db: AsyncSession, shards: AnswerShards, ids: List[str]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """全シャードからIDに一致する回答をリクエスト順に取得します。"""
+    found = await answer_shards.answers_by_ids(shards, ids)
+    answers = await answer_shards.attach_questions(
+        db, [found[answer_id] for answer_id in ids if answer_id in found]
+    )
+    missing = [answer_id for answer_id in dict.fromkeys(ids) if answer_id not in found]
+    return answers, missing
+
+
+@app.post(
+    "/answers:lookup", response_model=AnswerLookupResponse, summary="回答一括取得"
+)
+async def lookup_answers(
+    request: BatchLookupRequest,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> AnswerLookupResponse:
+    """
+    IDの一覧に一致する回答を1回のクエリでリクエスト順に取得します。
+
+    - **ids**: 取得する回答IDの一覧
+    """
+    if shards is not None:
+        answers, missing = await _lookup_sharded_answers(db, shards, request.ids)
+        return {"items": answers, "missing": missing}
+    answers, missing = await lookup_by_ids(
+        db,
+        Answer,
+        request.ids,
+        [selectinload(Answer.question).selectinload(Question.genre)],
+    )
+    return {"items": answers, "missing": missing}
+
+
 @app.get(
     "/answers/{answer_id}", response_model=AnswerWithQuestion, summary="回答詳細取得"
 )
 async def get_answer(
-    answer_id: str, db: AsyncSession = Depends(get_db)
+    answer_id: str,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
 ) -> AnswerWithQuestion:
     """
-    指定されたIDの回答詳細を取得します。
+    指定されたIDの回答詳細を取得します。保持期間を過ぎてアーカイブした回答も取得できます。
 
     - **answer_id**: 回答のID（UUID形式）
     """
-    result = await db.execute(
-        select(Answer)
-        .options(selectinload(Answer.question).selectinload(Question.genre))
-        .where(Answer.id == answer_id)
-    )
+    if shards is not None:
+        found = await answer_shards.answers_by_ids(shards, [answer_id])
+        if answer_id in found:
+            return (await answer_shards.attach_questions(db, [found[answer_id]]))[0]
+
+    result = await db.execute(ANSWER_BY_ID, {"answer_id": answer_id})
     answer = result.scalar_one_or_none()
+    if not answer:
+        answer = await get_archived_answer(db, answer_id)
 
     if not answer:
         raise HTTPException(
@@ -263,23 +832,24 @@ async def get_answer(
     summary="質問別回答取得",
 )
 async def get_answers_by_question(
-    question_id: str, db: AsyncSession = Depends(get_db)
+    question_id: str,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
 ) -> List[AnswerResponse]:
     """
     指定された質問に対する回答の一覧を取得します。
 
     - **question_id**: 質問のID（UUID形式）
     """
-    # 質問の存在確認
-    question_result = await db.execute(
-        select(Question).where(Question.id == question_id)
-    )
-    if not question_result.scalar_one_or_none():
+    # 質問の存在確認（本文は取得しない）
+    if await db.scalar(QUESTION_EXISTS, {"question_id": question_id}) is None:
         raise HTTPException(
             status_code=404, detail=f"質問ID '{question_id}' が見つかりません"
         )
 
     # 回答を取得
+    if shards is not None:
+        return await answer_shards.answers_for_question(shards, question_id)
     result = await db.execute(select(Answer).where(Answer.question_id == question_id))
     answers = result.scalars().all()
 
@@ -292,18 +862,30 @@ async def get_answers_by_question(
     summary="質問と回答の詳細取得",
 )
 async def get_question_with_answers(
-    question_id: str, db: AsyncSession = Depends(get_db)
-) -> Dict:
+    question_id: str,
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> Dict | Response:
     """
     質問とその回答をまとめて取得します。
 
     - **question_id**: 質問のID（UUID形式）
     """
+    # 回答をシャーディングしている場合は回答と質問を1つのクエリで結合できない
+    if SERVER_SIDE_JSON and shards is None:
+        document = await fetch_question_details_json(db, question_id)
+        if document is None:
+            raise HTTPException(
+                status_code=404, detail=f"質問ID '{question_id}' が見つかりません"
+            )
+        return json_document_response(document)
+
     # 質問を取得（ジャンルと回答を含む）
+    options = [selectinload(Question.genre)]
+    if shards is None:
+        options.append(selectinload(Question.answers))
     question_result = await db.execute(
-        select(Question)
-        .options(selectinload(Question.genre), selectinload(Question.answers))
-        .where(Question.id == question_id)
+        select(Question).options(*options).where(Question.id == question_id)
     )
     question = question_result.scalar_one_or_none()
 
@@ -312,6 +894,20 @@ async def get_question_with_answers(
             status_code=404, detail=f"質問ID '{question_id}' が見つかりません"
         )
 
+    if shards is not None:
+        answers = await answer_shards.answers_for_question(shards, question_id)
+    else:
+        answers = [
+            {
+                "id": answer.id,
+                "answer": answer.answer,
+                "question_id": answer.question_id,
+                "created_at": answer.created_at,
+                "updated_at": answer.updated_at,
+            }
+            for answer in question.answers
+        ]
+
     # レスポンス用のデータを構築
     return {
         "question": {
@@ -327,15 +923,154 @@ async def get_question_with_answers(
                 "updated_at": question.genre.updated_at,
             },
         },
-        "answers": [
-            {
-                "id": answer.id,
-                "answer": answer.answer,
-                "question_id": answer.question_id,
-                "created_at": answer.created_at,
-                "updated_at": answer.updated_at,
-            }
-            for answer in question.answers
-        ],
-        "answer_count": len(question.answers),
+        "answers": answers,
+        "answer_count": len(answers),
     }
+
+
+# ===== 変更フィード関連エンドポイント =====
+@app.get("/changes", response_model=ChangesResponse, summary="変更差分取得")
+async def get_changes(
+    since: str | None = Query(None, description="前回のレスポンスのnext_cursor"),
+    limit: int = Query(
+        100, ge=1, le=CHANGES_MAX_LIMIT, description="返す変更の最大件数"
+    ),
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> ChangesResponse:
+    """
+    カーソル以降に作成・更新されたジャンル・質問・回答を (updated_at, id) の順で取得します。
+
+    - **since**: 前回のレスポンスのnext_cursor（省略時は最初から）
+    - **limit**: 3テーブル合計で返す変更の最大件数
+    - has_moreがtrueの間はnext_cursorを指定して続きを取得してください
+    - 直近の変更は次回も重複して返るため、(id, updated_at) で重複を除いてください
+    """
+    return await fetch_changes(db, since, limit, shards)
+
+
+# ===== インポート関連エンドポイント =====
+@app.post("/import", response_model=ImportResponse, summary="CSV/JSONLの一括インポート")
+async def import_records(
+    request: Request,
+    format: ImportFormat | None = None,
+    chunk_size: int = Query(
+        IMPORT_CHUNK_SIZE,
+        ge=1,
+        le=IMPORT_MAX_CHUNK_SIZE,
+        description="1トランザクションで書き込む行数",
+    ),
+    db: AsyncSession = Depends(get_db),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> ImportResponse:
+    """
+    リクエストボディのCSVまたはJSONLを逐次解析し、ジャンル・質問・回答を一括登録します。
+
+    - **format**: csv / jsonl（省略時はContent-Typeから判定）
+    - **chunk_size**: 1トランザクションで書き込む行数
+    - 各行は genre（必須）・question・answer の3項目（CSVは1行目がヘッダー）
+    - 不正な行はスキップし、行番号とエラー内容を errors に返します
+    """
+    _require_unsharded(shards)
+    import_format = format or detect_format(request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail="text/csv または application/x-ndjson を指定してください",
+        )
+
+    importer = BulkImporter(db, chunk_size)
+    try:
+        result = await importer.run(iter_records(request.stream(), import_format))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="UTF-8として解析できません")
+    return result.to_dict()
+
+
+# ===== エクスポート関連エンドポイント =====
+@app.get("/export/{table}", summary="テーブルの列指向エクスポート")
+async def export_table(
+    table: ExportTable,
+    format: ExportFormat = "parquet",
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+    shards: AnswerShards | None = Depends(get_answer_shards),
+) -> StreamingResponse:
+    """
+    テーブル全体をParquetまたはArrow IPCストリームとしてダウンロードします。
+
+    - **table**: genres / questions / answers のいずれか
+    - **format**: parquet（既定）または arrow
+    """
+    if table == "answers":
+        _require_unsharded(shards)
+    if not pyarrow_available():
+        raise HTTPException(
+            status_code=501, detail="エクスポート機能は有効になっていません"
+        )
+
+    filename = f"{table}.{FILE_EXTENSIONS[format]}"
+    return StreamingResponse(
+        stream_export(table, format, session_factory=session_factory),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ===== プロファイル関連エンドポイント =====
+def verify_profile_token(
+    x_profile_token: str | None = Header(default=None),
+) -> None:
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="プロファイラは無効です")
+    # トークン未設定（サンプリングのみ有効）の場合はダウンロードを許可しない
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(
+            status_code=403, detail="プロファイルの取得権限がありません"
+        )
+
+
+@app.get(
+    "/profiles",
+    summary="取得済みプロファイル一覧",
+    dependencies=[Depends(verify_profile_token)],
+)
+def get_profiles() -> List[Dict[str, Any]]:
+    """
+    リングバッファに保持されているプロファイルの概要を新しい順に取得します。
+    """
+    return [profile.summary() for profile in reversed(profiler.profiles)]
+
+
+@app.get(
+    "/profiles/{profile_id}",
+    summary="プロファイルのダウンロード",
+    dependencies=[Depends(verify_profile_token)],
+)
+def get_profile(
+    profile_id: str, format: Literal["speedscope", "collapsed"] = "speedscope"
+) -> Any:
+    """
+    指定されたプロファイルをダウンロードします。
+
+    - **profile_id**: レスポンスヘッダー X-Profile-Id の値
+    - **format**: speedscope（既定、JSON）または collapsed（flamegraph.pl形式）
+    """
+    profile = profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=404, detail=f"プロファイルID '{profile_id}' が見つかりません"
+        )
+
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(profile),
+            headers={
+                "Content-Disposition": f'attachment; filename="{profile_id}.folded"'
+            },
+        )
+    return JSONResponse(
+        to_speedscope(profile),
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'
+        },
+    )
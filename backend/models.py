@@ -1,28 +1,62 @@
 import uuid
-from datetime import datetime
-from typing import TYPE_CHECKING, List
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, List
 
+from body_compression import CompressedText
 from database import Base
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
-from sqlalchemy.dialects.mysql import CHAR
+from sqlalchemy import (
+    CHAR,
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql.functions import FunctionElement
 
 if TYPE_CHECKING:
     pass  # 必要に応じて循環インポート回避用
 
+# 作成・更新日時はマイクロ秒まで保持する（MySQLのDATETIMEは既定で秒単位のため）
+Timestamp = DateTime(timezone=True).with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+class now_us(FunctionElement):
+    """マイクロ秒精度の現在日時（server_default・onupdate用）"""
+
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(now_us)
+def _compile_now_us(element: now_us, compiler: Any, **kw: Any) -> str:
+    return "CURRENT_TIMESTAMP(6)"
+
+
+@compiles(now_us, "sqlite")
+def _compile_now_us_sqlite(element: now_us, compiler: Any, **kw: Any) -> str:
+    # SQLAlchemyがSQLiteのDateTimeをバインドする形式（マイクロ秒6桁）に合わせる
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
 
 class Genre(Base):
     __tablename__ = "genres"
+    # 変更フィード（/changes）の範囲検索用
+    __table_args__ = (Index("ix_genres_updated_at_id", "updated_at", "id"),)
 
     id: Mapped[str] = mapped_column(
         CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     genre_name: Mapped[str] = mapped_column(String(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
-    )
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=now_us())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        Timestamp, server_default=now_us(), onupdate=now_us()
     )
 
     # リレーション
@@ -33,6 +67,12 @@ class Genre(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    # 変更フィード（/changes）の範囲検索用
+    __table_args__ = (
+        Index("ix_questions_updated_at_id", "updated_at", "id"),
+        # ジャンル内のランダム抽出（sampling.py）用
+        Index("ix_questions_genre_id_id", "genre_id", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4())
@@ -40,12 +80,10 @@ class Question(Base):
     genre_id: Mapped[str] = mapped_column(
         CHAR(36), ForeignKey("genres.id"), nullable=False
     )
-    question: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
-    )
+    question: Mapped[str] = mapped_column(CompressedText, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=now_us())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        Timestamp, server_default=now_us(), onupdate=now_us()
     )
 
     # リレーション
@@ -55,6 +93,11 @@ class Question(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    # 変更フィード（/changes）の範囲検索用
+    __table_args__ = (
+        Index("ix_answers_updated_at_id", "updated_at", "id"),
+        Index("ix_answers_question_id", "question_id"),
+    )
 
     id: Mapped[str] = mapped_column(
         CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4())
@@ -62,13 +105,100 @@ class Answer(Base):
     question_id: Mapped[str] = mapped_column(
         CHAR(36), ForeignKey("questions.id"), nullable=False
     )
-    answer: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
-    )
+    answer: Mapped[str] = mapped_column(CompressedText, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=now_us())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        Timestamp, server_default=now_us(), onupdate=now_us()
     )
 
     # リレーション
     question: Mapped["Question"] = relationship("Question", back_populates="answers")
+
+
+class ArchivedAnswer(Base):
+    """保持期間を過ぎて answers から移動した回答（answer_archive.py で移動）"""
+
+    __tablename__ = "answers_archive"
+    # 参照されることの少ない行のため、MySQLでは圧縮した行形式で保持する
+    __table_args__ = {"mysql_row_format": "COMPRESSED", "mysql_key_block_size": "8"}
+
+    id: Mapped[str] = mapped_column(CHAR(36), primary_key=True)
+    question_id: Mapped[str] = mapped_column(CHAR(36), nullable=False, index=True)
+    answer: Mapped[str] = mapped_column(CompressedText, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(Timestamp, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp, nullable=False)
+
+    # 質問は削除されないため外部キーは持たず、読み取り専用のリレーションのみ定義する
+    question: Mapped["Question"] = relationship(
+        "Question",
+        primaryjoin="foreign(ArchivedAnswer.question_id) == Question.id",
+        viewonly=True,
+    )
+
+
+# SQLiteではINTEGER PRIMARY KEYのみ自動採番されるため、BigIntegerはIntegerに置き換える
+EventId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class OutboxEvent(Base):
+    """作成系エンドポイントと同じトランザクションで書き込む変更イベント"""
+
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(EventId, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    aggregate_id: Mapped[str] = mapped_column(CHAR(36), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=now_us())
+
+
+class OutboxWatermark(Base):
+    """リレーごとの配信済みイベントIDの位置"""
+
+    __tablename__ = "outbox_watermarks"
+
+    relay_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(EventId, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        Timestamp, server_default=now_us(), onupdate=now_us()
+    )
+
+
+class GenreStats(Base):
+    """ジャンルごとの件数のロールアップ（genre_stats.py で更新）"""
+
+    __tablename__ = "genre_stats"
+
+    genre_id: Mapped[str] = mapped_column(CHAR(36), primary_key=True)
+    question_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    answer_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    unanswered_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class GenreDailyAnswers(Base):
+    """ジャンル・日付ごとの回答数のロールアップ"""
+
+    __tablename__ = "genre_daily_answers"
+
+    genre_id: Mapped[str] = mapped_column(CHAR(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    answer_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class QuestionStats(Base):
+    """質問ごとの回答数（未回答数の増減の判定に使う）"""
+
+    __tablename__ = "question_stats"
+    __table_args__ = (
+        # ジャンル内の未回答の質問のランダム抽出（sampling.py）用
+        Index(
+            "ix_question_stats_genre_id_answer_count",
+            "genre_id",
+            "answer_count",
+            "question_id",
+        ),
+    )
+
+    question_id: Mapped[str] = mapped_column(CHAR(36), primary_key=True)
+    genre_id: Mapped[str] = mapped_column(CHAR(36), nullable=False)
+    answer_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
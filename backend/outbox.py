@@ -0,0 +1,259 @@
+"""
+トランザクショナルアウトボックス
+
+作成系エンドポイント（ジャンル・質問・回答）は、作成した行と同じトランザクションで
+outbox_events にイベントを書き込みます。行の作成とイベントの記録は必ず同時に
+コミット（またはロールバック）されるため、下流の利用者は一覧エンドポイントを
+ポーリングせずに変更を受け取れます。
+
+リレーは別プロセスで outbox_events をID順に読み出し、バッチ単位でシンクへ配信します。
+
+- 配信が成功した後にのみウォーターマーク（outbox_watermarks）を進めるため、
+  配信後・コミット前に停止した場合は同じイベントを再配信します（at-least-once）
+- 自動採番のIDはコミット順ではないため、IDの欠番は後からコミットされる可能性があります。
+  欠番の手前で配信を止め、OUTBOX_GAP_TIMEOUT 秒を過ぎても埋まらない欠番
+  （ロールバックされた採番）だけを読み飛ばします
+
+コマンドラインからの利用例::
+
+    python outbox.py --sink events.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Union
+
+from database import AsyncSessionLocal, engine
+from models import Answer, Genre, OutboxEvent, OutboxWatermark, Question
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Trueにすると作成系エンドポイントでイベントを記録する
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "false").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+# この時間を過ぎても埋まらないIDの欠番は読み飛ばす（秒）
+OUTBOX_GAP_TIMEOUT = float(os.getenv("OUTBOX_GAP_TIMEOUT", "30"))
+
+
+async def record_event(
+    db: AsyncSession,
+    event_type: str,
+    entity: Union[Genre, Question, Answer],
+    data: Dict[str, Any],
+) -> None:
+    """
+    作成した行のイベントを呼び出し元のトランザクションに追加します。
+
+    行のIDを確定させるためにflushしますが、コミットは呼び出し元で行います。
+    OUTBOX_ENABLED が無効の場合は何もしません。
+    """
+    if not OUTBOX_ENABLED:
+        return
+    await db.flush()
+    payload = {"id": entity.id, **data}
+    db.add(
+        OutboxEvent(
+            event_type=event_type,
+            aggregate_id=entity.id,
+            payload=json.dumps(payload, ensure_ascii=False, default=str),
+        )
+    )
+
+
+def event_to_dict(event: OutboxEvent) -> Dict[str, Any]:
+    """シンクへ配信するイベントの形式に変換します。"""
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_id": event.aggregate_id,
+        "data": json.loads(event.payload),
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+class OutboxSink(Protocol):
+    """イベントの配信先。例外を送出した場合、そのバッチは次回再配信されます。"""
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None: ...
+
+
+class FileSink:
+    """イベントを1行1件のJSONとしてファイルに追記するシンク"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        # ファイル書き込みでイベントループを止めない
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class QueueSink:
+    """asyncio.Queueへイベントを積むシンク（メッセージキューの代替・テスト用）"""
+
+    def __init__(self, queue: Optional[asyncio.Queue] = None):
+        self.queue: asyncio.Queue = queue or asyncio.Queue()
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            await self.queue.put(event)
+
+
+class OutboxRelay:
+    """
+    outbox_events をバッチ単位でシンクへ配信するリレー
+
+    relay_name ごとにウォーターマークを持つため、配信先ごとに別のリレーを動かせます。
+    delete_published を有効にすると配信済みのイベントを削除します（リレーが1つの場合のみ）。
+    """
+
+    def __init__(
+        self,
+        sink: OutboxSink,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        relay_name: str = "default",
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        gap_timeout: float = OUTBOX_GAP_TIMEOUT,
+        delete_published: bool = False,
+    ):
+        self.sink = sink
+        self.session_factory = session_factory
+        self.relay_name = relay_name
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self.delete_published = delete_published
+        self.published = 0
+        # 欠番のID -> 最初に検出した時刻
+        self._gaps: Dict[int, float] = {}
+
+    async def relay_once(self) -> int:
+        """1バッチ分のイベントを配信し、配信した件数を返します。"""
+        async with self.session_factory() as session:
+            watermark = await session.get(OutboxWatermark, self.relay_name)
+            if watermark is None:
+                watermark = OutboxWatermark(relay_name=self.relay_name, last_event_id=0)
+                session.add(watermark)
+
+            result = await session.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.id > watermark.last_event_id)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            events = self._contiguous(
+                watermark.last_event_id, list(result.scalars().all())
+            )
+            if not events:
+                await session.rollback()
+                return 0
+
+            # 配信に失敗した場合はウォーターマークを進めずに例外を伝播する
+            await self.sink.publish([event_to_dict(event) for event in events])
+
+            last_event_id = events[-1].id
+            watermark.last_event_id = last_event_id
+            if self.delete_published:
+                await session.execute(
+                    delete(OutboxEvent).where(OutboxEvent.id <= last_event_id)
+                )
+            await session.commit()
+
+        self.published += len(events)
+        return len(events)
+
+    def _contiguous(
+        self, last_event_id: int, events: List[OutboxEvent]
+    ) -> List[OutboxEvent]:
+        """欠番の手前までのイベントを返します。期限切れの欠番は読み飛ばします。"""
+        now = time.monotonic()
+        expected = last_event_id + 1
+        contiguous = []
+        for event in events:
+            if event.id != expected:
+                first_seen = self._gaps.setdefault(expected, now)
+                if now - first_seen < self.gap_timeout:
+                    break
+                logger.warning(
+                    "outbox: IDの欠番 %d-%d を読み飛ばします", expected, event.id - 1
+                )
+                del self._gaps[expected]
+            contiguous.append(event)
+            expected = event.id + 1
+        return contiguous
+
+    async def run(
+        self,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        stop: Optional[asyncio.Event] = None,
+    ) -> None:
+        """停止するまでイベントを配信し続けます。配信に失敗した場合は待機して再試行します。"""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                published = await self.relay_once()
+            except Exception:
+                logger.exception("outbox: イベントの配信に失敗しました")
+                published = 0
+            # 1バッチ分が埋まっている間は待たずに続きを配信する
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="アウトボックスのイベント配信")
+    parser.add_argument(
+        "--sink", type=Path, required=True, help="追記先のJSONLファイル"
+    )
+    parser.add_argument("--relay-name", default="default")
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=OUTBOX_POLL_INTERVAL)
+    parser.add_argument(
+        "--delete-published", action="store_true", help="配信済みのイベントを削除する"
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="未配信分を配信して終了する"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    relay = OutboxRelay(
+        FileSink(args.sink),
+        relay_name=args.relay_name,
+        batch_size=args.batch_size,
+        delete_published=args.delete_published,
+    )
+
+    async def run() -> None:
+        try:
+            if args.once:
+                while await relay.relay_once():
+                    pass
+            else:
+                await relay.run(args.interval)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    print(f"published: {relay.published}")
+
+
+if __name__ == "__main__":
+    main()
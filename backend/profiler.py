@@ -0,0 +1,393 @@
+"""
+リクエスト単位のオンデマンドプロファイラ
+
+ヘッダー（X-Profile-Token）またはサンプリング率で選ばれたリクエストについて、
+ウォールクロックのスタックサンプリングを行います。
+サンプリングはイベントループとは別のスレッドで行い、対象リクエストのタスクが
+実行中であればそのスタックを、await中であればコルーチンの待機チェーンを記録します。
+
+各サンプルには取得時点のフェーズ（dependencies / handler / serialization / send）を
+ルートフレームとして付与するため、フレームグラフ上で get_db などの依存解決、
+ハンドラ本体、response_model による検証・シリアライズの時間配分が分かります。
+
+取得したプロファイル（/profiles）のダウンロードには常に X-Profile-Token が必要で、
+PROFILER_TOKEN が未設定の場合はサンプリングだけが行われ、ダウンロードは403になります。
+
+PROFILER_TOKEN と PROFILER_SAMPLE_RATE のどちらも設定されていない場合は
+ミドルウェアもイベントも登録されず、通常のリクエストに一切コストはかかりません。
+"""
+
+import asyncio
+import collections
+import contextvars
+import functools
+import hmac
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Counter, Deque, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN") or None
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_ENABLED = PROFILER_TOKEN is not None or PROFILER_SAMPLE_RATE > 0
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.001"))
+PROFILER_BUFFER_SIZE = int(os.getenv("PROFILER_BUFFER_SIZE", "50"))
+PROFILER_MAX_DEPTH = 128
+
+PROFILE_HEADER = "x-profile-token"
+
+# プロファイル自体の取得リクエストは対象外にする
+_EXCLUDED_PREFIXES = ("/profiles",)
+
+# (関数名, ファイル名, 行番号)
+Frame = Tuple[str, str, int]
+
+_PHASES = ("dependencies", "handler", "serialization", "send")
+
+
+@dataclass
+class Profile:
+    """1リクエスト分のプロファイル結果"""
+
+    method: str
+    path: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: datetime = field(default_factory=datetime.now)
+    status_code: Optional[int] = None
+    task: Optional[asyncio.Task] = None
+    # 同期ハンドラがスレッドプールで実行中の場合のスレッドID
+    worker_thread_id: Optional[int] = None
+    phase: str = "dependencies"
+    # フェーズごとの開始時刻（perf_counter）
+    marks: Dict[str, float] = field(default_factory=dict)
+    finished: Optional[float] = None
+    db_time: float = 0.0
+    db_queries: int = 0
+    stacks: Counter[Tuple[Frame, ...]] = field(default_factory=collections.Counter)
+    sample_count: int = 0
+
+    def enter(self, phase: str) -> None:
+        self.phase = phase
+        self.marks.setdefault(phase, time.perf_counter())
+
+    @property
+    def duration(self) -> float:
+        start = self.marks.get("dependencies", 0.0)
+        return (self.finished or time.perf_counter()) - start
+
+    def phase_times(self) -> Dict[str, float]:
+        """フェーズごとの所要時間（ミリ秒）を返します。"""
+        times: Dict[str, float] = {}
+        marked = [p for p in _PHASES if p in self.marks]
+        for index, phase in enumerate(marked):
+            end = (
+                self.marks[marked[index + 1]]
+                if index + 1 < len(marked)
+                else self.finished or time.perf_counter()
+            )
+            times[phase] = round((end - self.marks[phase]) * 1000, 3)
+        times["db"] = round(self.db_time * 1000, 3)
+        return times
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "phases_ms": self.phase_times(),
+            "db_queries": self.db_queries,
+            "samples": self.sample_count,
+        }
+
+
+_active_profile: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+
+def _frame_stack(frame: Any, limit: int = PROFILER_MAX_DEPTH) -> List[Frame]:
+    """実行中のフレームからイベントループの外枠を除いたスタックを返します（外側が先頭）。"""
+    stack: List[Frame] = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        if code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        stack.append((code.co_qualname, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro: Any, limit: int = PROFILER_MAX_DEPTH) -> List[Frame]:
+    """中断中のコルーチンの待機チェーンを辿ったスタックを返します（外側が先頭）。"""
+    stack: List[Frame] = []
+    while coro is not None and len(stack) < limit:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            if isinstance(coro, asyncio.Future):
+                stack.append(("[await]", "", 0))
+            break
+        code = frame.f_code
+        stack.append((code.co_qualname, code.co_filename, frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class Profiler:
+    """プロファイル対象の選択、サンプリングスレッド、リングバッファを管理します。"""
+
+    def __init__(
+        self,
+        token: Optional[str] = PROFILER_TOKEN,
+        sample_rate: float = PROFILER_SAMPLE_RATE,
+        interval: float = PROFILER_INTERVAL,
+        buffer_size: int = PROFILER_BUFFER_SIZE,
+    ) -> None:
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.profiles: Deque[Profile] = collections.deque(maxlen=buffer_size)
+        self._active: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """ヘッダーのトークンが設定値と一致するかどうかを返します。"""
+        if self.token is None or token is None:
+            return False
+        return hmac.compare_digest(self.token, token)
+
+    def should_profile(self, path: str, token: Optional[str]) -> bool:
+        if path.startswith(_EXCLUDED_PREFIXES):
+            return False
+        if self.authorized(token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, profile: Profile) -> None:
+        profile.task = asyncio.current_task()
+        profile.enter("dependencies")
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._sample_loop, name="profiler", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> None:
+        profile.finished = time.perf_counter()
+        profile.task = None
+        with self._lock:
+            self._active.remove(profile)
+        self.profiles.append(profile)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+                loop, thread_id = self._loop, self._loop_thread_id
+            self._sample(active, loop, thread_id)
+
+    def _sample(
+        self,
+        active: List[Profile],
+        loop: Optional[asyncio.AbstractEventLoop],
+        thread_id: Optional[int],
+    ) -> None:
+        current = asyncio.current_task(loop) if loop else None
+        frames = sys._current_frames()
+        for profile in active:
+            task = profile.task
+            if task is None:
+                continue
+            if task is current and thread_id is not None:
+                stack = _frame_stack(frames.get(thread_id))
+            else:
+                stack = _await_stack(task.get_coro())
+                worker = profile.worker_thread_id
+                if worker is not None and stack and stack[-1][0] == "[await]":
+                    # スレッドプールで実行中の同期ハンドラのスタックをつなげる
+                    stack[-1:] = _frame_stack(frames.get(worker))
+            root: Frame = (f"[{profile.phase}]", "", 0)
+            profile.stacks[(root, *stack)] += 1
+            profile.sample_count += 1
+
+
+profiler = Profiler()
+
+
+def to_speedscope(profile: Profile, interval: float = PROFILER_INTERVAL) -> Dict:
+    """プロファイルを speedscope 形式（https://www.speedscope.app）に変換します。"""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[Dict[str, Any]] = []
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in profile.stacks.most_common():
+        indices = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                name, file, line = frame
+                entry: Dict[str, Any] = {"name": name}
+                if file:
+                    entry.update(file=file, line=line)
+                frames.append(entry)
+            indices.append(frame_index[frame])
+        samples.append(indices)
+        weights.append(round(count * interval * 1000, 3))
+    name = f"{profile.method} {profile.path}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "name": name,
+        "exporter": "bedrock-test-profiler",
+    }
+
+
+def to_collapsed(profile: Profile) -> str:
+    """プロファイルを flamegraph.pl 互換の collapsed 形式に変換します。"""
+    lines = []
+    for stack, count in profile.stacks.most_common():
+        names = ";".join(
+            f"{name} ({os.path.basename(file)}:{line})" if file else name
+            for name, file, line in stack
+        )
+        lines.append(f"{names} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _profiled_endpoint(endpoint: Callable) -> Callable:
+    """ハンドラ本体の開始・終了をプロファイルに記録するラッパー"""
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = _active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.enter("handler")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.enter("serialization")
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.enter("handler")
+        profile.worker_thread_id = threading.get_ident()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.worker_thread_id = None
+            profile.enter("serialization")
+
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """ハンドラ本体の実行区間を計測するルートクラス"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info["profiler_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    started = conn.info.pop("profiler_query_start", None)
+    if profile is not None and started is not None:
+        profile.db_time += time.perf_counter() - started
+        profile.db_queries += 1
+
+
+def install_query_timing(engine: AsyncEngine) -> None:
+    """プロファイル中のリクエストについてドライバでのクエリ実行時間を集計します。"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilerMiddleware:
+    """選ばれたリクエストのプロファイルを取得するASGIミドルウェア"""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler = profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for key, value in scope.get("headers", ()):
+            if key == PROFILE_HEADER.encode():
+                token = value.decode("latin-1")
+                break
+        if not self.profiler.should_profile(scope["path"], token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(method=scope["method"], path=scope["path"])
+
+        async def wrapped_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                profile.enter("send")
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        context_token = _active_profile.set(profile)
+        self.profiler.start(profile)
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            self.profiler.stop(profile)
+            _active_profile.reset(context_token)
@@ -0,0 +1,99 @@
+"""
+ジャンル内の質問のランダム抽出
+
+クイズの出題用に、ジャンル内の質問をランダムに（または未回答の質問から）選びます。
+ORDER BY RAND() は全件を並べ替えるため、ジャンルが大きくなるほど遅くなります。
+ここでは候補の件数をロールアップ（genre_stats）から主キーで読み、
+[0, 件数) から重複なしに選んだ位置を、候補のインデックスの
+ORDER BY id LIMIT 1 OFFSET 位置 で引きます。n件の抽出は UNION ALL でまとめた1回のクエリです。
+
+- 位置を一様に選ぶため、どの候補も同じ確率で選ばれます
+- 未回答の候補は question_stats（質問ごとの回答数）の (genre_id, answer_count, question_id)
+  のインデックスから引くため、回答済みの質問の数や並びに関わらず、
+  OFFSETの読み飛ばしはインデックスのみで完結します
+- STATS_ROLLUP_ENABLED が無効の場合やロールアップに行がないジャンルでは、
+  件数をCOUNTで数え、未回答の判定に answers を参照します
+  （いずれもジャンルの大きさに比例するため、ロールアップの利用を前提とします）
+
+ロールアップの件数が実際とずれている場合（再集計前など）は、n件より少なく返すことがあります。
+"""
+
+import random
+from typing import List, Optional
+
+from genre_stats import STATS_ROLLUP_ENABLED
+from models import Answer, GenreStats, Question, QuestionStats
+from sqlalchemy import Select, exists, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 1回のリクエストで抽出できる質問の上限
+SAMPLE_MAX_N = 50
+
+
+def _candidates(genre_id: str, unanswered: bool) -> Select:
+    """抽出の候補となる質問のIDをIDの順に返すクエリ"""
+    if not unanswered:
+        return (
+            select(Question.id)
+            .where(Question.genre_id == genre_id)
+            .order_by(Question.id)
+        )
+    if STATS_ROLLUP_ENABLED:
+        return (
+            select(QuestionStats.question_id.label("id"))
+            .where(QuestionStats.genre_id == genre_id, QuestionStats.answer_count == 0)
+            .order_by(QuestionStats.question_id)
+        )
+    return (
+        select(Question.id)
+        .where(
+            Question.genre_id == genre_id,
+            ~exists().where(Answer.question_id == Question.id),
+        )
+        .order_by(Question.id)
+    )
+
+
+async def _candidate_count(
+    db: AsyncSession, genre_id: str, unanswered: bool, candidates: Select
+) -> int:
+    """候補の件数を返します（ロールアップがあれば主キーで読む）。"""
+    count: Optional[int] = None
+    if STATS_ROLLUP_ENABLED:
+        column = (
+            GenreStats.unanswered_count if unanswered else GenreStats.question_count
+        )
+        count = await db.scalar(select(column).where(GenreStats.genre_id == genre_id))
+    if count is None:
+        count = await db.scalar(select(func.count()).select_from(candidates.subquery()))
+    return max(count or 0, 0)
+
+
+async def sample_questions(
+    db: AsyncSession, genre_id: str, n: int, unanswered: bool = False
+) -> List[Question]:
+    """
+    ジャンルから重複なしで最大n件の質問をランダムに選びます。
+
+    unansweredがTrueの場合は回答のない質問だけを対象にします。
+    候補がn件未満の場合は候補を全て返します。
+    """
+    candidates = _candidates(genre_id, unanswered)
+    count = await _candidate_count(db, genre_id, unanswered, candidates)
+    if count == 0:
+        return []
+
+    positions = random.sample(range(count), min(n, count))
+    picks = [
+        select(pick.c.id).select_from(pick)
+        for pick in (
+            candidates.limit(1).offset(position).subquery() for position in positions
+        )
+    ]
+    result = await db.scalars(
+        select(Question).where(Question.id.in_(union_all(*picks)))
+    )
+    questions = list(result)
+    # INの結果はIDの順に返るため、抽出順をランダムにする
+    random.shuffle(questions)
+    return questions
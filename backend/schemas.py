@@ -1,8 +1,11 @@
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
+# 一括取得で一度に指定できるIDの上限
+BATCH_LOOKUP_MAX_IDS = 100
+
 
 # ジャンル関連
 class GenreBase(BaseModel):
@@ -63,10 +66,113 @@ class QuestionWithGenre(QuestionResponse):
 
 
 class AnswerWithQuestion(AnswerResponse):
-    question: QuestionResponse = Field(..., description="関連する質問情報")
+    question: QuestionWithGenre = Field(..., description="関連する質問情報")
+
+
+class QuestionWithAnswers(QuestionResponse):
+    answer_count: int = Field(..., description="回答数")
+    answers: List[AnswerResponse] = Field(
+        default=[], description="回答一覧（件数上限あり）"
+    )
 
 
 class GenreWithQuestions(GenreResponse):
-    questions: List[QuestionResponse] = Field(
-        default=[], description="ジャンルに属する質問一覧"
+    question_count: int = Field(default=0, description="ジャンルに属する質問数")
+    questions: List[QuestionWithAnswers] = Field(
+        default=[], description="ジャンルに属する質問一覧（件数上限あり）"
+    )
+
+
+# 一括取得
+class BatchLookupRequest(BaseModel):
+    ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_LOOKUP_MAX_IDS,
+        description="取得するIDの一覧（UUID形式）",
+    )
+
+
+class GenreLookupResponse(BaseModel):
+    items: List[GenreResponse] = Field(
+        ..., description="見つかったジャンル（リクエスト順）"
+    )
+    missing: List[str] = Field(..., description="見つからなかったID")
+
+
+class QuestionLookupResponse(BaseModel):
+    items: List[QuestionWithGenre] = Field(
+        ..., description="見つかった質問（リクエスト順）"
+    )
+    missing: List[str] = Field(..., description="見つからなかったID")
+
+
+class AnswerLookupResponse(BaseModel):
+    items: List[AnswerWithQuestion] = Field(
+        ..., description="見つかった回答（リクエスト順）"
+    )
+    missing: List[str] = Field(..., description="見つからなかったID")
+
+
+# 変更フィード
+class ChangesResponse(BaseModel):
+    genres: List[GenreResponse] = Field(default=[], description="変更されたジャンル")
+    questions: List[QuestionResponse] = Field(default=[], description="変更された質問")
+    answers: List[AnswerResponse] = Field(default=[], description="変更された回答")
+    next_cursor: Optional[str] = Field(
+        None, description="次回のリクエストのsinceに指定するカーソル"
     )
+    has_more: bool = Field(..., description="続きの変更があるかどうか")
+
+
+# 一括インポート
+class ImportRowError(BaseModel):
+    line: int = Field(..., description="エラーになった行番号（1始まり）")
+    error: str = Field(..., description="エラー内容")
+
+
+class ImportResponse(BaseModel):
+    rows: int = Field(..., description="処理した行数")
+    inserted: Dict[str, int] = Field(..., description="テーブルごとの登録件数")
+    error_count: int = Field(..., description="エラーになった行数")
+    errors: List[ImportRowError] = Field(
+        ..., description="行ごとのエラー（先頭100件まで）"
+    )
+    chunks: int = Field(..., description="書き込んだチャンク数")
+    elapsed_seconds: float = Field(..., description="処理時間（秒）")
+    rows_per_second: float = Field(..., description="スループット（行/秒）")
+
+
+class TrendingQuestion(BaseModel):
+    question_id: str = Field(..., description="質問のID")
+    genre_id: str = Field(..., description="質問のジャンルのID")
+    answer_count: int = Field(..., description="ウィンドウ内の回答数")
+
+
+class TrendingResponse(BaseModel):
+    window: str = Field(..., description="集計したウィンドウ")
+    questions: List[TrendingQuestion] = Field(
+        ..., description="ウィンドウ内の回答数が多い順の質問"
+    )
+
+
+class DailyAnswerCount(BaseModel):
+    day: date = Field(..., description="日付")
+    answer_count: int = Field(..., description="その日の回答数")
+
+
+class StatsBase(BaseModel):
+    question_count: int = Field(..., description="質問数")
+    answer_count: int = Field(..., description="回答数")
+    unanswered_count: int = Field(..., description="回答のない質問の数")
+    answers_per_day: List[DailyAnswerCount] = Field(
+        ..., description="直近の日ごとの回答数（古い順）"
+    )
+
+
+class GenreStatsResponse(StatsBase):
+    genre_id: str = Field(..., description="ジャンルのID")
+
+
+class StatsResponse(StatsBase):
+    genre_count: int = Field(..., description="ジャンル数")
@@ -0,0 +1,41 @@
+"""
+主キー検索などの頻出クエリの文
+
+リクエストごとに select(...).options(...).where(...) を組み立てると、文の構築と
+キャッシュキーの生成でPythonの処理が毎回発生します。頻出の文はここでバインド
+パラメータを使って一度だけ組み立て、値は実行時に渡します::
+
+    await db.execute(QUESTION_BY_ID, {"question_id": question_id})
+
+SQLAlchemyのコンパイル済みキャッシュは同じ文オブジェクトの2回目以降の実行で
+再利用されるため、文の構築とSQLのコンパイルはプロセスで1回だけになります。
+"""
+
+from models import Answer, Genre, Question
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import selectinload
+
+# ジャンルの存在確認（IDのみ取得する）
+GENRE_EXISTS = select(Genre.id).where(Genre.id == bindparam("genre_id"))
+
+# 質問の存在確認（本文は取得しない）
+QUESTION_EXISTS = select(Question.id).where(Question.id == bindparam("question_id"))
+
+# 回答作成時の質問の存在確認と、統計・トレンドに記録するジャンルIDの取得
+QUESTION_GENRE_ID = select(Question.genre_id).where(
+    Question.id == bindparam("question_id")
+)
+
+# 質問詳細（ジャンルを含む）
+QUESTION_BY_ID = (
+    select(Question)
+    .options(selectinload(Question.genre))
+    .where(Question.id == bindparam("question_id"))
+)
+
+# 回答詳細（質問とジャンルを含む）
+ANSWER_BY_ID = (
+    select(Answer)
+    .options(selectinload(Answer.question).selectinload(Question.genre))
+    .where(Answer.id == bindparam("answer_id"))
+)
@@ -0,0 +1,81 @@
+"""
+テスト共通のフィクスチャ
+
+スキーマはワーカープロセスごとに1回だけ作成し、各テストは外側のトランザクション内で実行して
+終了時にロールバックします。リクエストごとのセッションはSAVEPOINTで外側のトランザクションに
+参加するため、ハンドラ内のcommitはSAVEPOINTの解放になり、テスト間でデータは残りません。
+
+DATABASE_URLが未指定の場合はSQLiteのインメモリDBを使用するため、
+pytest-xdist（pytest -n auto）で並列実行してもワーカー間でDBは共有されません。
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from typing import AsyncIterator  # noqa: E402
+
+import pytest_asyncio  # noqa: E402
+from database import Base, engine, get_db, get_session_factory  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from main import app  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+)
+
+
+@pytest_asyncio.fixture(scope="session")
+async def db_schema() -> AsyncIterator[None]:
+    """ワーカープロセスごとにスキーマを作成します。"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_connection(db_schema: None) -> AsyncIterator[AsyncConnection]:
+    """テストごとに外側のトランザクションを開始し、終了時にロールバックします。"""
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            yield conn
+        finally:
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_connection: AsyncConnection) -> AsyncIterator[AsyncSession]:
+    """テストコードから直接使用するセッション"""
+    async with AsyncSession(
+        bind=db_connection, join_transaction_mode="create_savepoint"
+    ) as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client(db_connection: AsyncConnection) -> AsyncIterator[AsyncClient]:
+    """get_dbをテスト用のトランザクションに参加するセッションに差し替えたクライアント"""
+    session_factory = async_sessionmaker(
+        bind=db_connection,
+        autoflush=False,
+        join_transaction_mode="create_savepoint",
+    )
+
+    async def override_get_db() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            yield ac
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_session_factory, None)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    RoutePolicy,
+    classify_request,
+)
+
+WRITE = RoutePolicy("write", priority=1, max_concurrency=2, max_queue=2)
+HEAVY = RoutePolicy("heavy", priority=3, max_concurrency=1, max_queue=2)
+
+
+class TestAdmissionController:
+    """アドミッション制御のテストクラス"""
+
+    def test_classify_request(self):
+        """ルートクラス判定のテスト"""
+        assert classify_request("GET", "/health_check") == "light"
+        assert classify_request("POST", "/answers") == "write"
+        assert classify_request("GET", "/answers") == "heavy"
+        assert classify_request("GET", "/export/answers") == "heavy"
+        assert classify_request("GET", "/answers/abc") == "read"
+        assert classify_request("POST", "/answers:lookup") == "read"
+        assert classify_request("GET", "/answers", b"ids=a,b") == "read"
+        assert classify_request("POST", "/import") == "heavy"
+        assert classify_request("GET", "/questions", b"genre_id=a") == "heavy"
+
+    @pytest.mark.asyncio
+    async def test_per_class_concurrency_limit(self):
+        """クラスごとの同時実行数上限のテスト"""
+        controller = AdmissionController(capacity=4, max_queue=4, queue_timeout=0.05)
+        await controller.acquire(HEAVY)
+
+        # heavyは1件までなので待ち行列でタイムアウトする
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(HEAVY)
+
+        # writeは別枠なので即座に実行できる
+        await controller.acquire(WRITE)
+        assert controller.in_flight == 2
+        assert controller.rejected == {"heavy": 1}
+
+    @pytest.mark.asyncio
+    async def test_queue_full_sheds_immediately(self):
+        """待ち行列が満杯の場合に即座に拒否されるテスト"""
+        controller = AdmissionController(capacity=1, max_queue=1, queue_timeout=5)
+        await controller.acquire(WRITE)
+        waiter = asyncio.create_task(controller.acquire(WRITE))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(WRITE)
+
+        controller.release(WRITE)
+        await waiter
+        assert controller.in_flight == 1
+        assert controller.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_write_preempts_queued_heavy(self):
+        """書き込みが待機中の重い一覧取得より優先されるテスト"""
+        controller = AdmissionController(capacity=1, max_queue=1, queue_timeout=5)
+        await controller.acquire(WRITE)
+        heavy = asyncio.create_task(controller.acquire(HEAVY))
+        await asyncio.sleep(0)
+
+        # 待ち行列は満杯だが、優先度の低いheavyを押し出して待機する
+        write = asyncio.create_task(controller.acquire(WRITE))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await heavy
+
+        controller.release(WRITE)
+        await write
+        assert controller.snapshot()["in_flight_by_class"] == {"write": 1}
+
+
+class TestAdmissionMiddleware:
+    """アドミッション制御ミドルウェアのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_rejection_returns_503_with_retry_after(self):
+        """拒否時に503とRetry-Afterが返るテスト"""
+        controller = AdmissionController(capacity=1, max_queue=0, queue_timeout=0)
+        await controller.acquire(WRITE)
+
+        async def app(scope, receive, send):
+            raise AssertionError("拒否されたリクエストは実行されない")
+
+        middleware = AdmissionMiddleware(app, controller=controller, retry_after=3)
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/answers"}
+        await middleware(scope, None, send)
+
+        assert messages[0]["status"] == 503
+        assert (b"retry-after", b"3") in messages[0]["headers"]
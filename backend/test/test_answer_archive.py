@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from answer_archive import archive_answers, partition_definitions
+from httpx import AsyncClient
+from models import Answer, ArchivedAnswer
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+
+async def _create_answers(client: AsyncClient, count: int) -> list:
+    genre_response = await client.post("/genres", json={"genre_name": "アーカイブ"})
+    question_response = await client.post(
+        "/questions",
+        json={"genre_id": genre_response.json()["id"], "question": "質問"},
+    )
+    answer_ids = []
+    for i in range(count):
+        response = await client.post(
+            "/answers",
+            json={"question_id": question_response.json()["id"], "answer": f"回答{i}"},
+        )
+        answer_ids.append(response.json()["id"])
+    return answer_ids
+
+
+async def _age(db_session: AsyncSession, answer_ids: list, days: int) -> None:
+    """回答の作成日時をdays日前にします。"""
+    created_at = datetime.now() - timedelta(days=days)
+    await db_session.execute(
+        update(Answer).where(Answer.id.in_(answer_ids)).values(created_at=created_at)
+    )
+    await db_session.commit()
+
+
+class TestAnswerArchive:
+    """回答のアーカイブのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_archive_moves_old_answers(
+        self,
+        client: AsyncClient,
+        db_connection: AsyncConnection,
+        db_session: AsyncSession,
+    ):
+        """保持期間を過ぎた回答だけがアーカイブへ移動し、IDで取得できるテスト"""
+        answer_ids = await _create_answers(client, 3)
+        await _age(db_session, answer_ids[:2], days=400)
+        session_factory = async_sessionmaker(
+            bind=db_connection, join_transaction_mode="create_savepoint"
+        )
+
+        moved = await archive_answers(session_factory, retention_days=365)
+        # 再実行しても移動済みの回答は重複しない
+        moved_again = await archive_answers(session_factory, retention_days=365)
+        answers = await client.get("/answers")
+        archived = await client.get(f"/answers/{answer_ids[0]}")
+        hot = await client.get(f"/answers/{answer_ids[2]}")
+
+        # アサーション
+        assert moved == 2
+        assert moved_again == 0
+        assert [a["id"] for a in answers.json()] == [answer_ids[2]]
+        assert archived.status_code == 200
+        assert archived.json()["answer"] == "回答0"
+        assert archived.json()["question"]["genre"]["genre_name"] == "アーカイブ"
+        assert hot.json()["answer"] == "回答2"
+        assert await db_session.scalar(select(func.count(ArchivedAnswer.id))) == 2
+
+    @pytest.mark.asyncio
+    async def test_time_bounded_answer_list(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """作成日時の範囲で回答一覧を絞り込むテスト"""
+        answer_ids = await _create_answers(client, 3)
+        await _age(db_session, answer_ids[:1], days=40)
+        since = (datetime.now() - timedelta(days=30)).isoformat()
+
+        recent = await client.get("/answers", params={"created_since": since})
+        old = await client.get("/answers", params={"created_until": since})
+
+        # アサーション
+        assert sorted(a["id"] for a in recent.json()) == sorted(answer_ids[1:])
+        assert [a["id"] for a in old.json()] == answer_ids[:1]
+
+    def test_partition_definitions(self):
+        """月ごとのパーティション定義のテスト"""
+        definitions = partition_definitions(date(2025, 11, 15), date(2026, 1, 1))
+
+        # アサーション
+        assert definitions == [
+            "PARTITION p202511 VALUES LESS THAN ('2025-12-01 00:00:00')",
+            "PARTITION p202512 VALUES LESS THAN ('2026-01-01 00:00:00')",
+            "PARTITION p202601 VALUES LESS THAN ('2026-02-01 00:00:00')",
+        ]
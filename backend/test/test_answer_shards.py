@@ -0,0 +1,166 @@
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from answer_shards import AnswerShards, get_answer_shards, shard_index
+from database import create_engine_from_url
+from httpx import AsyncClient
+from main import app
+from models import Answer
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+SHARD_COUNT = 3
+
+
+@pytest_asyncio.fixture
+async def shards(client: AsyncClient) -> AsyncIterator[AnswerShards]:
+    """インメモリのSQLiteを回答のシャードにしたクライアント"""
+    engines = [
+        create_engine_from_url("sqlite+aiosqlite://") for _ in range(SHARD_COUNT)
+    ]
+    shards = AnswerShards([async_sessionmaker(bind=e) for e in engines])
+    shards.engines = engines
+    await shards.create_tables()
+    app.dependency_overrides[get_answer_shards] = lambda: shards
+    try:
+        yield shards
+    finally:
+        app.dependency_overrides.pop(get_answer_shards, None)
+        await shards.dispose()
+
+
+async def _create_data(client: AsyncClient, question_count: int = 6) -> dict:
+    genre_response = await client.post("/genres", json={"genre_name": "シャード"})
+    genre_id = genre_response.json()["id"]
+    question_ids, answer_ids = [], []
+    for i in range(question_count):
+        response = await client.post(
+            "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+        )
+        question_id = response.json()["id"]
+        question_ids.append(question_id)
+        for j in range(2):
+            response = await client.post(
+                "/answers",
+                json={"question_id": question_id, "answer": f"質問{i}の回答{j}"},
+            )
+            answer_ids.append(response.json()["id"])
+    return {
+        "genre_id": genre_id,
+        "question_ids": question_ids,
+        "answer_ids": answer_ids,
+    }
+
+
+class TestAnswerShards:
+    """回答のシャーディングのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_answers_are_routed_by_question(
+        self, client: AsyncClient, db_session: AsyncSession, shards: AnswerShards
+    ):
+        """回答がquestion_idのハッシュで振り分けられ、プライマリには書き込まれないテスト"""
+        data = await _create_data(client)
+
+        counts = await shards.gather(
+            lambda session: session.scalar(select(func.count()).select_from(Answer))
+        )
+        primary = await db_session.scalar(select(func.count()).select_from(Answer))
+        expected = [0] * SHARD_COUNT
+        for question_id in data["question_ids"]:
+            expected[shard_index(question_id, SHARD_COUNT)] += 2
+
+        # アサーション
+        assert counts == expected
+        assert primary == 0
+
+    @pytest.mark.asyncio
+    async def test_per_question_endpoints(
+        self, client: AsyncClient, shards: AnswerShards
+    ):
+        """質問ごとのエンドポイントが質問のシャードから回答を返すテスト"""
+        data = await _create_data(client)
+        question_id = data["question_ids"][1]
+
+        answers = await client.get(f"/questions/{question_id}/answers")
+        details = await client.get(f"/questions/{question_id}/details")
+        tree = await client.get(f"/genres/{data['genre_id']}/tree")
+
+        # アサーション
+        assert [a["answer"] for a in answers.json()] == ["質問1の回答0", "質問1の回答1"]
+        assert details.json()["answer_count"] == 2
+        assert details.json()["question"]["genre"]["genre_name"] == "シャード"
+        assert [q["answer_count"] for q in tree.json()["questions"]] == [2] * 6
+        assert all(len(q["answers"]) == 2 for q in tree.json()["questions"])
+
+    @pytest.mark.asyncio
+    async def test_global_reads_scatter_and_gather(
+        self, client: AsyncClient, shards: AnswerShards
+    ):
+        """全体の一覧・ID指定の取得が全シャードをマージするテスト"""
+        data = await _create_data(client)
+        answer_ids = data["answer_ids"]
+
+        answers = await client.get("/answers")
+        answer = await client.get(f"/answers/{answer_ids[5]}")
+        lookup = await client.post(
+            "/answers:lookup", json={"ids": [answer_ids[3], "missing", answer_ids[0]]}
+        )
+        by_ids = await client.get("/answers", params={"ids": answer_ids[2]})
+
+        # アサーション
+        listed = answers.json()
+        assert {a["id"] for a in listed} == set(answer_ids)
+        keys = [(a["created_at"], a["id"]) for a in listed]
+        assert keys == sorted(keys)
+        assert all(a["question"]["genre"]["genre_name"] == "シャード" for a in listed)
+        assert answer.json()["answer"] == "質問2の回答1"
+        assert [a["id"] for a in lookup.json()["items"]] == [
+            answer_ids[3],
+            answer_ids[0],
+        ]
+        assert lookup.json()["missing"] == ["missing"]
+        assert [a["id"] for a in by_ids.json()] == [answer_ids[2]]
+
+    @pytest.mark.asyncio
+    async def test_changes_merge_cursors_across_shards(
+        self, client: AsyncClient, shards: AnswerShards
+    ):
+        """変更フィードのカーソルで全シャードの回答を漏れなく取得できるテスト"""
+        data = await _create_data(client)
+
+        seen: set[str] = set()
+        cursor = None
+        for _ in range(20):
+            params = {"limit": 4}
+            if cursor:
+                params["since"] = cursor
+            page = (await client.get("/changes", params=params)).json()
+            seen.update(a["id"] for a in page["answers"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+
+        # アサーション
+        assert seen == set(data["answer_ids"])
+
+    @pytest.mark.asyncio
+    async def test_unsupported_features(
+        self, client: AsyncClient, shards: AnswerShards
+    ):
+        """シャーディングに対応していない機能は501を返すテスト"""
+        data = await _create_data(client, question_count=1)
+
+        imported = await client.post(
+            "/import",
+            content="genre,question,answer\nA,B,C\n",
+            headers={"Content-Type": "text/csv"},
+        )
+        unanswered = await client.get(
+            f"/genres/{data['genre_id']}/questions/unanswered"
+        )
+
+        # アサーション
+        assert imported.status_code == 501
+        assert unanswered.status_code == 501
@@ -1,11 +1,11 @@
-import pytest_asyncio
+import pytest
 from httpx import AsyncClient
 
 
 class TestAnswerEndpoints:
     """回答エンドポイントのテストクラス"""
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_answer_success(self, client: AsyncClient):
         """回答作成成功のテスト"""
         # 事前準備：ジャンルと質問を作成
@@ -39,7 +39,7 @@ class TestAnswerEndpoints:
         assert "updated_at" in data
         assert len(data["id"]) == 36  # UUID形式
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_answer_invalid_question_id(self, client: AsyncClient):
         """存在しない質問IDでの回答作成エラーテスト"""
         # 存在しない質問IDを使用
@@ -52,7 +52,7 @@ class TestAnswerEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_answer_empty_answer(self, client: AsyncClient):
         """空の回答でのバリデーションエラーテスト"""
         # 事前準備：ジャンルと質問を作成
@@ -71,7 +71,7 @@ class TestAnswerEndpoints:
         # アサーション
         assert response.status_code == 422  # バリデーションエラー
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_empty(self, client: AsyncClient):
         """回答一覧取得（空）のテスト"""
         response = await client.get("/answers")
@@ -81,7 +81,7 @@ class TestAnswerEndpoints:
         data = response.json()
         assert data == []
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_with_data(self, client: AsyncClient):
         """回答一覧取得（データあり）のテスト"""
         # 事前準備：ジャンル、質問、回答を作成
@@ -126,7 +126,7 @@ class TestAnswerEndpoints:
             assert answer["question"]["question"] == "Pythonとは何ですか？"
             assert answer["question"]["genre"]["genre_name"] == "プログラミング"
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_filtered_by_question(self, client: AsyncClient):
         """質問IDでフィルタした回答一覧取得のテスト"""
         # 事前準備：複数の質問と回答を作成
@@ -165,7 +165,7 @@ class TestAnswerEndpoints:
         assert all(a["question_id"] == question1_id for a in data)
         assert all("Python" in a["answer"] for a in data)
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answer_by_id_success(self, client: AsyncClient):
         """回答詳細取得成功のテスト"""
         # 事前準備：ジャンル、質問、回答を作成
@@ -195,7 +195,7 @@ class TestAnswerEndpoints:
         assert data["question"]["question"] == "機械学習とは何ですか？"
         assert data["question"]["genre"]["genre_name"] == "機械学習"
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answer_by_id_not_found(self, client: AsyncClient):
         """存在しない回答IDでの詳細取得エラーテスト"""
         response = await client.get("/answers/non-existent-id")
@@ -205,7 +205,7 @@ class TestAnswerEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_by_question_success(self, client: AsyncClient):
         """質問別回答取得成功のテスト"""
         # 事前準備：ジャンル、質問、回答を作成
@@ -234,7 +234,7 @@ class TestAnswerEndpoints:
         assert len(data) == 2
         assert all(a["question_id"] == question_id for a in data)
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_by_question_not_found(self, client: AsyncClient):
         """存在しない質問IDでの回答取得エラーテスト"""
         response = await client.get("/questions/non-existent-question-id/answers")
@@ -244,7 +244,7 @@ class TestAnswerEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_answers_by_question_empty(self, client: AsyncClient):
         """回答のない質問での取得テスト"""
         # 事前準備：ジャンルと質問のみ作成（回答は作成しない）
@@ -264,7 +264,7 @@ class TestAnswerEndpoints:
         data = response.json()
         assert data == []
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_question_with_answers_success(self, client: AsyncClient):
         """質問と回答の詳細取得成功のテスト"""
         # 事前準備：ジャンル、質問、回答を作成
@@ -317,7 +317,7 @@ class TestAnswerEndpoints:
         assert "データから知見を得る学問分野です。" in answer_texts
         assert "統計学、機械学習、プログラミングを組み合わせます。" in answer_texts
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_question_with_answers_not_found(self, client: AsyncClient):
         """存在しない質問IDでの詳細取得エラーテスト"""
         response = await client.get("/questions/non-existent-question-id/details")
@@ -331,7 +331,7 @@ class TestAnswerEndpoints:
 class TestAnswerIntegration:
     """回答機能の統合テストクラス"""
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_complete_answer_workflow(self, client: AsyncClient):
         """回答機能の完全なワークフローテスト"""
         # 1. ジャンル作成
@@ -384,7 +384,7 @@ class TestAnswerIntegration:
         assert integrated["answer_count"] == 1
         assert integrated["answers"][0]["id"] == answer_id
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_multiple_answers_per_question(self, client: AsyncClient):
         """1つの質問に対する複数回答のテスト"""
         # 事前準備
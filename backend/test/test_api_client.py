@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+from api_client import ApiClient, ApiError, NotFoundError
+from httpx import ASGITransport, AsyncClient
+from main import app
+from schemas import QuestionWithGenre
+
+
+class TestApiClient:
+    """APIクライアントのテストクラス"""
+
+    async def _create_questions(self, client: AsyncClient, count: int) -> list:
+        genre_response = await client.post(
+            "/genres", json={"genre_name": "クライアント"}
+        )
+        genre_id = genre_response.json()["id"]
+        ids = []
+        for i in range(count):
+            response = await client.post(
+                "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+            )
+            ids.append(response.json()["id"])
+        return ids
+
+    @pytest.mark.asyncio
+    async def test_get_question_is_coalesced(self, client: AsyncClient):
+        """同時に呼ばれたget_questionが1回の一括取得にまとめられることのテスト"""
+        question_ids = await self._create_questions(client, 3)
+        paths = []
+
+        async def record(request: httpx.Request) -> None:
+            paths.append(request.url.path)
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://test",
+            event_hooks={"request": [record]},
+        ) as http:
+            async with ApiClient(http_client=http) as api:
+                results = await asyncio.gather(
+                    *(api.get_question(i) for i in question_ids + [question_ids[0]]),
+                    api.get_question("missing-id"),
+                    return_exceptions=True,
+                )
+
+        # アサーション
+        assert paths == ["/questions:lookup"]
+        found = [q for q in results[:4] if isinstance(q, QuestionWithGenre)]
+        assert [q.id for q in found] == question_ids + [question_ids[0]]
+        assert found[0].genre.genre_name == "クライアント"
+        assert isinstance(results[4], NotFoundError)
+
+    @pytest.mark.asyncio
+    async def test_retry_with_backoff(self):
+        """503で再試行し、作成系は同じ冪等キーで再送することのテスト"""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if len(requests) in (3, 8):
+                return httpx.Response(
+                    200,
+                    json=[]
+                    if request.method == "GET"
+                    else {
+                        "id": "genre-id",
+                        "genre_name": "再試行",
+                        "created_at": "2026-01-01T00:00:00",
+                        "updated_at": "2026-01-01T00:00:00",
+                    },
+                )
+            return httpx.Response(503, json={"detail": "混雑"})
+
+        async with AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://test"
+        ) as http:
+            api = ApiClient(http_client=http, backoff_base=0, max_retries=2)
+            genres = await api.list_genres()
+            with pytest.raises(ApiError) as exc_info:
+                await api.list_genres()
+            genre = await api.create_genre("再試行")
+
+        # アサーション
+        assert genres == []
+        assert exc_info.value.status_code == 503
+        assert [r.method for r in requests] == ["GET"] * 6 + ["POST"] * 2
+        keys = {r.headers["idempotency-key"] for r in requests[6:]}
+        assert len(keys) == 1
+        assert genre.id == "genre-id"
+
+    @pytest.mark.asyncio
+    async def test_iter_changes_pages(self, client: AsyncClient):
+        """変更フィードをページごとに最後まで取得できることのテスト"""
+        question_ids = await self._create_questions(client, 4)
+
+        async with ApiClient(http_client=client) as api:
+            pages = [page async for page in api.iter_changes(page_size=2)]
+
+        # アサーション
+        assert len(pages) >= 3
+        assert not pages[-1].has_more
+        seen = {q.id for page in pages for q in page.questions}
+        assert set(question_ids) <= seen
@@ -0,0 +1,84 @@
+import pytest
+from httpx import AsyncClient
+
+
+class TestBatchLookupEndpoints:
+    """一括取得エンドポイントのテストクラス"""
+
+    async def _create_questions(self, client: AsyncClient, count: int) -> list:
+        genre_response = await client.post("/genres", json={"genre_name": "一括取得"})
+        genre_id = genre_response.json()["id"]
+        question_ids = []
+        for i in range(count):
+            response = await client.post(
+                "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+            )
+            question_ids.append(response.json()["id"])
+        return question_ids
+
+    @pytest.mark.asyncio
+    async def test_get_questions_by_ids_in_request_order(self, client: AsyncClient):
+        """IDを指定した質問取得がリクエスト順で返るテスト"""
+        question_ids = await self._create_questions(client, 3)
+        requested = [question_ids[2], "non-existent-id", question_ids[0]]
+
+        response = await client.get("/questions", params={"ids": ",".join(requested)})
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert [q["id"] for q in data] == [question_ids[2], question_ids[0]]
+        assert data[0]["genre"]["genre_name"] == "一括取得"
+        assert response.headers["x-missing-ids"] == "non-existent-id"
+
+        # 全て見つかった場合はヘッダーを付与しない
+        found = await client.get("/questions", params={"ids": question_ids[1]})
+        assert "x-missing-ids" not in found.headers
+
+    @pytest.mark.asyncio
+    async def test_lookup_questions(self, client: AsyncClient):
+        """質問一括取得（POST）のテスト"""
+        question_ids = await self._create_questions(client, 2)
+
+        response = await client.post(
+            "/questions:lookup",
+            json={"ids": [question_ids[1], question_ids[0], "missing-id"]},
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert [q["id"] for q in data["items"]] == [question_ids[1], question_ids[0]]
+        assert data["missing"] == ["missing-id"]
+
+    @pytest.mark.asyncio
+    async def test_lookup_answers_and_genres(self, client: AsyncClient):
+        """回答・ジャンル一括取得のテスト"""
+        question_ids = await self._create_questions(client, 1)
+        answer_response = await client.post(
+            "/answers", json={"question_id": question_ids[0], "answer": "回答"}
+        )
+        answer_id = answer_response.json()["id"]
+
+        answers = await client.post("/answers:lookup", json={"ids": [answer_id]})
+        genres = await client.get("/genres", params={"ids": "missing-id"})
+
+        # アサーション
+        assert answers.status_code == 200
+        assert answers.json()["items"][0]["question"]["id"] == question_ids[0]
+        assert answers.json()["missing"] == []
+        assert genres.status_code == 200
+        assert genres.json() == []
+        assert genres.headers["x-missing-ids"] == "missing-id"
+
+    @pytest.mark.asyncio
+    async def test_lookup_too_many_ids(self, client: AsyncClient):
+        """上限を超えるIDを指定した場合のエラーテスト"""
+        ids = [f"id-{i}" for i in range(101)]
+
+        get_response = await client.get("/answers", params={"ids": ",".join(ids)})
+        post_response = await client.post("/answers:lookup", json={"ids": ids})
+
+        # アサーション
+        assert get_response.status_code == 400
+        assert post_response.status_code == 422
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import body_compression
+import main
+import pytest
+from body_compression import ZSTD_MAGIC, BodyCodec
+from httpx import AsyncClient
+from models import Answer, Question
+from sqlalchemy import LargeBinary, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+zstandard = pytest.importorskip("zstandard")
+
+LONG_TEXT = "日本の首都は東京です。東京には多くの観光地があります。" * 20
+
+
+class TestBodyCompression:
+    """本文の圧縮保存のテストクラス"""
+
+    def test_codec_round_trip(self):
+        """短い本文はそのまま、長い本文は圧縮して保存し、元に戻せることのテスト"""
+        codec = BodyCodec(min_bytes=64)
+
+        short = codec.encode("短い本文")
+        long = codec.encode(LONG_TEXT)
+
+        # アサーション
+        assert short == "短い本文".encode()
+        assert long.startswith(ZSTD_MAGIC)
+        assert len(long) < len(LONG_TEXT.encode())
+        assert codec.decode(short) == "短い本文"
+        assert codec.decode(long) == LONG_TEXT
+
+    def test_codec_with_dictionary(self):
+        """学習した辞書で短い本文も圧縮され、辞書を入れ替えても古い行を展開できることのテスト"""
+        samples = [
+            f"質問{i}: 日本で一番高い山は何ですか？答えは富士山です。".encode()
+            for i in range(500)
+        ]
+        old_dict = zstandard.train_dictionary(4096, samples).as_bytes()
+        new_dict = zstandard.train_dictionary(8192, samples).as_bytes()
+        text = "質問9999: 日本で一番高い山は何ですか？答えは富士山です。"
+
+        encoded = BodyCodec([old_dict], min_bytes=16).encode(text)
+        rotated = BodyCodec([new_dict, old_dict], min_bytes=16)
+
+        # アサーション
+        assert encoded.startswith(ZSTD_MAGIC)
+        assert len(encoded) < len(text.encode()) // 2
+        assert rotated.decode(encoded) == text
+        with pytest.raises(RuntimeError):
+            BodyCodec([new_dict]).decode(encoded)
+
+    @pytest.mark.asyncio
+    async def test_api_round_trip(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """有効にすると本文が圧縮して保存され、APIからは元の本文が返ることのテスト"""
+        # 無効の間に保存した本文
+        genre_response = await client.post("/genres", json={"genre_name": "圧縮"})
+        legacy = await client.post(
+            "/questions",
+            json={"genre_id": genre_response.json()["id"], "question": LONG_TEXT},
+        )
+        monkeypatch.setattr(body_compression, "BODY_COMPRESSION", True)
+        monkeypatch.setattr(body_compression, "_codec", BodyCodec(min_bytes=64))
+
+        answer = await client.post(
+            "/answers",
+            json={"question_id": legacy.json()["id"], "answer": LONG_TEXT},
+        )
+        fetched = await client.get(f"/answers/{answer.json()['id']}")
+        stored_answer = await db_session.scalar(
+            select(type_coerce(Answer.answer, LargeBinary)).where(
+                Answer.id == answer.json()["id"]
+            )
+        )
+        stored_question = await db_session.scalar(
+            select(type_coerce(Question.question, LargeBinary)).where(
+                Question.id == legacy.json()["id"]
+            )
+        )
+
+        # アサーション
+        assert answer.status_code == 200
+        assert answer.json()["answer"] == LONG_TEXT
+        assert fetched.json()["answer"] == LONG_TEXT
+        assert fetched.json()["question"]["question"] == LONG_TEXT
+        assert stored_answer is not None
+        assert bytes(stored_answer).startswith(ZSTD_MAGIC)
+        # 無効の間に保存した本文はそのまま（SQLiteでは文字列として返る）
+        assert stored_question == LONG_TEXT
+
+    @pytest.mark.asyncio
+    async def test_startup_fails_on_missing_dictionary(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ):
+        """有効にした場合、辞書を読み込めなければ起動時に失敗することのテスト"""
+        monkeypatch.setattr(main, "BODY_COMPRESSION", True)
+        monkeypatch.setattr(body_compression, "_codec", None)
+        monkeypatch.setattr(
+            body_compression, "BODY_COMPRESSION_DICTS", [str(tmp_path / "none.dict")]
+        )
+
+        # アサーション
+        with pytest.raises(FileNotFoundError):
+            await main.load_body_codec()
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import pytest
+from change_feed import Cursor, decode_cursor, encode_cursor
+from httpx import AsyncClient
+from models import Answer, Genre, Question
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T1 = datetime(2024, 1, 1, 10, 0, 0)
+T2 = datetime(2024, 1, 1, 11, 0, 0)
+
+
+async def _sync(client: AsyncClient, since: str | None = None, limit: int = 100):
+    """has_moreがfalseになるまでカーソルをたどり、全ページと最後のカーソルを返します。"""
+    pages = []
+    params: Dict[str, Any] = {"limit": limit}
+    if since:
+        params["since"] = since
+    while True:
+        response = await client.get("/changes", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append(data)
+        if not data["has_more"]:
+            return pages, data["next_cursor"]
+        params = {"limit": limit, "since": data["next_cursor"]}
+
+
+def _ids(pages: list, key: str) -> list:
+    return [item["id"] for page in pages for item in page[key]]
+
+
+class TestChangesEndpoint:
+    """変更フィードエンドポイントのテストクラス"""
+
+    def test_cursor_round_trip(self):
+        """カーソルのエンコードとデコードのテスト"""
+        cursor = Cursor((datetime(2024, 1, 1, 10, 0, 0, 123456), "abc"), T2)
+        assert decode_cursor(encode_cursor(cursor)) == cursor
+
+    @pytest.mark.asyncio
+    async def test_changes_are_paginated_in_order(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """同じ更新日時の行を含む変更がカーソルで重複・欠落なく取得できるテスト"""
+        db_session.add_all(
+            [
+                Genre(id="g1", genre_name="ジャンル1", created_at=T1, updated_at=T1),
+                Genre(id="g2", genre_name="ジャンル2", created_at=T1, updated_at=T1),
+                Question(
+                    id="q1",
+                    genre_id="g1",
+                    question="質問",
+                    created_at=T1,
+                    updated_at=T1,
+                ),
+                *[
+                    Answer(
+                        id=f"a{i}",
+                        question_id="q1",
+                        answer="回答",
+                        created_at=T2,
+                        updated_at=T2,
+                    )
+                    for i in range(3)
+                ],
+            ]
+        )
+        await db_session.flush()
+
+        pages, _ = await _sync(client, limit=2)
+
+        # アサーション
+        ids = [
+            item["id"]
+            for page in pages
+            for key in ("genres", "questions", "answers")
+            for item in page[key]
+        ]
+        assert ids == ["g1", "g2", "q1", "a0", "a1", "a2"]
+        assert len(pages) == 3
+
+    @pytest.mark.asyncio
+    async def test_changes_since_cursor_returns_new_rows(self, client: AsyncClient):
+        """カーソル以降に作成された行が返るテスト"""
+        existing = await client.post("/genres", json={"genre_name": "既存"})
+        _, cursor = await _sync(client)
+
+        unchanged, unchanged_cursor = await _sync(client, cursor)
+        created = await client.post("/genres", json={"genre_name": "新規"})
+        latest, _ = await _sync(client, cursor)
+
+        # アサーション
+        # 直近の変更は重複範囲として再度返るが、カーソルは進まない
+        assert _ids(unchanged, "genres") == [existing.json()["id"]]
+        assert unchanged_cursor == cursor
+        assert _ids(latest, "genres")[-1] == created.json()["id"]
+
+    @pytest.mark.asyncio
+    async def test_late_commit_within_overlap_is_returned(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """カーソルより前の更新日時で後からコミットされた行も返るテスト"""
+        db_session.add(Genre(id="g2", genre_name="先", created_at=T2, updated_at=T2))
+        await db_session.flush()
+        _, cursor = await _sync(client)
+
+        # 同じ時刻の直前に採番され、後からコミットされた行
+        late_at = T2 - timedelta(milliseconds=1)
+        db_session.add(
+            Genre(id="g1", genre_name="後", created_at=late_at, updated_at=late_at)
+        )
+        await db_session.flush()
+        pages, _ = await _sync(client, cursor)
+
+        # アサーション
+        assert "g1" in _ids(pages, "genres")
+
+    @pytest.mark.asyncio
+    async def test_changes_invalid_cursor(self, client: AsyncClient):
+        """不正なカーソルでの変更取得エラーテスト"""
+        response = await client.get("/changes", params={"since": "not-a-cursor"})
+
+        # アサーション
+        assert response.status_code == 400
@@ -0,0 +1,123 @@
+import db_json
+import main
+import pytest
+from httpx import AsyncClient
+from models import Genre
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TestServerSideJson:
+    """DB側でJSONを生成するパスのテストクラス"""
+
+    async def _create_data(self, client: AsyncClient) -> dict:
+        genre_response = await client.post("/genres", json={"genre_name": "JSON生成"})
+        genre_id = genre_response.json()["id"]
+        question_ids = []
+        for i in range(2):
+            response = await client.post(
+                "/questions",
+                json={"genre_id": genre_id, "question": f'質問{i} "引用符"\n改行'},
+            )
+            question_ids.append(response.json()["id"])
+        for i in range(3):
+            await client.post(
+                "/answers", json={"question_id": question_ids[0], "answer": f"回答{i}"}
+            )
+        return {"genre_id": genre_id, "question_ids": question_ids}
+
+    async def _get_both(self, client: AsyncClient, url: str, monkeypatch):
+        monkeypatch.setattr(main, "SERVER_SIDE_JSON", False)
+        python_path = await client.get(url)
+        monkeypatch.setattr(main, "SERVER_SIDE_JSON", True)
+        db_path = await client.get(url)
+        return python_path, db_path
+
+    @pytest.mark.asyncio
+    async def test_question_details_matches_python_path(
+        self, client: AsyncClient, monkeypatch
+    ):
+        """質問詳細がPython側で生成した場合と同じ内容になるテスト"""
+        data = await self._create_data(client)
+
+        for question_id in data["question_ids"]:
+            python_path, db_path = await self._get_both(
+                client, f"/questions/{question_id}/details", monkeypatch
+            )
+
+            # アサーション
+            assert db_path.status_code == 200
+            expected = python_path.json()
+            actual = db_path.json()
+            assert actual["question"] == expected["question"]
+            key = lambda a: a["id"]  # noqa: E731
+            assert sorted(actual["answers"], key=key) == sorted(
+                expected["answers"], key=key
+            )
+            assert actual["answer_count"] == expected["answer_count"]
+            assert actual.keys() == expected.keys()
+
+    @pytest.mark.asyncio
+    async def test_genre_questions_matches_python_path(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        """ジャンル別質問一覧がPython側で生成した場合と同じ内容になるテスト"""
+        data = await self._create_data(client)
+        # 質問のないジャンルは空配列になる
+        db_session.add(Genre(id="empty", genre_name="空"))
+        await db_session.flush()
+
+        python_path, db_path = await self._get_both(
+            client, f"/genres/{data['genre_id']}/questions", monkeypatch
+        )
+        empty_python, empty_db = await self._get_both(
+            client, "/genres/empty/questions", monkeypatch
+        )
+
+        # アサーション
+        key = lambda q: q["id"]  # noqa: E731
+        assert sorted(db_path.json(), key=key) == sorted(python_path.json(), key=key)
+        assert empty_db.json() == empty_python.json() == []
+
+    @pytest.mark.asyncio
+    async def test_not_found(self, client: AsyncClient, monkeypatch):
+        """存在しないIDでのDB側JSON生成の404テスト"""
+        monkeypatch.setattr(main, "SERVER_SIDE_JSON", True)
+
+        question = await client.get("/questions/non-existent-id/details")
+        genre = await client.get("/genres/non-existent-id/questions")
+
+        # アサーション
+        assert question.status_code == 404
+        assert genre.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_document_is_fetched_as_bytes(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """JSON文書が文字列にデコードされずバイト列のまま取得されるテスト"""
+        data = await self._create_data(client)
+
+        document = await db_json.fetch_genre_questions_json(
+            db_session, data["genre_id"]
+        )
+        assert isinstance(document, bytes)
+        response = db_json.json_document_response(document)
+
+        # アサーション
+        assert "引用符".encode() in document
+        assert response.body is document
+
+    def test_mysql_statement_compiles(self):
+        """MySQL向けにJSON_OBJECT・JSON_ARRAYAGGで組み立てられるテスト"""
+        from sqlalchemy.dialects import mysql
+
+        d = db_json._Dialect("mysql")
+        sql = str(
+            d.array(d.array_agg(db_json._answer_object(d))).compile(
+                dialect=mysql.dialect()
+            )
+        )
+
+        assert "json_arrayagg(json_object(" in sql
+        assert "CAST(" in sql and "AS JSON)" in sql
+        assert "date_format(" in sql
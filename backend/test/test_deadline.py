@@ -0,0 +1,199 @@
+import asyncio
+
+import deadline
+import pytest
+from deadline import DeadlineExceeded, DeadlineMiddleware
+
+
+def _scope(method: str = "GET", path: str = "/answers/abc") -> dict:
+    return {"type": "http", "method": method, "path": path}
+
+
+class TestDeadline:
+    """リクエストデッドラインのテストクラス"""
+
+    def test_request_timeout_by_route(self):
+        """ルートごとの制限時間のテスト"""
+        assert deadline.request_timeout("GET", "/health_check") is None
+        assert deadline.request_timeout("GET", "/export/answers") is None
+        assert (
+            deadline.request_timeout("GET", "/answers")
+            == (deadline.REQUEST_TIMEOUTS["heavy"])
+        )
+
+    @pytest.mark.asyncio
+    async def test_max_execution_time_hint(self):
+        """SELECTにMAX_EXECUTION_TIMEヒントが付与されるテスト"""
+        loop = asyncio.get_running_loop()
+        token = deadline._deadline.set(loop.time() + 1.5)
+        try:
+            statement, _ = deadline._add_max_execution_time(
+                None, None, "SELECT answers.id FROM answers", {}, None, False
+            )
+            insert, _ = deadline._add_max_execution_time(
+                None, None, "INSERT INTO answers VALUES (%s)", {}, None, False
+            )
+        finally:
+            deadline._deadline.reset(token)
+
+        assert statement.startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+        assert statement.endswith(" answers.id FROM answers")
+        assert insert == "INSERT INTO answers VALUES (%s)"
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_raises(self):
+        """デッドライン超過後のクエリ発行が拒否されるテスト"""
+        loop = asyncio.get_running_loop()
+        token = deadline._deadline.set(loop.time() - 1)
+        try:
+            with pytest.raises(DeadlineExceeded):
+                deadline._add_max_execution_time(
+                    None, None, "SELECT 1", {}, None, False
+                )
+        finally:
+            deadline._deadline.reset(token)
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_504(self, monkeypatch):
+        """制限時間を超えた場合に504が返るテスト"""
+        monkeypatch.setitem(deadline.REQUEST_TIMEOUTS, "read", 0.05)
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def receive():
+            await asyncio.sleep(10)
+            return {"type": "http.disconnect"}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await DeadlineMiddleware(app)(_scope(), receive, send)
+
+        assert cancelled.is_set()
+        assert messages[0]["status"] == 504
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_handler(self):
+        """クライアント切断時にハンドラがキャンセルされるテスト"""
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await receive()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        messages = [
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await DeadlineMiddleware(app)(_scope(), receive, send)
+
+        assert cancelled.is_set()
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_get_handler(self):
+        """receive()を呼ばないGETのハンドラもクライアント切断時にキャンセルされるテスト"""
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        messages = [
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            if len(messages) == 1:
+                await asyncio.sleep(0.01)
+            return messages.pop(0)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(DeadlineMiddleware(app)(_scope(), receive, send), 1)
+
+        # アサーション
+        assert cancelled.is_set()
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_request_body_is_passed_through(self):
+        """ボディのあるリクエストでは受信したボディがそのままハンドラに渡るテスト"""
+        received = []
+
+        async def app(scope, receive, send):
+            received.append(await receive())
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        messages = [
+            {"type": "http.request", "body": b'{"a": 1}', "more_body": False},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        scope = {**_scope("POST", "/answers"), "headers": [(b"content-length", b"8")]}
+        await DeadlineMiddleware(app)(scope, receive, send)
+
+        # アサーション
+        assert received[0]["body"] == b'{"a": 1}'
+
+    @pytest.mark.asyncio
+    async def test_cleanup_after_response_is_not_cancelled(self):
+        """レスポンス送信後の切断では後処理がキャンセルされないテスト"""
+        cleaned_up = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await receive()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            await asyncio.sleep(0.01)
+            cleaned_up.set()
+
+        messages = [
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        await DeadlineMiddleware(app)(_scope(), receive, send)
+
+        assert cleaned_up.is_set()
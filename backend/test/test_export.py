@@ -0,0 +1,113 @@
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class TestExportEndpoints:
+    """エクスポートエンドポイントのテストクラス"""
+
+    async def _create_answers(self, client: AsyncClient, count: int) -> str:
+        genre_response = await client.post(
+            "/genres", json={"genre_name": "エクスポート"}
+        )
+        genre_id = genre_response.json()["id"]
+        question_response = await client.post(
+            "/questions", json={"genre_id": genre_id, "question": "エクスポート質問"}
+        )
+        question_id = question_response.json()["id"]
+        for i in range(count):
+            await client.post(
+                "/answers", json={"question_id": question_id, "answer": f"回答{i}"}
+            )
+        return question_id
+
+    @pytest.mark.asyncio
+    async def test_export_answers_parquet(self, client: AsyncClient):
+        """回答テーブルのParquetエクスポートのテスト"""
+        question_id = await self._create_answers(client, 3)
+
+        response = await client.get("/export/answers")
+
+        # アサーション
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows == 3
+        assert pa.types.is_dictionary(table.schema.field("question_id").type)
+        assert set(table.column("question_id").to_pylist()) == {question_id}
+
+    @pytest.mark.asyncio
+    async def test_export_questions_arrow(self, client: AsyncClient):
+        """質問テーブルのArrow IPCエクスポートのテスト"""
+        await self._create_answers(client, 1)
+
+        response = await client.get("/export/questions", params={"format": "arrow"})
+
+        # アサーション
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == 1
+        assert pa.types.is_dictionary(table.schema.field("genre_id").type)
+        assert table.column("question").to_pylist() == ["エクスポート質問"]
+
+    @pytest.mark.asyncio
+    async def test_export_invalid_table(self, client: AsyncClient):
+        """存在しないテーブル名でのエクスポートエラーテスト"""
+        response = await client.get("/export/users")
+
+        # アサーション
+        assert response.status_code == 422
+
+    def test_import_main_does_not_load_pyarrow(self):
+        """アプリの起動時にpyarrowを読み込まないことのテスト"""
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, main; print('pyarrow' in sys.modules)",
+            ],
+            cwd=Path(__file__).resolve().parent.parent,
+            env={**os.environ, "DATABASE_URL": "sqlite+aiosqlite://"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        # アサーション
+        assert result.stdout.strip() == "False"
+
+    def test_first_export_loads_pyarrow_off_the_event_loop(self):
+        """初回のエクスポートでpyarrowをイベントループのスレッド外で読み込むことのテスト"""
+        script = (
+            "import asyncio, sys, threading, export\n"
+            "async def run():\n"
+            "    pa = await export.load_pyarrow()\n"
+            "    return pa.__name__, threading.main_thread().ident\n"
+            "loaded_on = {}\n"
+            "original = export._require_pyarrow\n"
+            "def record():\n"
+            "    loaded_on['thread'] = threading.get_ident()\n"
+            "    return original()\n"
+            "export._require_pyarrow = record\n"
+            "name, main_ident = asyncio.run(run())\n"
+            "print(name, loaded_on['thread'] != main_ident)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).resolve().parent.parent,
+            env={**os.environ, "DATABASE_URL": "sqlite+aiosqlite://"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        # アサーション
+        assert result.stdout.strip() == "pyarrow True"
@@ -0,0 +1,45 @@
+import main
+import pytest
+from httpx import AsyncClient
+
+
+class TestFastReadPath:
+    """一覧取得のCore高速パスのテストクラス"""
+
+    async def _create_data(self, client: AsyncClient) -> None:
+        for genre_name in ("プログラミング", "データベース"):
+            genre_response = await client.post(
+                "/genres", json={"genre_name": genre_name}
+            )
+            genre_id = genre_response.json()["id"]
+            for i in range(2):
+                question_response = await client.post(
+                    "/questions",
+                    json={"genre_id": genre_id, "question": f"{genre_name}の質問{i}"},
+                )
+                question_id = question_response.json()["id"]
+                await client.post(
+                    "/answers", json={"question_id": question_id, "answer": "回答"}
+                )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", ["/questions", "/answers"])
+    async def test_fast_path_matches_orm_path(
+        self, client: AsyncClient, monkeypatch, path: str
+    ):
+        """高速パスとORMパスのレスポンスが一致するテスト"""
+        await self._create_data(client)
+
+        monkeypatch.setattr(main, "READ_FAST_PATH", False)
+        orm_response = await client.get(path)
+        monkeypatch.setattr(main, "READ_FAST_PATH", True)
+        fast_response = await client.get(path)
+
+        # アサーション
+        assert fast_response.status_code == 200
+        assert fast_response.headers["content-type"] == "application/json"
+        key = lambda item: item["id"]  # noqa: E731
+        assert sorted(fast_response.json(), key=key) == sorted(
+            orm_response.json(), key=key
+        )
+        assert len(fast_response.json()) == 4
@@ -0,0 +1,120 @@
+import genre_stats
+import pytest
+from genre_stats import rebuild_stats
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncConnection, async_sessionmaker
+
+
+async def _create_data(client: AsyncClient) -> dict:
+    genre_ids = []
+    for name in ["統計A", "統計B"]:
+        response = await client.post("/genres", json={"genre_name": name})
+        genre_ids.append(response.json()["id"])
+    question_ids = []
+    for i in range(3):
+        response = await client.post(
+            "/questions", json={"genre_id": genre_ids[0], "question": f"質問{i}"}
+        )
+        question_ids.append(response.json()["id"])
+    # 質問0に2件、質問1に1件の回答（質問2は未回答）
+    for question_id in [question_ids[0], question_ids[0], question_ids[1]]:
+        await client.post(
+            "/answers", json={"question_id": question_id, "answer": "回答"}
+        )
+    return {"genre_ids": genre_ids, "question_ids": question_ids}
+
+
+class TestGenreStats:
+    """ジャンルの統計のロールアップのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_genre_stats(self, client: AsyncClient):
+        """作成時に加算したロールアップからジャンルの統計を取得するテスト"""
+        data = await _create_data(client)
+
+        response = await client.get(
+            f"/genres/{data['genre_ids'][0]}/stats", params={"days": 7}
+        )
+        empty = await client.get(f"/genres/{data['genre_ids'][1]}/stats")
+
+        # アサーション
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["question_count"] == 3
+        assert stats["answer_count"] == 3
+        assert stats["unanswered_count"] == 1
+        assert len(stats["answers_per_day"]) == 7
+        assert stats["answers_per_day"][-1]["answer_count"] == 3
+        assert sum(d["answer_count"] for d in stats["answers_per_day"]) == 3
+        assert empty.json()["question_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_overall_stats_and_not_found(self, client: AsyncClient):
+        """全体の統計と存在しないジャンルのテスト"""
+        await _create_data(client)
+
+        response = await client.get("/stats", params={"days": 1})
+        not_found = await client.get("/genres/non-existent-id/stats")
+
+        # アサーション
+        assert response.json() == {
+            "genre_count": 2,
+            "question_count": 3,
+            "answer_count": 3,
+            "unanswered_count": 1,
+            "answers_per_day": [response.json()["answers_per_day"][0]],
+        }
+        assert response.json()["answers_per_day"][0]["answer_count"] == 3
+        assert not_found.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_incremental(
+        self, client: AsyncClient, db_connection: AsyncConnection, monkeypatch
+    ):
+        """ロールアップを無効にしていた間のデータも再集計で取り込まれるテスト"""
+        await _create_data(client)
+        incremental = (await client.get("/stats", params={"days": 1})).json()
+        monkeypatch.setattr(genre_stats, "STATS_ROLLUP_ENABLED", False)
+        await client.post(
+            "/import",
+            content="genre,question,answer\n統計C,質問X,回答\n統計C,質問Y,\n",
+            headers={"Content-Type": "text/csv"},
+        )
+        stale = (await client.get("/stats", params={"days": 1})).json()
+
+        await rebuild_stats(
+            async_sessionmaker(
+                bind=db_connection, join_transaction_mode="create_savepoint"
+            )
+        )
+        rebuilt = (await client.get("/stats", params={"days": 1})).json()
+
+        # アサーション
+        assert stale == incremental
+        assert rebuilt["genre_count"] == 3
+        assert rebuilt["question_count"] == 5
+        assert rebuilt["answer_count"] == 4
+        assert rebuilt["unanswered_count"] == 2
+        assert rebuilt["answers_per_day"][0]["answer_count"] == 4
+
+    @pytest.mark.asyncio
+    async def test_bulk_import_updates_rollups(self, client: AsyncClient):
+        """一括インポートでもロールアップが加算されるテスト"""
+        await client.post(
+            "/import",
+            content=(
+                '{"genre": "統計D", "question": "Q1", "answer": "A1"}\n'
+                '{"genre": "統計D", "question": "Q1", "answer": "A2"}\n'
+                '{"genre": "統計D", "question": "Q2"}\n'
+            ),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        response = await client.get("/stats", params={"days": 1})
+
+        # アサーション
+        stats = response.json()
+        assert stats["genre_count"] == 1
+        assert stats["question_count"] == 2
+        assert stats["answer_count"] == 2
+        assert stats["unanswered_count"] == 1
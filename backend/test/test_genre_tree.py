@@ -0,0 +1,68 @@
+import pytest
+from httpx import AsyncClient
+
+
+class TestGenreTreeEndpoint:
+    """ジャンルツリーエンドポイントのテストクラス"""
+
+    async def _create_tree(self, client: AsyncClient) -> str:
+        genre_response = await client.post("/genres", json={"genre_name": "ツリー"})
+        genre_id = genre_response.json()["id"]
+        for i in range(3):
+            question_response = await client.post(
+                "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+            )
+            question_id = question_response.json()["id"]
+            for j in range(i):
+                await client.post(
+                    "/answers",
+                    json={"question_id": question_id, "answer": f"質問{i}の回答{j}"},
+                )
+        return genre_id
+
+    @pytest.mark.asyncio
+    async def test_get_genre_tree(self, client: AsyncClient):
+        """ジャンル・質問・回答のツリー取得のテスト"""
+        genre_id = await self._create_tree(client)
+
+        response = await client.get(f"/genres/{genre_id}/tree")
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert data["genre_name"] == "ツリー"
+        assert data["question_count"] == 3
+        assert len(data["questions"]) == 3
+        counts = sorted(q["answer_count"] for q in data["questions"])
+        assert counts == [0, 1, 2]
+        for question in data["questions"]:
+            assert len(question["answers"]) == question["answer_count"]
+
+    @pytest.mark.asyncio
+    async def test_get_genre_tree_with_limits(self, client: AsyncClient):
+        """件数上限と深さを指定したツリー取得のテスト"""
+        genre_id = await self._create_tree(client)
+
+        limited = await client.get(
+            f"/genres/{genre_id}/tree",
+            params={"question_limit": 2, "answer_limit": 1},
+        )
+        shallow = await client.get(f"/genres/{genre_id}/tree", params={"depth": 1})
+
+        # アサーション
+        assert limited.status_code == 200
+        assert limited.json()["question_count"] == 3
+        assert len(limited.json()["questions"]) == 2
+        assert all(len(q["answers"]) <= 1 for q in limited.json()["questions"])
+        assert shallow.status_code == 200
+        assert sum(q["answer_count"] for q in shallow.json()["questions"]) == 3
+        assert all(q["answers"] == [] for q in shallow.json()["questions"])
+
+    @pytest.mark.asyncio
+    async def test_get_genre_tree_not_found(self, client: AsyncClient):
+        """存在しないジャンルIDでのツリー取得エラーテスト"""
+        response = await client.get("/genres/non-existent-id/tree")
+
+        # アサーション
+        assert response.status_code == 404
+        assert "見つかりません" in response.json()["detail"]
@@ -1,11 +1,11 @@
-import pytest_asyncio
+import pytest
 from httpx import AsyncClient
 
 
 class TestGenreEndpoints:
     """ジャンルエンドポイントのテストクラス"""
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_genre_success(self, client: AsyncClient):
         """ジャンル作成成功のテスト"""
         # テストデータ
@@ -23,7 +23,7 @@ class TestGenreEndpoints:
         assert "updated_at" in data
         assert len(data["id"]) == 36  # UUID形式
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_genre_duplicate_name(self, client: AsyncClient):
         """ジャンル名重複エラーのテスト"""
         # 最初のジャンルを作成
@@ -38,7 +38,7 @@ class TestGenreEndpoints:
         data = response.json()
         assert "既に存在します" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_genre_empty_name(self, client: AsyncClient):
         """空のジャンル名でのバリデーションエラーテスト"""
         genre_data = {"genre_name": ""}
@@ -50,7 +50,7 @@ class TestGenreEndpoints:
         data = response.json()
         assert "detail" in data
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_genre_long_name(self, client: AsyncClient):
         """長すぎるジャンル名でのバリデーションエラーテスト"""
         # 256文字のジャンル名
@@ -62,7 +62,7 @@ class TestGenreEndpoints:
         # アサーション
         assert response.status_code == 422  # バリデーションエラー
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_genres_empty(self, client: AsyncClient):
         """ジャンル一覧取得（空）のテスト"""
         response = await client.get("/genres")
@@ -72,7 +72,7 @@ class TestGenreEndpoints:
         data = response.json()
         assert data == []
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_genres_with_data(self, client: AsyncClient):
         """ジャンル一覧取得（データあり）のテスト"""
         # テストデータを作成
@@ -102,7 +102,7 @@ class TestGenreEndpoints:
         assert "データベース" in genre_names
         assert "機械学習" in genre_names
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_health_check(self, client: AsyncClient):
         """ヘルスチェックエンドポイントのテスト"""
         response = await client.get("/health_check")
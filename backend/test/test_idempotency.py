@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from idempotency import MemoryIdempotencyStore, StoredResponse
+
+
+class TestIdempotency:
+    """冪等キーのテストクラス"""
+
+    async def _create_question(self, client: AsyncClient) -> str:
+        genre_response = await client.post("/genres", json={"genre_name": "冪等"})
+        question_response = await client.post(
+            "/questions",
+            json={"genre_id": genre_response.json()["id"], "question": "冪等質問"},
+        )
+        return question_response.json()["id"]
+
+    @pytest.mark.asyncio
+    async def test_retry_returns_original_response(self, client: AsyncClient):
+        """同じキーの再送で最初のレスポンスが返り、回答が重複しないことのテスト"""
+        question_id = await self._create_question(client)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        body = {"question_id": question_id, "answer": "一度だけ"}
+
+        first = await client.post("/answers", json=body, headers=headers)
+        retry = await client.post("/answers", json=body, headers=headers)
+        answers = await client.get(f"/questions/{question_id}/answers")
+
+        # アサーション
+        assert first.status_code == 200
+        assert retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert len(answers.json()) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_wait_for_first(self, client: AsyncClient):
+        """同時に送られた同じキーのリクエストが最初のリクエストの結果を共有することのテスト"""
+        question_id = await self._create_question(client)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        body = {"question_id": question_id, "answer": "同時"}
+
+        responses = await asyncio.gather(
+            *(client.post("/answers", json=body, headers=headers) for _ in range(3))
+        )
+        answers = await client.get(f"/questions/{question_id}/answers")
+
+        # アサーション
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert len({r.json()["id"] for r in responses}) == 1
+        assert len(answers.json()) == 1
+
+    @pytest.mark.asyncio
+    async def test_key_reused_with_different_body(self, client: AsyncClient):
+        """同じキーを別の内容で使用した場合と、エラーを保存しないことのテスト"""
+        question_id = await self._create_question(client)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+        await client.post(
+            "/answers",
+            json={"question_id": question_id, "answer": "A"},
+            headers=headers,
+        )
+        reused = await client.post(
+            "/answers",
+            json={"question_id": question_id, "answer": "B"},
+            headers=headers,
+        )
+        error_headers = {"Idempotency-Key": str(uuid.uuid4())}
+        missing = {"question_id": "missing-id", "answer": "C"}
+        first_error = await client.post("/answers", json=missing, headers=error_headers)
+        second_error = await client.post(
+            "/answers", json=missing, headers=error_headers
+        )
+
+        # アサーション
+        assert reused.status_code == 422
+        assert first_error.status_code == 404
+        assert second_error.status_code == 404
+        assert "idempotent-replayed" not in second_error.headers
+
+    @pytest.mark.asyncio
+    async def test_memory_store_is_bounded(self):
+        """保存したレスポンスが有効期限と件数の上限で破棄されることのテスト"""
+        now = [0.0]
+        store = MemoryIdempotencyStore(ttl=10, max_entries=2, clock=lambda: now[0])
+        for key in ("a", "b", "c"):
+            assert await store.acquire(key, "fp") is None
+            await store.complete(key, StoredResponse("fp", 200, [], key.encode()))
+
+        evicted = await store.acquire("a", "fp")
+        await store.release("a")
+        kept = await store.acquire("c", "fp")
+        now[0] = 11
+        expired = await store.acquire("c", "fp")
+
+        # アサーション
+        assert evicted is None
+        assert kept.body == b"c"
+        assert expired is None
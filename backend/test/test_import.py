@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+
+async def _chunked(data: bytes, size: int):
+    """リクエストボディを小さなチャンクに分けて送信します。"""
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+class TestImportEndpoint:
+    """一括インポートエンドポイントのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_import_csv(self, client: AsyncClient):
+        """CSVの一括インポートのテスト"""
+        existing = await client.post("/genres", json={"genre_name": "既存ジャンル"})
+        body = (
+            "genre,question,answer\n"
+            "既存ジャンル,質問1,回答1\n"
+            '既存ジャンル,質問1,"複数行の\n回答2"\n'
+            "新規ジャンル,質問2,\n"
+            ",質問3,回答3\n"
+            "新規ジャンル,,回答4\n"
+        ).encode()
+
+        # マルチバイト文字の途中でチャンクが分かれても解析できる
+        response = await client.post(
+            "/import",
+            content=_chunked(body, 7),
+            headers={"Content-Type": "text/csv"},
+            params={"chunk_size": 2},
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rows"] == 5
+        assert data["inserted"] == {"genres": 1, "questions": 2, "answers": 2}
+        assert [e["line"] for e in data["errors"]] == [6, 7]
+        assert data["chunks"] == 2
+        assert data["rows_per_second"] > 0
+
+        questions = await client.get(f"/genres/{existing.json()['id']}/questions")
+        assert [q["question"] for q in questions.json()] == ["質問1"]
+        answers = await client.get(f"/questions/{questions.json()[0]['id']}/answers")
+        assert sorted(a["answer"] for a in answers.json()) == [
+            "回答1",
+            "複数行の\n回答2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_import_jsonl(self, client: AsyncClient):
+        """JSONLの一括インポートと行エラーのテスト"""
+        lines = [
+            json.dumps({"genre": "JSONL", "question": "質問", "answer": "回答"}),
+            "{不正なJSON",
+            json.dumps({"genre": "x" * 256}),
+        ]
+        response = await client.post(
+            "/import",
+            content="\n".join(lines).encode(),
+            params={"format": "jsonl"},
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert data["inserted"] == {"genres": 1, "questions": 1, "answers": 1}
+        assert data["error_count"] == 2
+        assert [e["line"] for e in data["errors"]] == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_import_requires_format(self, client: AsyncClient):
+        """形式を判定できない場合のインポートエラーテスト"""
+        response = await client.post("/import", content=b"genre\nA\n")
+
+        # アサーション
+        assert response.status_code == 415
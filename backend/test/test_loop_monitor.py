@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import main
+import pytest
+from httpx import AsyncClient
+from loop_monitor import LoopMonitor, threadpool_stats
+
+
+class TestLoopMonitor:
+    """イベントループ監視のテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_lag_sampler_records_lag(self):
+        """ループの遅延が記録されるテスト"""
+        monitor = LoopMonitor(interval=0.01, threshold=0.05, debug=False)
+        await monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.08)  # ループをブロックする
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        snapshot = monitor.snapshot()
+        assert snapshot["lag_ms"]["max"] >= 50
+        assert snapshot["slow_ticks"] >= 1
+        assert not snapshot["running"]
+
+    @pytest.mark.asyncio
+    async def test_watchdog_captures_blocking_stack(self):
+        """ループをブロックした呼び出し元のスタックが記録されるテスト"""
+        monitor = LoopMonitor(interval=0.01, threshold=0.03, debug=True)
+        await monitor.start()
+        await asyncio.sleep(0.02)
+
+        def blocking_call():
+            time.sleep(0.2)
+
+        blocking_call()
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert monitor.blocked_events >= 1
+        assert "blocking_call" in monitor.last_blocked_stack
+
+    @pytest.mark.asyncio
+    async def test_threadpool_stats(self):
+        """スレッドプールの使用状況のテスト"""
+        stats = threadpool_stats()
+
+        assert stats["total"] > 0
+        assert stats["borrowed"] == 0
+        assert stats["waiting"] == 0
+
+    @pytest.mark.asyncio
+    async def test_debug_endpoint_hides_stack_without_loop_debug(
+        self, client: AsyncClient, monkeypatch
+    ):
+        """/debug/loopは常に取得でき、スタックはLOOP_DEBUG有効時のみ返るテスト"""
+        monkeypatch.setattr(main.loop_monitor, "last_blocked_stack", "File app.py")
+        disabled = await client.get("/debug/loop")
+        monkeypatch.setattr(main, "LOOP_DEBUG", True)
+        enabled = await client.get("/debug/loop")
+
+        # アサーション
+        assert disabled.status_code == 200
+        assert "lag_ms" in disabled.json()
+        assert disabled.json()["threadpool"]["total"] > 0
+        assert disabled.json()["last_blocked_stack"] is None
+        assert enabled.json()["last_blocked_stack"] == "File app.py"
@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import outbox
+import pytest
+from httpx import AsyncClient
+from models import OutboxEvent, OutboxWatermark
+from outbox import FileSink, OutboxRelay, QueueSink
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+
+class FailingSink:
+    """常に配信に失敗するシンク"""
+
+    async def publish(self, events):
+        raise ConnectionError("配信先に接続できません")
+
+
+@pytest.fixture
+def session_factory(db_connection: AsyncConnection) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=db_connection, join_transaction_mode="create_savepoint"
+    )
+
+
+async def _create_answer(client: AsyncClient) -> None:
+    genre_response = await client.post("/genres", json={"genre_name": "アウトボックス"})
+    question_response = await client.post(
+        "/questions",
+        json={"genre_id": genre_response.json()["id"], "question": "質問"},
+    )
+    await client.post(
+        "/answers",
+        json={"question_id": question_response.json()["id"], "answer": "回答"},
+    )
+
+
+class TestOutbox:
+    """トランザクショナルアウトボックスのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_create_endpoints_record_events(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        """作成系エンドポイントがイベントを記録するテスト"""
+        monkeypatch.setattr(outbox, "OUTBOX_ENABLED", True)
+        await _create_answer(client)
+        # 作成に失敗したリクエストはイベントを記録しない
+        await client.post("/answers", json={"question_id": "missing", "answer": "回答"})
+
+        result = await db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id))
+        events = result.scalars().all()
+
+        # アサーション
+        assert [e.event_type for e in events] == [
+            "genre.created",
+            "question.created",
+            "answer.created",
+        ]
+        assert json.loads(events[2].payload)["answer"] == "回答"
+        assert json.loads(events[2].payload)["id"] == events[2].aggregate_id
+
+    @pytest.mark.asyncio
+    async def test_relay_publishes_in_batches_with_watermark(
+        self,
+        client: AsyncClient,
+        session_factory: async_sessionmaker,
+        db_session: AsyncSession,
+        monkeypatch,
+    ):
+        """リレーがバッチ単位で配信し、ウォーターマークを進めるテスト"""
+        monkeypatch.setattr(outbox, "OUTBOX_ENABLED", True)
+        await _create_answer(client)
+        sink = QueueSink()
+        relay = OutboxRelay(sink, session_factory=session_factory, batch_size=2)
+
+        counts = [await relay.relay_once() for _ in range(3)]
+
+        # アサーション
+        assert counts == [2, 1, 0]
+        published = [sink.queue.get_nowait()["type"] for _ in range(3)]
+        assert published == ["genre.created", "question.created", "answer.created"]
+        watermark = await db_session.get(OutboxWatermark, "default")
+        assert watermark is not None
+        assert watermark.last_event_id == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_publish_is_retried(
+        self,
+        client: AsyncClient,
+        session_factory: async_sessionmaker,
+        tmp_path,
+        monkeypatch,
+    ):
+        """配信に失敗したバッチが次回再配信されるテスト（at-least-once）"""
+        monkeypatch.setattr(outbox, "OUTBOX_ENABLED", True)
+        await _create_answer(client)
+
+        with pytest.raises(ConnectionError):
+            await OutboxRelay(
+                FailingSink(), session_factory=session_factory
+            ).relay_once()
+        path = tmp_path / "events.jsonl"
+        published = await OutboxRelay(
+            FileSink(path), session_factory=session_factory
+        ).relay_once()
+
+        # アサーション
+        assert published == 3
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_relay_waits_for_id_gap(
+        self, db_session: AsyncSession, session_factory: async_sessionmaker
+    ):
+        """IDの欠番は期限を過ぎるまで配信を止めるテスト"""
+        for event_id in (1, 3):
+            db_session.add(
+                OutboxEvent(
+                    id=event_id, event_type="test", aggregate_id="a", payload="{}"
+                )
+            )
+        await db_session.flush()
+        sink = QueueSink()
+        relay = OutboxRelay(sink, session_factory=session_factory, gap_timeout=0.05)
+
+        first = await relay.relay_once()
+        blocked = await relay.relay_once()
+        await asyncio.sleep(0.06)
+        skipped = await relay.relay_once()
+
+        # アサーション
+        assert (first, blocked, skipped) == (1, 0, 1)
+        assert [sink.queue.get_nowait()["id"] for _ in range(2)] == [1, 3]
@@ -0,0 +1,88 @@
+import asyncio
+
+import main
+import pytest
+from httpx import AsyncClient
+from profiler import Profile, Profiler, ProfilerMiddleware, to_collapsed, to_speedscope
+
+
+class TestProfiler:
+    """オンデマンドプロファイラのテストクラス"""
+
+    def test_should_profile_requires_token(self):
+        """トークンが一致する場合のみプロファイル対象になるテスト"""
+        profiler = Profiler(token="secret", sample_rate=0)
+
+        assert profiler.should_profile("/answers", "secret")
+        assert not profiler.should_profile("/answers", "wrong")
+        assert not profiler.should_profile("/answers", None)
+        assert not profiler.should_profile("/profiles", "secret")
+
+    def test_speedscope_export(self):
+        """speedscope形式への変換のテスト"""
+        profile = Profile(method="GET", path="/answers")
+        handler = ("[handler]", "", 0)
+        frame = ("get_answers", "main.py", 10)
+        profile.stacks[(handler, frame)] += 3
+        profile.stacks[(handler,)] += 1
+
+        data = to_speedscope(profile, interval=0.001)
+
+        assert data["shared"]["frames"][0] == {"name": "[handler]"}
+        assert data["profiles"][0]["samples"] == [[0, 1], [0]]
+        assert data["profiles"][0]["weights"] == [3.0, 1.0]
+        assert to_collapsed(profile).startswith("[handler];get_answers (main.py:10) 3")
+
+    @pytest.mark.asyncio
+    async def test_middleware_records_profile(self):
+        """ミドルウェアがプロファイルをリングバッファに保存するテスト"""
+        profiler = Profiler(token="secret", interval=0.001, buffer_size=2)
+
+        async def app(scope, receive, send):
+            await asyncio.sleep(0.02)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = ProfilerMiddleware(app, profiler=profiler)
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/answers",
+            "headers": [(b"x-profile-token", b"secret")],
+        }
+        for _ in range(3):
+            await middleware(scope, None, send)
+
+        # リングバッファの上限を超えた分は破棄される
+        assert len(profiler.profiles) == 2
+        profile = profiler.profiles[-1]
+        assert profile.status_code == 200
+        assert profile.sample_count > 0
+        assert (b"x-profile-id", profile.id.encode()) in sent[-2]["headers"]
+
+    @pytest.mark.asyncio
+    async def test_download_requires_configured_token(
+        self, client: AsyncClient, monkeypatch
+    ):
+        """トークン未設定の場合はプロファイルを取得できないテスト"""
+        monkeypatch.setattr(main, "PROFILER_ENABLED", True)
+        monkeypatch.setattr(main.profiler, "token", None)
+        without_token = await client.get("/profiles")
+
+        monkeypatch.setattr(main.profiler, "token", "secret")
+        wrong_token = await client.get(
+            "/profiles", headers={"X-Profile-Token": "wrong"}
+        )
+        with_token = await client.get(
+            "/profiles", headers={"X-Profile-Token": "secret"}
+        )
+
+        # アサーション
+        assert without_token.status_code == 403
+        assert wrong_token.status_code == 403
+        assert with_token.status_code == 200
@@ -1,11 +1,11 @@
-import pytest_asyncio
+import pytest
 from httpx import AsyncClient
 
 
 class TestQuestionEndpoints:
     """質問エンドポイントのテストクラス"""
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_question_success(self, client: AsyncClient):
         """質問作成成功のテスト"""
         # 事前準備：ジャンルを作成
@@ -32,7 +32,7 @@ class TestQuestionEndpoints:
         assert "updated_at" in data
         assert len(data["id"]) == 36  # UUID形式
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_question_invalid_genre_id(self, client: AsyncClient):
         """存在しないジャンルIDでの質問作成エラーテスト"""
         # 存在しないジャンルIDを使用
@@ -45,7 +45,7 @@ class TestQuestionEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_create_question_empty_question(self, client: AsyncClient):
         """空の質問でのバリデーションエラーテスト"""
         # 事前準備：ジャンルを作成
@@ -60,7 +60,7 @@ class TestQuestionEndpoints:
         # アサーション
         assert response.status_code == 422  # バリデーションエラー
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_empty(self, client: AsyncClient):
         """質問一覧取得（空）のテスト"""
         response = await client.get("/questions")
@@ -70,7 +70,7 @@ class TestQuestionEndpoints:
         data = response.json()
         assert data == []
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_with_data(self, client: AsyncClient):
         """質問一覧取得（データあり）のテスト"""
         # 事前準備：ジャンルと質問を作成
@@ -104,7 +104,7 @@ class TestQuestionEndpoints:
             assert "genre" in question
             assert question["genre"]["genre_name"] == "プログラミング"
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_filtered_by_genre(self, client: AsyncClient):
         """ジャンルIDでフィルタした質問一覧取得のテスト"""
         # 事前準備：複数のジャンルと質問を作成
@@ -137,7 +137,7 @@ class TestQuestionEndpoints:
         assert all(q["genre_id"] == genre1_id for q in data)
         assert all("Python" in q["question"] for q in data)
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_question_by_id_success(self, client: AsyncClient):
         """質問詳細取得成功のテスト"""
         # 事前準備：ジャンルと質問を作成
@@ -159,7 +159,7 @@ class TestQuestionEndpoints:
         assert data["question"] == question_data["question"]
         assert data["genre"]["genre_name"] == "機械学習"
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_question_by_id_not_found(self, client: AsyncClient):
         """存在しない質問IDでの詳細取得エラーテスト"""
         response = await client.get("/questions/non-existent-id")
@@ -169,7 +169,7 @@ class TestQuestionEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_by_genre_success(self, client: AsyncClient):
         """ジャンル別質問取得成功のテスト"""
         # 事前準備：ジャンルと質問を作成
@@ -194,7 +194,7 @@ class TestQuestionEndpoints:
         assert len(data) == 2
         assert all(q["genre_id"] == genre_id for q in data)
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_by_genre_not_found(self, client: AsyncClient):
         """存在しないジャンルIDでの質問取得エラーテスト"""
         response = await client.get("/genres/non-existent-genre-id/questions")
@@ -204,7 +204,7 @@ class TestQuestionEndpoints:
         data = response.json()
         assert "見つかりません" in data["detail"]
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_get_questions_by_genre_empty(self, client: AsyncClient):
         """質問のないジャンルでの取得テスト"""
         # 事前準備：ジャンルのみ作成（質問は作成しない）
@@ -224,7 +224,7 @@ class TestQuestionEndpoints:
 class TestQuestionIntegration:
     """質問機能の統合テストクラス"""
 
-    @pytest_asyncio.is_async_test
+    @pytest.mark.asyncio
     async def test_complete_question_workflow(self, client: AsyncClient):
         """質問機能の完全なワークフローテスト"""
         # 1. ジャンル作成
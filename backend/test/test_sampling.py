@@ -0,0 +1,121 @@
+from collections import Counter
+
+import pytest
+import sampling
+from httpx import AsyncClient
+from sampling import sample_questions
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TestQuestionSampling:
+    """質問のランダム抽出エンドポイントのテストクラス"""
+
+    async def _create_questions(self, client: AsyncClient, count: int) -> dict:
+        genre_response = await client.post("/genres", json={"genre_name": "出題"})
+        genre_id = genre_response.json()["id"]
+        question_ids = []
+        for i in range(count):
+            response = await client.post(
+                "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+            )
+            question_ids.append(response.json()["id"])
+        return {"genre_id": genre_id, "question_ids": question_ids}
+
+    @pytest.mark.asyncio
+    async def test_random_questions(self, client: AsyncClient):
+        """ジャンル内から重複なしでn件抽出されるテスト"""
+        data = await self._create_questions(client, 5)
+
+        response = await client.get(
+            f"/genres/{data['genre_id']}/questions/random", params={"n": 3}
+        )
+        all_response = await client.get(
+            f"/genres/{data['genre_id']}/questions/random", params={"n": 10}
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        ids = [q["id"] for q in response.json()]
+        assert len(ids) == len(set(ids)) == 3
+        assert set(ids) <= set(data["question_ids"])
+        # 候補が少ない場合は全件
+        assert {q["id"] for q in all_response.json()} == set(data["question_ids"])
+
+    @pytest.mark.asyncio
+    async def test_unanswered_questions(self, client: AsyncClient):
+        """回答のない質問だけが抽出されるテスト"""
+        data = await self._create_questions(client, 4)
+        answered = data["question_ids"][:3]
+        for question_id in answered:
+            await client.post(
+                "/answers", json={"question_id": question_id, "answer": "回答"}
+            )
+
+        response = await client.get(
+            f"/genres/{data['genre_id']}/questions/unanswered", params={"n": 5}
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        assert [q["id"] for q in response.json()] == [data["question_ids"][3]]
+
+    @pytest.mark.asyncio
+    async def test_sampling_errors(self, client: AsyncClient):
+        """存在しないジャンル・範囲外のnのテスト"""
+        data = await self._create_questions(client, 1)
+
+        not_found = await client.get("/genres/non-existent-id/questions/random")
+        too_many = await client.get(
+            f"/genres/{data['genre_id']}/questions/random", params={"n": 1000}
+        )
+
+        # アサーション
+        assert not_found.status_code == 404
+        assert too_many.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_unanswered_without_rollup(self, client: AsyncClient, monkeypatch):
+        """ロールアップが無効の場合も回答のない質問だけが抽出されるテスト"""
+        data = await self._create_questions(client, 3)
+        await client.post(
+            "/answers", json={"question_id": data["question_ids"][0], "answer": "回答"}
+        )
+        monkeypatch.setattr(sampling, "STATS_ROLLUP_ENABLED", False)
+
+        response = await client.get(
+            f"/genres/{data['genre_id']}/questions/unanswered", params={"n": 5}
+        )
+
+        # アサーション
+        assert response.status_code == 200
+        assert {q["id"] for q in response.json()} == set(data["question_ids"][1:])
+
+    @pytest.mark.asyncio
+    async def test_sampling_is_uniform_in_one_query(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """どの質問も同程度に選ばれ、抽出が件数の取得と1回のクエリで済むテスト"""
+        data = await self._create_questions(client, 4)
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            if statement.startswith("SELECT"):
+                statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            picked = await sample_questions(db_session, data["genre_id"], 3)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        counts: Counter = Counter()
+        for _ in range(400):
+            for question in await sample_questions(db_session, data["genre_id"], 1):
+                counts[question.id] += 1
+
+        # アサーション
+        assert len({q.id for q in picked}) == 3
+        assert len(statements) == 2
+        assert set(counts) == set(data["question_ids"])
+        assert min(counts.values()) > 50
@@ -0,0 +1,133 @@
+import main
+import pytest
+from httpx import AsyncClient
+from trending import (
+    MemoryTrendingBackend,
+    RedisTrendingBackend,
+    SlidingWindowCounter,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSlidingWindowCounter:
+    """スライディングウィンドウのカウンターのテストクラス"""
+
+    def test_expires_old_buckets(self):
+        """ウィンドウを過ぎたバケットが合計から差し引かれるテスト"""
+        clock = FakeClock()
+        counter = SlidingWindowCounter(60, 6, clock)
+        counter.add(("g", "q1"), 3)
+        clock.now += 30
+        counter.add(("g", "q2"))
+        counter.add(("g", "q1"))
+
+        before = counter.top(10)
+        clock.now += 35
+        after_first_expired = counter.top(10)
+        clock.now += 3600
+        after_all_expired = counter.top(10)
+
+        # アサーション
+        assert before == [(("g", "q1"), 4), (("g", "q2"), 1)]
+        assert after_first_expired == [(("g", "q1"), 1), (("g", "q2"), 1)]
+        assert after_all_expired == []
+
+    def test_genre_filter_and_limit(self):
+        """ジャンルの絞り込みと件数の上限のテスト"""
+        counter = SlidingWindowCounter(60, 6, FakeClock())
+        counter.add(("g1", "q1"), 2)
+        counter.add(("g1", "q2"), 5)
+        counter.add(("g2", "q3"), 9)
+
+        # アサーション
+        assert counter.top(1) == [(("g2", "q3"), 9)]
+        assert counter.top(10, "g1") == [(("g1", "q2"), 5), (("g1", "q1"), 2)]
+
+    def test_cached_ranking_follows_updates(self):
+        """集計結果のキャッシュが追加・期限切れで更新されるテスト"""
+        clock = FakeClock()
+        counter = SlidingWindowCounter(60, 6, clock)
+        counter.add(("g1", "q1"), 2)
+
+        first = counter.top(10, "g1")
+        counter.add(("g1", "q2"), 3)
+        after_add = counter.top(10, "g1")
+        clock.now += 3600
+        after_expired = counter.top(10, "g1")
+
+        # アサーション
+        assert first == [(("g1", "q1"), 2)]
+        assert after_add == [(("g1", "q2"), 3), (("g1", "q1"), 2)]
+        assert after_expired == []
+        assert counter.totals == {}
+
+
+class TestRedisTrendingBackend:
+    """Redisバックエンドのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_top_falls_back_when_redis_fails(self):
+        """Redisに接続できない場合に集計がエラーにならず空になるテスト"""
+
+        class FailingClient:
+            def pipeline(self, transaction: bool):
+                raise ConnectionError("redis is down")
+
+        backend = RedisTrendingBackend.__new__(RedisTrendingBackend)
+        backend.client = FailingClient()
+        backend._errors = ConnectionError
+        backend.prefix = "trending"
+
+        # アサーション
+        assert await backend.top("1h", 10) == []
+        await backend.record("g", "q")
+
+
+class TestTrendingEndpoint:
+    """話題の質問エンドポイントのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_trending_counts_created_answers(
+        self, client: AsyncClient, monkeypatch
+    ):
+        """回答の作成がウィンドウ内の回答数に反映されるテスト"""
+        monkeypatch.setattr(main, "trending", MemoryTrendingBackend())
+        genre_response = await client.post("/genres", json={"genre_name": "話題"})
+        genre_id = genre_response.json()["id"]
+        question_ids = []
+        for i in range(2):
+            response = await client.post(
+                "/questions", json={"genre_id": genre_id, "question": f"質問{i}"}
+            )
+            question_ids.append(response.json()["id"])
+        for question_id, count in zip(question_ids, [1, 3]):
+            for _ in range(count):
+                await client.post(
+                    "/answers", json={"question_id": question_id, "answer": "回答"}
+                )
+
+        response = await client.get(
+            "/questions/trending", params={"window": "1h", "genre_id": genre_id}
+        )
+        other_genre = await client.get(
+            "/questions/trending", params={"genre_id": "other"}
+        )
+        invalid = await client.get("/questions/trending", params={"window": "2h"})
+
+        # アサーション
+        assert response.status_code == 200
+        data = response.json()
+        assert data["window"] == "1h"
+        assert [(q["question_id"], q["answer_count"]) for q in data["questions"]] == [
+            (question_ids[1], 3),
+            (question_ids[0], 1),
+        ]
+        assert other_genre.json()["questions"] == []
+        assert invalid.status_code == 422
@@ -0,0 +1,247 @@
+"""
+回答数による話題の質問（トレンド）
+
+回答の作成時に、質問ごとの回答数を時間窓ごとのスライディングウィンドウで数えます。
+各ウィンドウは一定幅のバケットのリングバッファで、古いバケットは時間の経過とともに
+合計から差し引かれるため、集計時に answers テーブルを走査しません。
+
+- memory（既定）: プロセス内のカウンター。ワーカーごとに独立し、再起動で消えます
+- redis: バケットをRedisのハッシュに保持し、複数のワーカーで共有します
+  （redisパッケージが必要です）
+
+集計はバケット単位のため、ウィンドウの長さはバケット1つ分だけ長くなることがあります。
+"""
+
+import heapq
+import logging
+import os
+import time
+from collections import Counter
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+# memory もしくは redis
+TRENDING_BACKEND = os.getenv("TRENDING_BACKEND", "memory")
+TRENDING_REDIS_URL = os.getenv("TRENDING_REDIS_URL", "redis://localhost:6379/0")
+TRENDING_MAX_LIMIT = 100
+
+TrendingWindow = Literal["5m", "1h", "24h"]
+
+# ウィンドウ名 -> (ウィンドウの秒数, バケット数)
+TRENDING_WINDOWS: Dict[TrendingWindow, Tuple[int, int]] = {
+    "5m": (5 * 60, 30),
+    "1h": (60 * 60, 60),
+    "24h": (24 * 60 * 60, 48),
+}
+
+# (genre_id, question_id)
+TrendingKey = Tuple[str, str]
+
+
+class SlidingWindowCounter:
+    """
+    バケットのリングバッファによるスライディングウィンドウのカウンター
+
+    合計はジャンルごとに分けて保持し、期限切れで0になった質問はその場で取り除きます。
+    上位の集計結果はカウンターが変わるまでキャッシュするため、
+    書き込みの合間の集計はカウンターを走査しません。
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        bucket_count: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.bucket_seconds = window_seconds / bucket_count
+        self.bucket_count = bucket_count
+        self.clock = clock
+        # genre_id -> question_id -> ウィンドウ内の回答数
+        self.totals: Dict[str, Counter] = {}
+        self._buckets: List[Counter] = [Counter() for _ in range(bucket_count)]
+        # 最後に進めたバケットの通し番号
+        self._head: Optional[int] = None
+        # genre_id（全体はNone） -> 上位TRENDING_MAX_LIMIT件（カウンターの変更で破棄する）
+        self._top_cache: Dict[Optional[str], List[Tuple[TrendingKey, int]]] = {}
+
+    def _subtract(self, bucket: Counter) -> None:
+        for (genre_id, question_id), count in bucket.items():
+            genre_totals = self.totals[genre_id]
+            remaining = genre_totals[question_id] - count
+            if remaining > 0:
+                genre_totals[question_id] = remaining
+            else:
+                del genre_totals[question_id]
+                if not genre_totals:
+                    del self.totals[genre_id]
+
+    def _advance(self) -> int:
+        """現在のバケットまで進め、期限切れのバケットを合計から差し引きます。"""
+        current = int(self.clock() // self.bucket_seconds)
+        if self._head is None or current - self._head >= self.bucket_count:
+            for bucket in self._buckets:
+                bucket.clear()
+            self.totals.clear()
+            self._top_cache.clear()
+        elif current > self._head:
+            for number in range(self._head + 1, current + 1):
+                bucket = self._buckets[number % self.bucket_count]
+                if bucket:
+                    self._subtract(bucket)
+                    bucket.clear()
+                    self._top_cache.clear()
+        if self._head is None or current > self._head:
+            self._head = current
+        return self._head
+
+    def add(self, key: TrendingKey, count: int = 1) -> None:
+        head = self._advance()
+        self._buckets[head % self.bucket_count][key] += count
+        genre_id, question_id = key
+        self.totals.setdefault(genre_id, Counter())[question_id] += count
+        self._top_cache.clear()
+
+    def top(
+        self, limit: int, genre_id: Optional[str] = None
+    ) -> List[Tuple[TrendingKey, int]]:
+        """ウィンドウ内の回答数が多い順に返します（同数の場合は質問ID順）。"""
+        self._advance()
+        ranking = self._top_cache.get(genre_id)
+        if ranking is None:
+            items: Iterable[Tuple[TrendingKey, int]]
+            if genre_id is not None:
+                genre_totals = self.totals.get(genre_id, Counter())
+                items = (((genre_id, q), c) for q, c in genre_totals.items())
+            else:
+                items = (
+                    ((g, q), c)
+                    for g, genre_totals in self.totals.items()
+                    for q, c in genre_totals.items()
+                )
+            ranking = self._top_cache[genre_id] = _ranking(items, TRENDING_MAX_LIMIT)
+        return ranking[:limit]
+
+
+def _ranking(
+    items: Iterable[Tuple[TrendingKey, int]], limit: int
+) -> List[Tuple[TrendingKey, int]]:
+    """回答数が多い順（同数の場合は質問ID順）に先頭limit件を返します。"""
+    return heapq.nsmallest(limit, items, key=lambda item: (-item[1], item[0][1]))
+
+
+class TrendingBackend(Protocol):
+    async def record(self, genre_id: str, question_id: str) -> None: ...
+
+    async def top(
+        self, window: TrendingWindow, limit: int, genre_id: Optional[str] = None
+    ) -> List[Tuple[TrendingKey, int]]: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryTrendingBackend:
+    """プロセス内のカウンターで集計するバックエンド"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.counters = {
+            window: SlidingWindowCounter(seconds, buckets, clock)
+            for window, (seconds, buckets) in TRENDING_WINDOWS.items()
+        }
+
+    async def record(self, genre_id: str, question_id: str) -> None:
+        for counter in self.counters.values():
+            counter.add((genre_id, question_id))
+
+    async def top(
+        self, window: TrendingWindow, limit: int, genre_id: Optional[str] = None
+    ) -> List[Tuple[TrendingKey, int]]:
+        return self.counters[window].top(limit, genre_id)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisTrendingBackend:
+    """
+    バケットをRedisのハッシュ（キー: trending:<ウィンドウ>:<バケット番号>）に保持するバックエンド
+
+    バケットはウィンドウの長さが過ぎると有効期限で削除されます。
+    Redisに書き込めない場合は回答の作成を失敗させず、警告のみ記録します。
+    """
+
+    def __init__(self, url: str = TRENDING_REDIS_URL, prefix: str = "trending"):
+        # redisは共有バックエンドを使う場合のみ必要なため、ここで読み込む
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "TRENDING_BACKEND=redis には redis パッケージが必要です"
+                "（uv sync --extra trending）"
+            ) from exc
+        self.client = redis.from_url(url)
+        self._errors = redis.RedisError
+        self.prefix = prefix
+
+    def _bucket(self, window: TrendingWindow, now: float) -> Tuple[int, float, int]:
+        seconds, buckets = TRENDING_WINDOWS[window]
+        bucket_seconds = seconds / buckets
+        return int(now // bucket_seconds), bucket_seconds, buckets
+
+    async def record(self, genre_id: str, question_id: str) -> None:
+        now = time.time()
+        field = f"{genre_id}:{question_id}"
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for window, (seconds, _) in TRENDING_WINDOWS.items():
+                    number, bucket_seconds, _ = self._bucket(window, now)
+                    key = f"{self.prefix}:{window}:{number}"
+                    pipe.hincrby(key, field, 1)
+                    pipe.expire(key, int(seconds + bucket_seconds) + 1)
+                await pipe.execute()
+        except self._errors:
+            logger.warning("trending: Redisへの記録に失敗しました", exc_info=True)
+
+    async def top(
+        self, window: TrendingWindow, limit: int, genre_id: Optional[str] = None
+    ) -> List[Tuple[TrendingKey, int]]:
+        current, _, buckets = self._bucket(window, time.time())
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for number in range(current - buckets + 1, current + 1):
+                    pipe.hgetall(f"{self.prefix}:{window}:{number}")
+                results = await pipe.execute()
+        except self._errors:
+            # Redisが使えない間はエラーにせず、話題の質問なしとして返す
+            logger.warning("trending: Redisからの集計に失敗しました", exc_info=True)
+            return []
+        totals: Counter = Counter()
+        for bucket in results:
+            for field, count in bucket.items():
+                bucket_genre_id, question_id = field.decode().split(":", 1)
+                if genre_id is None or bucket_genre_id == genre_id:
+                    totals[(bucket_genre_id, question_id)] += int(count)
+        return _ranking(totals.items(), limit)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_backend(name: str = TRENDING_BACKEND) -> TrendingBackend:
+    if name == "redis":
+        return RedisTrendingBackend()
+    if name == "memory":
+        return MemoryTrendingBackend()
+    raise ValueError(f"不明なTRENDING_BACKENDです: {name}")
+
+
+trending = create_backend()